@@ -0,0 +1,230 @@
+"""Command-line batch generator of the Qualtrics IAT survey variants
+
+Each row of the configuration table (CSV or JSON) is one variant, with the IATTask parameters as its columns.
+The optional template column starts the variant from a built-in template, such as Flower-Insect, and the optional
+variant column names its folder in the archive.
+
+Example:
+    python batch_generator.py variants.csv --output iat_variants.zip
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from script_generator import IATTask
+
+TEMPLATE_FILE_NAME = "iat_qualtrics_template.qsf"
+SCRIPT_FILE_NAME = "iat_questionjs_script.js"
+_derived_params = {
+    "overall_instruction_desktop", "overall_instruction_mobile", "reminder_instruction_desktop",
+    "reminder_instruction_mobile", "example_instruction"
+}
+_stimuli_params = (
+    "target_positive_stimuli", "target_negative_stimuli", "attribute_positive_stimuli", "attribute_negative_stimuli"
+)
+_concept_params = (
+    "target_positive_concept", "target_negative_concept", "attribute_positive_concept", "attribute_negative_concept"
+)
+_list_params = (*_stimuli_params, "block_trial_numbers")
+_true_texts, _false_texts = ("true", "yes", "1"), ("false", "no", "0")
+
+
+def _param_types():
+    """The expected type of each IATTask parameter that can be configured, judging from its default value"""
+    param_types = {x: type(value) for x, value in vars(IATTask()).items()
+                   if value is not None and x not in _derived_params}
+    param_types.update({x: str for x in _concept_params})
+    param_types.update({x: list for x in _list_params})
+    return param_types
+
+
+def _parse_config_text(param, text, param_types):
+    """Convert a text value in the CSV file to the parameter's type, only the list parameters are evaluated as
+    Python literals, and the text is kept as it is when it can't be converted, which is reported by build_task
+    """
+    param_type = param_types.get(param, str)
+    if param_type is list:
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return text
+    if param_type is bool:
+        if text.lower() in _true_texts + _false_texts:
+            return text.lower() in _true_texts
+        return text
+    if param_type in (int, float):
+        for number_type in (int, float):
+            try:
+                return number_type(text)
+            except ValueError:
+                pass
+    return text
+
+
+def read_task_configs(config_file):
+    """Read the configurations of the IAT variants
+    :param config_file: str, Path, the CSV file with one variant per row, or the JSON file with a list of objects
+    :return list[dict], the configurations, the values in CSV files are converted to the parameters' types, e.g.,
+        the stimuli and the block trial numbers are evaluated as Python lists, and the text parameters are kept as text
+    :raise ValueError when the JSON file isn't a list of objects
+    """
+    config_path = Path(config_file)
+    if config_path.suffix.lower() == ".json":
+        configs = json.loads(config_path.read_text(encoding="utf-8"))
+        if not isinstance(configs, list) or not all(isinstance(x, dict) for x in configs):
+            raise ValueError("The JSON configuration file should contain a list of objects")
+        return configs
+
+    config_df = pd.read_csv(config_path, dtype=str, keep_default_na=False)
+    param_types = _param_types()
+    configs = list()
+    for _, row in config_df.iterrows():
+        config = {
+            key.strip(): _parse_config_text(key.strip(), value.strip(), param_types)
+            for key, value in row.items() if value.strip()
+        }
+        configs.append(config)
+    return configs
+
+
+def build_task(config):
+    """Create the IAT task from a configuration, after checking its parameters
+    :param config: dict, the IATTask parameters, and optionally the template and variant names
+    :return IATTask, the task
+    :raise ValueError when the configuration has invalid parameters
+    """
+    task_params = {x: value for x, value in config.items() if x not in ("template", "variant")}
+    template_name = config.get("template", IATTask.templates_names[0])
+    if template_name not in IATTask.templates_names:
+        raise ValueError(f"Unknown template: {template_name}. Choose from {IATTask.templates_names}")
+    allowed_params = set(vars(IATTask())) - _derived_params
+    unknown_params = sorted(set(task_params) - allowed_params)
+    if unknown_params:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown_params)}")
+
+    params = IATTask.shared_params()
+    params.update(IATTask.custom_params(template_name))
+    params.update(task_params)
+    for param, param_type in _param_types().items():
+        if param not in task_params or param in _concept_params or param in _list_params:
+            continue
+        value = task_params[param]
+        if param_type is bool and not isinstance(value, bool):
+            raise ValueError(f"{param} should be true or false, not {value!r}")
+        if param_type in (int, float) and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{param} should be a number, not {value!r}")
+        if param_type is str and not isinstance(value, str):
+            raise ValueError(f"{param} should be a text, not {value!r}")
+    for param in _concept_params:
+        if not isinstance(params.get(param), str) or not params[param]:
+            raise ValueError(f"{param} should be a non-empty text")
+    for param in _stimuli_params:
+        stimuli = params.get(param)
+        if not isinstance(stimuli, (list, tuple)) or not stimuli or not all(isinstance(x, str) for x in stimuli):
+            raise ValueError(f"{param} should be a non-empty list of words or image URLs")
+        params[param] = list(stimuli)
+    block_trial_numbers = params.get("block_trial_numbers", [20, 20, 20, 40, 20, 20, 40])
+    if not isinstance(block_trial_numbers, (list, tuple)) or len(block_trial_numbers) != 7 or \
+            not all(isinstance(x, int) and x > 0 for x in block_trial_numbers):
+        raise ValueError("block_trial_numbers should be a list of seven positive integers")
+    for param, choices in (("target_stimulus_reference", ("words", "pictures")),
+                           ("attribute_stimulus_reference", ("words", "pictures")),
+                           ("target_stimulus_media", ("text", "image")),
+                           ("attribute_stimulus_media", ("text", "image"))):
+        if params.get(param, choices[0]) not in choices:
+            raise ValueError(f"{param} should be one of {choices}")
+    return IATTask(**params)
+
+
+def generate_variant(config):
+    """Generate the question JavaScript code and the QSF file of a variant, which runs in the worker processes
+    :param config: dict, the variant's configuration
+    :return dict, the generated files by file name, or the error message of an invalid configuration
+    """
+    try:
+        task = build_task(config)
+        return {"files": {SCRIPT_FILE_NAME: task.generate_script(), TEMPLATE_FILE_NAME: task.generate_template_file()}}
+    except Exception as e:
+        return {"error": f"{e.__class__.__name__}: {e}"}
+
+
+def _variant_name(config, row_number):
+    variant_name = config.get("variant") or config.get("study_name") or f"variant_{row_number}"
+    return re.sub(r"[^\w.-]+", "_", str(variant_name)).strip("._") or f"variant_{row_number}"
+
+
+def generate_variants(configs, output_file, max_workers=None):
+    """Generate the variants on a process pool, and save them and the manifest to a zip archive
+    :param configs: list[dict], the variants' configurations
+    :param output_file: str, Path, the zip archive, which has a folder for each variant and a manifest.json
+    :param max_workers: int, the maximum number of worker processes, by default, the number of CPUs
+    :return list[dict], the manifest, one entry for each configuration with its status, files, or error
+    """
+    variant_names = [_variant_name(config, row_number) for row_number, config in enumerate(configs, start=1)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        generated_variants = list(executor.map(generate_variant, configs, chunksize=max(1, len(configs) // 32)))
+
+    manifest = list()
+    used_names = set()
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for row_number, (variant_name, generated_variant) in enumerate(zip(variant_names, generated_variants), 1):
+            manifest_entry = {"row": row_number, "variant": variant_name}
+            if variant_name in used_names:
+                generated_variant = {"error": f"ValueError: Duplicate variant name: {variant_name}"}
+            if "error" in generated_variant:
+                manifest_entry.update(status="error", error=generated_variant["error"])
+            else:
+                used_names.add(variant_name)
+                manifest_entry.update(status="ok", files=list())
+                for file_name, content in generated_variant["files"].items():
+                    content_bytes = content.encode("utf-8")
+                    archive.writestr(f"{variant_name}/{file_name}", content_bytes)
+                    manifest_entry["files"].append({
+                        "path": f"{variant_name}/{file_name}",
+                        "size": len(content_bytes),
+                        "sha256": hashlib.sha256(content_bytes).hexdigest()
+                    })
+            manifest.append(manifest_entry)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main(argv=None):
+    """Run the batch generator from the command line
+    :param argv: list[str], the command-line arguments, by default, sys.argv[1:]
+    :return int, the exit code, 0 when all variants are generated, 1 when any variant fails, 2 when there are none
+    """
+    parser = argparse.ArgumentParser(description="Generate the Qualtrics IAT survey variants in parallel.")
+    parser.add_argument("config_file", help="the CSV or JSON file of the variants' IATTask parameters")
+    parser.add_argument("-o", "--output", default="iat_variants.zip", help="the zip archive for the generated files")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="the number of worker processes")
+    args = parser.parse_args(argv)
+
+    try:
+        configs = read_task_configs(args.config_file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not configs:
+        print("No variants are found in the configuration file.", file=sys.stderr)
+        return 2
+
+    manifest = generate_variants(configs, args.output, args.workers)
+    failed_entries = [x for x in manifest if x["status"] != "ok"]
+    print(f"Generated {len(manifest) - len(failed_entries)} of {len(manifest)} variants. Output: {args.output}")
+    for manifest_entry in failed_entries:
+        print(f"Failed to generate row {manifest_entry['row']} ({manifest_entry['variant']}): "
+              f"{manifest_entry['error']}", file=sys.stderr)
+    return 1 if failed_entries else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Command-line batch scorer for the exported Qualtrics IAT data files
+
+Example:
+    python batch_scorer.py "exports/*.csv" --algorithm improved --param rt_punishment=600 --output scored
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import pandas as pd
+import iat_scorer
+
+
+def read_stimulus_table(table_file):
+    """Read the task's stimulus table for decoding the trials saved with the compact encoding
+    :param table_file: str, Path, the JSON file with a list of stimuli, or the text file with one stimulus per line
+    :return list[str], the stimulus table
+    :raise ValueError when the JSON file isn't a list of stimuli
+    """
+    table_path = Path(table_file)
+    if table_path.suffix.lower() == ".json":
+        stimulus_table = json.loads(table_path.read_text(encoding="utf-8"))
+        if not isinstance(stimulus_table, list) or not all(isinstance(x, str) for x in stimulus_table):
+            raise ValueError("The JSON stimulus table should contain a list of stimuli")
+        return stimulus_table
+    return [x.strip() for x in table_path.read_text(encoding="utf-8").splitlines() if x.strip()]
+
+
+def output_names(data_files):
+    """Name the outputs of the data files by their paths relative to the files' common folder
+    For example, site1/a.csv, site2/a.csv, and site2/a.xlsx are named site1__a_csv, site2__a_csv, and site2__a_xlsx.
+    :param data_files: list[str], the exported data files
+    :return dict, the output names by file
+    :raise ValueError when two files have the same output name, e.g., a_b/c.csv and a/b_c.csv
+    """
+    data_paths = {data_file: Path(os.path.abspath(data_file)) for data_file in data_files}
+    if not data_paths:
+        return dict()
+    common_folder = Path(os.path.commonpath([x.parent for x in data_paths.values()]))
+    names = dict()
+    for data_file, data_path in data_paths.items():
+        relative_path = data_path.relative_to(common_folder)
+        name_parts = [*relative_path.parent.parts, relative_path.stem]
+        if relative_path.suffix:
+            name_parts[-1] += f"_{relative_path.suffix[1:]}"
+        names[data_file] = "__".join(name_parts)
+    # The names are compared case-insensitively, as the outputs can be saved to a case-insensitive file system
+    files_by_name = dict()
+    for data_file, name in names.items():
+        files_by_name.setdefault(name.lower(), []).append(data_file)
+    collisions = [" and ".join(x) for x in files_by_name.values() if len(x) > 1]
+    if collisions:
+        raise ValueError(f"The outputs of these files would have the same names: {'; '.join(collisions)}")
+    return names
+
+
+def score_file(data_file, algorithm_name, algorithm_params, output_folder, save_trials=False, stimulus_table=None,
+               output_name=None):
+    """Clean up and score one exported data file, and save the per-file outputs
+    :param data_file: str, Path, the exported data file
+    :param algorithm_name: str, the name of the algorithm
+    :param algorithm_params: dict, the keyword parameters for the algorithm
+    :param output_folder: str, Path, the folder where the outputs are saved
+    :param save_trials: bool, whether the cleaned trial-level data are saved too
+    :param stimulus_table: Union[None, list[str]], the stimulus table for decoding the compactly encoded trials
+    :param output_name: Union[None, str], the prefix of the outputs' names, by default, the file's name without
+        its suffix
+    :return tuple, (DataFrame, DataFrame), the scored summary and response-level data
+    """
+    data_path = Path(data_file)
+    output_path = Path(output_folder)
+    output_name = output_name or data_path.stem
+    iat_data = iat_scorer.IATData(data_path, stimulus_table=stimulus_table)
+    iat_data_clean = iat_data.clean_up()
+    algorithm = iat_scorer.IATAlgorithm(algorithm_name, **algorithm_params)
+    scoring_summary, scored_iat_data = algorithm.process_data(iat_data)
+    if save_trials:
+        iat_data_clean.to_csv(output_path / f"{output_name}_trials.csv", index=False)
+    scoring_summary.to_csv(output_path / f"{output_name}_summary.csv", index=False)
+    scored_iat_data.to_csv(output_path / f"{output_name}_scores.csv", index=False)
+    return scoring_summary, scored_iat_data
+
+
+def score_files(data_files, algorithm_name, algorithm_params, output_folder, max_workers=None, save_trials=False,
+                stimulus_table=None):
+    """Score the exported data files concurrently on a process pool
+    :param data_files: list[str], the exported data files
+    :param algorithm_name: str, the name of the algorithm
+    :param algorithm_params: dict, the keyword parameters for the algorithm
+    :param output_folder: str, Path, the folder where the outputs are saved
+    :param max_workers: int, the maximum number of worker processes, by default, the number of CPUs
+    :param save_trials: bool, whether the cleaned trial-level data are saved too
+    :param stimulus_table: Union[None, list[str]], the stimulus table for decoding the compactly encoded trials
+    :return tuple, (dict, dict), the scored data, (summary, scores) by file, and the error messages by file
+    :raise ValueError when the algorithm or its parameters aren't supported, or the outputs' names collide
+    """
+    iat_scorer.IATAlgorithm(algorithm_name, **algorithm_params)
+    names = output_names(data_files)
+    output_path = Path(output_folder)
+    output_path.mkdir(parents=True, exist_ok=True)
+    scored_files = dict()
+    failed_files = dict()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(score_file, data_file, algorithm_name, algorithm_params, output_path, save_trials,
+                            stimulus_table, names[data_file]): data_file for data_file in data_files
+        }
+        for future in as_completed(futures):
+            data_file = futures[future]
+            try:
+                scored_files[data_file] = future.result()
+            except Exception as e:
+                failed_files[data_file] = f"{e.__class__.__name__}: {e}"
+
+    for data_index, output_name in enumerate(("combined_summary.csv", "combined_scores.csv")):
+        combined_frames = [
+            scored_data[data_index].assign(source_file=names[data_file])
+            for data_file, scored_data in sorted(scored_files.items())
+        ]
+        if combined_frames:
+            combined_df = pd.concat(combined_frames, ignore_index=True)
+            combined_df.insert(0, "source_file", combined_df.pop("source_file"))
+            combined_df.to_csv(output_path / output_name, index=False)
+    return scored_files, failed_files
+
+
+def main(argv=None):
+    """Run the batch scorer from the command line
+    :param argv: list[str], the command-line arguments, by default, sys.argv[1:]
+    :return int, the exit code, 0 when all files are scored, 1 when any file fails, 2 when no files are found
+    """
+    parser = argparse.ArgumentParser(description="Clean up and score exported Qualtrics IAT data files in parallel.")
+    parser.add_argument("patterns", nargs="+", help="glob patterns of the exported data files (csv, zip, or xlsx)")
+    parser.add_argument("-a", "--algorithm", default=iat_scorer.IATAlgorithmName.IMPROVED.value,
+                        choices=[x.value for x in iat_scorer.IATAlgorithmName], help="the scoring algorithm")
+    parser.add_argument("-p", "--param", action="append", metavar="KEY=VALUE",
+                        help="an algorithm parameter (e.g., rt_low_cutoff=300), can be repeated")
+    parser.add_argument("-o", "--output", default="iat_scores", help="the folder for the scored outputs")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="the number of worker processes")
+    parser.add_argument("--save-trials", action="store_true", help="save the cleaned trial-level data too")
+    parser.add_argument("--stimulus-table", help="the JSON or text file of the task's stimulus table, which decodes "
+                                                 "the trials saved with the compact encoding")
+    args = parser.parse_args(argv)
+
+    try:
+        algorithm_params = iat_scorer.parse_algorithm_params(args.param, args.algorithm)
+        algorithm = iat_scorer.IATAlgorithm(args.algorithm, **algorithm_params)
+        stimulus_table = read_stimulus_table(args.stimulus_table) if args.stimulus_table else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    data_files = sorted({data_file for pattern in args.patterns for data_file in glob.glob(pattern, recursive=True)})
+    if not data_files:
+        print("No data files match the specified patterns.", file=sys.stderr)
+        return 2
+
+    try:
+        scored_files, failed_files = score_files(data_files, algorithm.name, algorithm.params, args.output,
+                                                 args.workers, args.save_trials, stimulus_table)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Scored {len(scored_files)} of {len(data_files)} files with {algorithm!r}. Outputs: {args.output}")
+    for data_file, error_message in sorted(failed_files.items()):
+        print(f"Failed to score {data_file}: {error_message}", file=sys.stderr)
+    return 1 if failed_files else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
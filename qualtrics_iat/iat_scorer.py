@@ -1,6 +1,18 @@
 """"""
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+from pathlib import Path
+import ast
+import base64
+import binascii
+import hashlib
+import pickle
+import re
+import threading
+import warnings
+import weakref
 import pandas as pd
 import numpy as np
 
@@ -16,19 +28,30 @@ class IATData:
                  suffix_responses="Responses",
                  suffix_trials="Trials",
                  suffix_conditions="blockConditions",
-                 congruency_labels=None):
+                 congruency_labels=None,
+                 suffix_timing="Timing",
+                 stimulus_table=None,
+                 lazy=False):
         """Initialize the data model instance of the IATData
-        :param data_file: Union[csv, zip, Bytes], the data file containing the IAT survey responses
+        :param data_file: Union[csv, zip, xlsx, Bytes], the data file containing the IAT survey responses
         :param grouped_by: tuple, the indices that identify distinct IAT sessions
         :param trial_response_separator: str, the separator between responses in the embedded data
         :param suffix_responses: str, the suffix of the embedded field for saving trial responses
         :param suffix_trials: str, the suffix of the embedded field for saving trial stimuli
         :param suffix_conditions: str, the suffix of the embedded field for saving the block conditions
         :param congruency_labels: Union[None, dict], the labels by congruency
+        :param suffix_timing: str, the suffix of the embedded field for saving the trials' timing diagnostics, which
+            are recorded when the task uses the precision timing
+        :param stimulus_table: Union[None, list[str]], the task's stimulus table (IATTask.stimulus_table), which
+            decodes the trial stimuli saved with the compact encoding, otherwise, their indices are kept as the stimuli
+        :param lazy: bool, whether a CSV data file is read only when its data are used, iter_sessions reads it in
+            chunks without loading the whole file, otherwise, the data are read when the instance is created
         :return None
         """
         self.suffix_responses, self.suffix_trials, self.suffix_conditions = \
-            suffices = suffix_responses, suffix_trials, suffix_conditions
+            suffix_responses, suffix_trials, suffix_conditions
+        self.suffix_timing = suffix_timing
+        self.stimulus_table = stimulus_table
         self.grouped_by = grouped_by
         if not congruency_labels:
             congruency_labels = {"con": ("p+", "n-"), "inc": ("p-", "n+")}
@@ -36,49 +59,137 @@ class IATData:
         self.trial_response_separator = trial_response_separator
         self.iat_data_clean = None
         
-        _iat_data = pd.read_csv(data_file)
-        self.iat_data = _iat_data[_iat_data[grouped_by[1]].str.startswith('R_')].reset_index(drop=True)
-        
+        # The data file is kept only when it's read lazily
+        self._data_file = data_file
+        self._iat_data = None
+        if lazy and not self._is_excel_file(data_file):
+            data_columns = self._read_csv_data(nrows=0).columns
+        else:
+            self._iat_data = self._read_data()
+            self._data_file = None
+            data_columns = self._iat_data.columns
         responses_field_name = f"block1{suffix_responses}"
-        self.studies = {x.split("_")[0] for x in self.iat_data.columns
+        self.studies = {x.split("_")[0] for x in data_columns
                         if len(x) > len(responses_field_name) and x.endswith(responses_field_name)}
         # Create a mock study to streamline the data processing process as if there are multiple studies
         if not self.studies:
             self.studies = {self.mock_study}
-            old_block_names = [x for x in self.iat_data.columns if x.endswith(suffices)]
+        if self._iat_data is not None:
+            self._iat_data = self._select_responses(self._iat_data)
+
+    @property
+    def iat_data(self):
+        """The IAT-relevant survey responses, which are read when they're first used if the data file is read lazily"""
+        if self._iat_data is None:
+            self._iat_data = self._select_responses(self._read_data())
+            self._data_file = None
+        return self._iat_data
+
+    def _read_data(self):
+        """Read the whole data file"""
+        if self._is_excel_file(self._data_file):
+            return self._read_excel_data(self._data_file)
+        return self._read_csv_data()
+
+    def _read_csv_data(self, **read_options):
+        """Read the CSV data file from the beginning, which can be read again when it's an uploaded file
+        :param read_options: dict, the keyword options for pd.read_csv, such as nrows or chunksize
+        :return Union[DataFrame, TextFileReader], the data or the iterator of the data chunks
+        """
+        if hasattr(self._data_file, "seek"):
+            self._data_file.seek(0)
+        return pd.read_csv(self._data_file, **read_options)
+
+    def _select_responses(self, raw_data):
+        """Select the survey responses and name the embedded fields by the mock study when the studies aren't named
+        :param raw_data: DataFrame, all or a chunk of the rows of the data file
+        :return DataFrame, the survey responses
+        """
+        iat_data = raw_data[raw_data[self.grouped_by[1]].astype(str).str.startswith('R_')].reset_index(drop=True)
+        if self.studies == {self.mock_study}:
+            old_block_names = [x for x in iat_data.columns if x.endswith(self._suffices)]
             new_block_names = [f"{self.mock_study}_{x}" for x in old_block_names]
-            self.iat_data.rename(columns=dict(zip(old_block_names, new_block_names)), inplace=True)
-            
+            iat_data = iat_data.rename(columns=dict(zip(old_block_names, new_block_names)))
+        return iat_data
+
     def __repr__(self):
         return f"{self.__class__.__name__}('data_file', grouped_by={self.grouped_by}, " \
                f"trial_response_separator={self.trial_response_separator!r}, " \
                f"suffix_responses={self.suffix_responses!r}, " \
                f"suffix_trials={self.suffix_trials!r}, " \
                f"suffix_conditions={self.suffix_conditions!r}, " \
-               f"congruency_labels={self.congruency_labels})"
+               f"congruency_labels={self.congruency_labels}, " \
+               f"suffix_timing={self.suffix_timing!r})"
+
+    @property
+    def _suffices(self):
+        """The suffixes of the embedded fields of the IAT data"""
+        return self.suffix_responses, self.suffix_trials, self.suffix_conditions, self.suffix_timing
+        
+    @staticmethod
+    def _is_excel_file(data_file):
+        """Whether the data file is an Excel workbook, judging from its path or its name for the uploaded files"""
+        file_name = str(data_file) if isinstance(data_file, (str, Path)) else getattr(data_file, "name", "")
+        return Path(str(file_name)).suffix.lower() in (".xlsx", ".xlsm")
+    
+    def _read_excel_data(self, data_file):
+        """Read the IAT data from the first sheet of an Excel workbook
+        The sheet is streamed row by row in the read-only mode, and only the session identifier column and
+        the columns of the embedded IAT data are kept, so the workbook is never fully loaded into the memory.
+        :param data_file: Union[str, Path, file-like], the Excel workbook
+        :return DataFrame, the IAT-relevant columns of the survey responses
+        :raise ValueError when the session identifier column isn't found
+        """
+        import openpyxl
         
-    def _transpose_block_wide_to_long(self, suffix, separator, trial_data_name):
+        workbook = openpyxl.load_workbook(data_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, ())
+            suffices = self._suffices
+            column_indices = [i for i, x in enumerate(header) if isinstance(x, str) and
+                              (x == self.grouped_by[1] or x.endswith(suffices))]
+            id_positions = [i for i, x in enumerate(column_indices) if header[x] == self.grouped_by[1]]
+            if not id_positions:
+                raise ValueError(f"No column named {self.grouped_by[1]} was found in the workbook")
+            id_position = id_positions[0]
+            # Skip the rows that aren't the responses, such as the question texts below the header
+            iat_rows = [
+                selected_row for selected_row in (tuple(row[i] if i < len(row) else None for i in column_indices)
+                                                  for row in rows)
+                if isinstance(selected_row[id_position], str) and selected_row[id_position].startswith('R_')
+            ]
+        finally:
+            workbook.close()
+        return pd.DataFrame(iat_rows, columns=[header[i] for i in column_indices])
+    
+    def _transpose_block_wide_to_long(self, wide_data, suffix, separator, trial_data_name):
         """Transpose block data from the wide format to the long format, trial responses and stimuli
+        :param wide_data: DataFrame, the wide-format responses to be processed
         :param suffix: str, determine the columns to be processed
         :param separator: str, the separator between consecutive trials
         :param trial_data_name: str, the trial data column name
         :return DataFrame, the transposed DataFrame
         :raise ValueError when found no columns for the responses data"""
-        block_cols = [x for x in self.iat_data.columns if x.endswith(suffix)]
+        block_cols = [x for x in wide_data.columns if x.endswith(suffix)]
         if not block_cols:
-            if suffix == self.suffix_trials:
-                # it can happen when the researchers don't record the trial stimuli data
+            if suffix in (self.suffix_trials, self.suffix_timing):
+                # it can happen when the researchers don't record the trial stimuli or timing data
                 return pd.DataFrame(
                     columns=[*reversed(self.grouped_by), "block_number", "trial_number", trial_data_name])
             else:
                 raise ValueError("No columns were found for the responses data")
             
-        block_wide = self.iat_data.melt(
+        block_wide = wide_data.melt(
             id_vars=self.grouped_by[1],
             value_vars=block_cols,
             value_name="block_data",
             var_name="block_counter"
         ).dropna()
+        # The blocks saved with the compact encoding are decoded separately by _decode_packed_blocks
+        block_wide = block_wide[~block_wide["block_data"].astype(str).str.startswith(_packed_data_marker)]
+        if block_wide.empty:
+            return pd.DataFrame(columns=[*reversed(self.grouped_by), "block_number", "trial_number", trial_data_name])
         block_wide[self.grouped_by[0]] = block_wide["block_counter"].str[:-len(f"block1{suffix}") - 1]
         block_wide["block_number"] = block_wide["block_counter"].str[-len(suffix) - 1].map(int)
         trial_data = block_wide['block_data'].str.split(separator, expand=True)
@@ -92,9 +203,71 @@ class IATData:
         ).dropna()
         return block_long
     
-    def _transpose_block_conditions(self, study):
+    def _decode_packed_blocks(self, wide_data, suffix):
+        """Decode the blocks saved with the compact encoding to the long format, all trials at once with NumPy
+        :param wide_data: DataFrame, the wide-format responses to be processed
+        :param suffix: str, the suffix of the responses or the trials fields
+        :return DataFrame, the trials' identifiers with the trial_correct and reaction_time columns for the responses,
+            or the trial_stimulus column for the trials
+        :raise ValueError when the packed data or the stimulus indices are invalid
+        """
+        id_columns = [*reversed(self.grouped_by), "block_number", "trial_number"]
+        is_responses = suffix == self.suffix_responses
+        data_columns = ["trial_correct", "reaction_time"] if is_responses else ["trial_stimulus"]
+        block_cols = [x for x in wide_data.columns if x.endswith(suffix)]
+        block_wide = wide_data.melt(
+            id_vars=self.grouped_by[1],
+            value_vars=block_cols,
+            value_name="block_data",
+            var_name="block_counter"
+        ).dropna() if block_cols else pd.DataFrame(columns=["block_data"])
+        block_wide = block_wide[block_wide["block_data"].astype(str).str.startswith(_packed_data_marker)]
+        if block_wide.empty:
+            return pd.DataFrame(columns=[*id_columns, *data_columns])
+        
+        block_data = block_wide["block_data"].str[len(_packed_data_marker):]
+        if is_responses:
+            byte_widths = np.full(len(block_data), 3)
+        else:
+            # The trials start with the byte width of the stimulus indices
+            byte_widths = pd.to_numeric(block_data.str[0], errors="coerce").to_numpy()
+            if not np.isin(byte_widths, (1, 2)).all():
+                raise ValueError("can't decode the compactly encoded trials")
+            byte_widths = byte_widths.astype(int)
+            block_data = block_data.str[1:]
+        decoded_blocks = list()
+        for byte_width in np.unique(byte_widths):
+            width_selected = byte_widths == byte_width
+            values, counts = _unpack_values(block_data[width_selected].tolist(), byte_width)
+            block_ids = block_wide.loc[width_selected, [self.grouped_by[1], "block_counter"]].to_numpy()
+            decoded_block = pd.DataFrame(np.repeat(block_ids, counts, axis=0),
+                                         columns=[self.grouped_by[1], "block_counter"])
+            block_starts = np.repeat(np.cumsum(counts) - counts, counts)
+            decoded_block["trial_number"] = np.arange(len(values)) - block_starts + 1
+            decoded_block["value"] = values
+            decoded_blocks.append(decoded_block)
+        decoded_data = pd.concat(decoded_blocks, ignore_index=True)
+        decoded_data[self.grouped_by[0]] = decoded_data["block_counter"].str[:-len(f"block1{suffix}") - 1]
+        decoded_data["block_number"] = decoded_data["block_counter"].str[-len(suffix) - 1].map(int)
+        
+        values = decoded_data.pop("value").to_numpy()
+        if is_responses:
+            # The missing responses have all bits set
+            decoded_data = decoded_data[values != _packed_missing_response]
+            values = values[values != _packed_missing_response]
+            decoded_data["trial_correct"] = np.where(values & 1, "Y", "N")
+            decoded_data["reaction_time"] = values >> 1
+        elif self.stimulus_table is not None:
+            if len(values) and values.max() >= len(self.stimulus_table):
+                raise ValueError("The stimulus indices are out of the range of the stimulus table")
+            decoded_data["trial_stimulus"] = np.asarray(self.stimulus_table, dtype=object)[values]
+        else:
+            decoded_data["trial_stimulus"] = values.astype(str)
+        return decoded_data[[*id_columns, *data_columns]]
+    
+    def _transpose_block_conditions(self, wide_data, study):
         """Create the block conditions by study"""
-        condition_data = self.iat_data[[self.grouped_by[1], f"{study}_{self.suffix_conditions}"]].copy()
+        condition_data = wide_data[[self.grouped_by[1], f"{study}_{self.suffix_conditions}"]].copy()
         study_conditions = condition_data[f"{study}_{self.suffix_conditions}"].str.split("|", expand=True)
         block_counters = [x + 1 for x in study_conditions.columns]
         condition_data[block_counters] = study_conditions
@@ -113,11 +286,128 @@ class IATData:
             ValueError, when the response can't be casted
             AssertionError, when the trial number isn't the same from the trial number generated from its positioning
         """
-        
+        self.iat_data_clean = self._clean_up_wide(self.iat_data)
+        return self.iat_data_clean
+    
+    def iter_sessions(self, algorithm=None, chunk_size=1000):
+        """Iterate over the IAT sessions lazily, reading and parsing the raw responses one chunk at a time
+        When the data file is read lazily, a CSV file is read in chunks, so only one chunk of rows is in the memory.
+        :param algorithm: Union[None, IATAlgorithm], the algorithm used to score each session, if specified
+        :param chunk_size: int, the number of the raw response rows read and scored together
+        :return generator, yielding tuple (tuple, DataFrame, Union[None, Series]), the session's identifiers,
+            e.g., (study, ResponseId), its cleaned trial-level data, and its scored data when the algorithm is set
+        :raise
+            ValueError, when the response can't be casted
+            AssertionError, when the trial number isn't the same from the trial number generated from its positioning
+        """
+        if self._iat_data is None:
+            data_chunks = (self._select_responses(x) for x in self._read_csv_data(chunksize=chunk_size))
+        else:
+            data_chunks = (self._iat_data.iloc[i:i + chunk_size] for i in range(0, len(self._iat_data), chunk_size))
+        for data_chunk in data_chunks:
+            chunk_sessions = list()
+            for row in data_chunk.to_dict("records"):
+                for study in sorted(self.studies):
+                    block_conditions = row.get(f"{study}_{self.suffix_conditions}")
+                    if not isinstance(block_conditions, str):
+                        continue
+                    block_responses = {x: row.get(f"{study}_block{x}{self.suffix_responses}")
+                                       for x in range(1, block_conditions.count("|") + 2)}
+                    trials = _parse_session_trials(block_responses, block_conditions,
+                                                   self.trial_response_separator, self.congruency_labels)
+                    if len(trials["block_number"]):
+                        session_key = (study, row[self.grouped_by[1]])
+                        chunk_sessions.append((session_key, trials, self._session_trial_data(
+                            session_key, row, block_conditions, trials)))
+            session_scores = [None] * len(chunk_sessions)
+            if algorithm is not None:
+                session_scores = algorithm._score_parsed_sessions([trials for _, trials, _ in chunk_sessions])
+            for (session_key, _, session_data), session_score in zip(chunk_sessions, session_scores):
+                if session_score is not None:
+                    session_score = pd.Series({**dict(zip(self.grouped_by, session_key)), **session_score})
+                yield session_key, session_data, session_score
+
+    def _session_trial_data(self, session_key, row, block_conditions, trials):
+        """Create a session's cleaned trial-level data, the same as its rows of the data cleaned up by clean_up
+        :param session_key: tuple, the session's identifiers, (study, ResponseId)
+        :param row: dict, the session's raw response row
+        :param block_conditions: str, the session's blockConditions string
+        :param trials: dict, the session's trial arrays parsed by _parse_session_trials
+        :return DataFrame, the session's trial-level data
+        """
+        study = session_key[0]
+        block_number, trial_number = trials["block_number"], trials["trial_number"]
+        session_data = pd.DataFrame({
+            self.grouped_by[1]: session_key[1],
+            self.grouped_by[0]: study,
+            "block_number": block_number,
+            "trial_number": trial_number
+        })
+        block_fields = {suffix: {x: row.get(f"{study}_block{x}{suffix}") for x in np.unique(block_number)}
+                        for suffix in (self.suffix_trials, self.suffix_timing)}
+        if any(isinstance(x, str) for x in block_fields[self.suffix_trials].values()):
+            block_stimuli = {x: self._split_block_stimuli(value)
+                             for x, value in block_fields[self.suffix_trials].items() if isinstance(value, str)}
+            session_data["trial_stimulus"] = [
+                block_stimuli[x][y - 1] if x in block_stimuli and y <= len(block_stimuli[x]) else np.nan
+                for x, y in zip(block_number, trial_number)
+            ]
+        session_data["trial_correct"] = np.where(trials["trial_correct"], "Y", "N")
+        session_data["reaction_time"] = trials["reaction_time"].astype(int)
+        session_data["block_condition"] = np.array(block_conditions.split("|"), dtype=object)[block_number - 1]
+        session_data["task"] = trials["task"]
+        session_data["task_block_counter"] = trials["task_block_counter"]
+        session_data = session_data.dropna().reset_index(drop=True)
+        # The timing diagnostics are optional, and the trials without them have missing values
+        if any(f"{study}_block{x}{self.suffix_timing}" in row for x in block_fields[self.suffix_timing]):
+            block_timing = {x: value.split(self.trial_response_separator)
+                            for x, value in block_fields[self.suffix_timing].items() if isinstance(value, str)}
+            trial_timing = pd.Series([
+                block_timing[x][y - 1] if x in block_timing and y <= len(block_timing[x]) else np.nan
+                for x, y in zip(session_data["block_number"], session_data["trial_number"])
+            ], dtype=object).str.split(":", n=1, expand=True).reindex(columns=[0, 1])
+            session_data["onset_lag"] = pd.to_numeric(trial_timing[0], errors="coerce").astype(float)
+            session_data["dropped_frames"] = pd.to_numeric(trial_timing[1], errors="coerce").astype(float)
+        return session_data
+
+    def _split_block_stimuli(self, block_data):
+        """Split a block's trial stimuli, which are separated by commas or saved with the compact encoding"""
+        if not block_data.startswith(_packed_data_marker):
+            return block_data.split(",")
+        byte_width = block_data[len(_packed_data_marker):len(_packed_data_marker) + 1]
+        if byte_width not in ("1", "2"):
+            raise ValueError("can't decode the compactly encoded trials")
+        values, _ = _unpack_values([block_data[len(_packed_data_marker) + 1:]], int(byte_width))
+        if self.stimulus_table is None:
+            return values.astype(str).tolist()
+        if len(values) and values.max() >= len(self.stimulus_table):
+            raise ValueError("The stimulus indices are out of the range of the stimulus table")
+        return [self.stimulus_table[x] for x in values]
+
+    def fingerprint(self):
+        """Compute a stable fingerprint of the cleaned data and the parsing options, which changes with the data
+        :return str, the hexadecimal SHA-256 digest
+        :raise ValueError when the data haven't been cleaned up
+        """
+        if self.iat_data_clean is None:
+            raise ValueError("Please clean up the data before computing its fingerprint")
+        data_hash = hashlib.sha256(repr(self).encode())
+        data_hash.update(repr(sorted(self.studies)).encode())
+        data_hash.update(repr(list(self.iat_data_clean.columns)).encode())
+        data_hash.update(pd.util.hash_pandas_object(self.iat_data_clean, index=False).values.tobytes())
+        return data_hash.hexdigest()
+    
+    def _clean_up_wide(self, wide_data):
+        """Clean up the wide-format IAT data responses
+        :param wide_data: DataFrame, the wide-format responses, all or a subset of the rows of iat_data
+        :return The cleaned up trial-level DataFrame
+        """
         latency_data = self._transpose_block_wide_to_long(
-            self.suffix_responses, self.trial_response_separator, "trial_response")
-        stimulus_data = self._transpose_block_wide_to_long(
-            self.suffix_trials, ",", "trial_stimulus")
+            wide_data, self.suffix_responses, self.trial_response_separator, "trial_response")
+        stimulus_data = pd.concat([
+            self._transpose_block_wide_to_long(wide_data, self.suffix_trials, ",", "trial_stimulus"),
+            self._decode_packed_blocks(wide_data, self.suffix_trials)
+        ], ignore_index=True)
         if not stimulus_data.empty:
             trial_data = latency_data.merge(stimulus_data,
                                             on=[*reversed(self.grouped_by), "block_number", "trial_number"])
@@ -136,13 +426,26 @@ class IATData:
             return pd.Series(scored_data)
         
         trial_cols = 'trial_counter trial_correct reaction_time'.split()
-        trial_data[trial_cols] = trial_data['trial_response'].apply(_score_trial_response)
+        if trial_data.empty:
+            trial_data = trial_data.reindex(columns=[*trial_data.columns, *trial_cols])
+        else:
+            trial_data[trial_cols] = trial_data['trial_response'].apply(_score_trial_response)
         trial_number_error_msg = "Split trial numbers are different from the trial number prefixes in the " \
                                  "block responses."
         assert pd.Series((trial_data["trial_number"] != trial_data["trial_counter"])).sum() == 0, trial_number_error_msg
+        
+        packed_latency_data = self._decode_packed_blocks(wide_data, self.suffix_responses)
+        if not packed_latency_data.empty:
+            if not stimulus_data.empty:
+                packed_latency_data = packed_latency_data.merge(
+                    stimulus_data, on=[*reversed(self.grouped_by), "block_number", "trial_number"])
+            packed_latency_data[["trial_counter", "trial_response"]] = np.nan
+            packed_latency_data = packed_latency_data[trial_data.columns]
+            trial_data = packed_latency_data if trial_data.empty else \
+                pd.concat([trial_data, packed_latency_data], ignore_index=True)
 
         conditions = {label: x for x, labels in self.congruency_labels.items() for label in labels}
-        block_conditions = pd.concat([self._transpose_block_conditions(study) for study in self.studies])
+        block_conditions = pd.concat([self._transpose_block_conditions(wide_data, study) for study in self.studies])
         block_conditions["task"] = block_conditions["block_condition"].map(
             lambda x: conditions.get(x, "sin")
         )
@@ -150,10 +453,53 @@ class IATData:
             cumcount().map(lambda x: x+1)
         
         trial_merged = trial_data.merge(block_conditions, on=[*reversed(self.grouped_by), "block_number"])
-        
-        self.iat_data_clean = trial_merged.drop(["trial_counter", "trial_response"], axis=1).sort_values(
+        trial_merged = trial_merged.drop(["trial_counter", "trial_response"], axis=1).sort_values(
             by=[*self.grouped_by, "block_number"]).dropna().reset_index(drop=True)
-        return self.iat_data_clean
+        
+        timing_data = self._transpose_block_wide_to_long(
+            wide_data, self.suffix_timing, self.trial_response_separator, "trial_timing")
+        if timing_data.empty:
+            return trial_merged
+        # The timing diagnostics are optional, and the trials without them have missing values
+        trial_timing = timing_data["trial_timing"].str.split(":", n=1, expand=True).reindex(columns=[0, 1])
+        timing_data["onset_lag"] = pd.to_numeric(trial_timing[0], errors="coerce")
+        timing_data["dropped_frames"] = pd.to_numeric(trial_timing[1], errors="coerce")
+        return trial_merged.merge(
+            timing_data.drop("trial_timing", axis=1), how="left",
+            on=[*reversed(self.grouped_by), "block_number", "trial_number"]
+        )
+    
+    def timing_quality(self, max_median_onset_lag=34, max_dropped_frame_rate=0.1):
+        """Summarize the timing diagnostics of each session recorded by the precision timing
+        :param max_median_onset_lag: int, float, the maximum acceptable median onset lag in ms, about two frames
+        :param max_dropped_frame_rate: float, the maximum acceptable proportion of the trials with dropped frames
+        :return DataFrame, the session-level numbers of timed trials, the mean, median, and maximum onset lags,
+            the total dropped frames, the proportion of the trials with dropped frames, and whether the timing is
+            acceptable, which is missing for the sessions without the timing data
+        :raise ValueError when the data haven't been cleaned up
+        """
+        if self.iat_data_clean is None:
+            raise ValueError("Please clean up the data before summarizing its timing quality")
+        quality_columns = [*self.grouped_by, "timed_trials", "onset_lag_mean", "onset_lag_median", "onset_lag_max",
+                           "dropped_frames_total", "dropped_frame_rate", "timing_acceptable"]
+        if "onset_lag" not in self.iat_data_clean.columns:
+            return pd.DataFrame(columns=quality_columns)
+        dropped_frames = self.iat_data_clean["dropped_frames"]
+        timed_data = self.iat_data_clean.assign(
+            has_dropped_frames=dropped_frames.gt(0).astype(float).where(dropped_frames.notna()))
+        timing_quality = timed_data.groupby(list(self.grouped_by)).agg(
+            timed_trials=("onset_lag", "count"),
+            onset_lag_mean=("onset_lag", "mean"),
+            onset_lag_median=("onset_lag", "median"),
+            onset_lag_max=("onset_lag", "max"),
+            dropped_frames_total=("dropped_frames", "sum"),
+            dropped_frame_rate=("has_dropped_frames", "mean")
+        ).reset_index()
+        timing_quality["timing_acceptable"] = (
+            (timing_quality["onset_lag_median"] <= max_median_onset_lag) &
+            (timing_quality["dropped_frame_rate"] <= max_dropped_frame_rate)
+        ).where(timing_quality["timed_trials"] > 0)
+        return timing_quality[quality_columns]
 
 
 class IATAlgorithmName(Enum):
@@ -179,12 +525,160 @@ class IATErrorPenalty(Enum):
             return "Use latency to correct responses when correction is required after an error"
 
 
+_trial_response_pattern = re.compile(r"(\d+)([YN])(\d+)")
+# The compactly encoded block data start with the marker, and the missing responses are saved with all bits set
+_packed_data_marker = "~"
+_packed_missing_response = 0xFFFFFF
+
+
+def _unpack_values(packed_blocks, byte_width):
+    """Unpack the base64-encoded blocks of the fixed-width big-endian values
+    :param packed_blocks: list[str], the base64 text of each block
+    :param byte_width: int, the number of bytes of each value
+    :return tuple, (ndarray, ndarray), the values of all blocks in order, and the number of values in each block
+    :raise ValueError when the blocks aren't valid base64 text of whole values
+    """
+    try:
+        block_bytes = [base64.b64decode(x, validate=True) for x in packed_blocks]
+    except (binascii.Error, TypeError):
+        raise ValueError("can't decode the compactly encoded data")
+    counts = np.array([len(x) for x in block_bytes], dtype=int)
+    if np.any(counts % byte_width):
+        raise ValueError("can't decode the compactly encoded data")
+    raw_values = np.frombuffer(b"".join(block_bytes), dtype=np.uint8).reshape(-1, byte_width)
+    values = raw_values.astype(np.int64) @ (256 ** np.arange(byte_width - 1, -1, -1, dtype=np.int64))
+    return values, counts // byte_width
+
+
+def _parse_session_trials(block_responses,
+                          block_conditions,
+                          trial_response_separator="_",
+                          congruency_labels=None):
+    """Parse one session's embedded data into trial-level arrays, following the same rules as IATData.clean_up
+    :param block_responses: Union[list, dict], the blockNResponses strings in the block order, or by block numbers
+    :param block_conditions: str, the blockConditions string, such as "px|x+|p+|p+|x-|p-|p-"
+    :param trial_response_separator: str, the separator between responses in the embedded data
+    :param congruency_labels: Union[None, dict], the labels by congruency
+    :return dict, the arrays of block_number, trial_number, trial_correct (bool), reaction_time, task,
+        and task_block_counter, one element per trial
+    :raise
+        ValueError, when the response can't be casted
+        AssertionError, when the trial number isn't the same from the trial number generated from its positioning
+    """
+    if not congruency_labels:
+        congruency_labels = {"con": ("p+", "n-"), "inc": ("p-", "n+")}
+    conditions = {label: x for x, labels in congruency_labels.items() for label in labels}
+    block_tasks = dict()
+    task_block_counters = dict()
+    for block_number, block_condition in enumerate(block_conditions.split("|"), start=1):
+        task = conditions.get(block_condition, "sin")
+        block_tasks[block_number] = task
+        task_block_counters[block_number] = sum(x == task for x in block_tasks.values())
+    
+    if not isinstance(block_responses, dict):
+        block_responses = dict(enumerate(block_responses, start=1))
+    block_numbers, trial_numbers, trial_counters, trial_corrects, reaction_times = [], [], [], [], []
+    for block_number, block_data in block_responses.items():
+        if not isinstance(block_data, str) or block_number not in block_tasks:
+            continue
+        if block_data.startswith(_packed_data_marker):
+            values, _ = _unpack_values([block_data[len(_packed_data_marker):]], 3)
+            responded = values != _packed_missing_response
+            block_trial_numbers = np.arange(1, len(values) + 1)[responded]
+            values = values[responded]
+            parsed_trials = list(zip(block_trial_numbers, np.where(values & 1, "Y", "N"), values >> 1))
+        else:
+            parsed_trials = _trial_response_pattern.findall(block_data)
+            block_trial_numbers = range(1, len(parsed_trials) + 1)
+            if trial_response_separator.join(map("".join, parsed_trials)) != block_data:
+                # Handle the irregular responses one by one, only the literal None is a missing response
+                parsed_trials, block_trial_numbers = [], []
+                for trial_number, x in enumerate(block_data.split(trial_response_separator), start=1):
+                    if x == "None":
+                        continue
+                    correct_index = max(x.find("Y"), x.find("N"))
+                    if correct_index < 1:
+                        raise ValueError("can't cast the response")
+                    parsed_trials.append((x[:correct_index], x[correct_index], x[correct_index + 1:]))
+                    block_trial_numbers.append(trial_number)
+        if not parsed_trials:
+            continue
+        block_counters, block_corrects, block_reaction_times = zip(*parsed_trials)
+        block_numbers.append(np.full(len(parsed_trials), block_number))
+        trial_numbers.extend(block_trial_numbers)
+        trial_counters.extend(block_counters)
+        trial_corrects.extend(block_corrects)
+        reaction_times.extend(block_reaction_times)
+    
+    try:
+        trial_counters = np.array(trial_counters, dtype=int)
+        reaction_times = np.array(reaction_times, dtype=int).astype(float)
+    except ValueError:
+        raise ValueError("can't cast the response")
+    trial_numbers = np.array(trial_numbers, dtype=int)
+    assert (trial_counters == trial_numbers).all(), \
+        "Split trial numbers are different from the trial number prefixes in the block responses."
+    block_numbers = np.concatenate(block_numbers) if block_numbers else np.array([], dtype=int)
+    return {
+        "block_number": block_numbers,
+        "trial_number": trial_numbers,
+        "trial_correct": np.array(trial_corrects, dtype=str) == "Y",
+        "reaction_time": reaction_times,
+        "task": np.array([block_tasks[x] for x in block_tasks])[block_numbers - 1],
+        "task_block_counter": np.array([task_block_counters[x] for x in block_tasks])[block_numbers - 1]
+    }
+
+
+class _SessionReducer:
+    """Reduce the trial arrays of many sessions by session, e.g., the count or mean of the selected trials"""
+    def __init__(self, session, session_count):
+        self.session = session
+        self.session_count = session_count
+
+    def count(self, selected=None):
+        """The number of the selected trials of each session"""
+        session = self.session if selected is None else self.session[selected]
+        return np.bincount(session, minlength=self.session_count)
+
+    def mean(self, values, selected):
+        """The mean of the selected values of each session, NaN when no values are selected"""
+        value_sum = np.bincount(self.session[selected], weights=values[selected], minlength=self.session_count)
+        value_count = self.count(selected)
+        return np.where(value_count > 0, value_sum / np.maximum(value_count, 1), np.nan)
+
+    def std(self, values, selected):
+        """The sample standard deviation (ddof=1) of the selected values of each session, NaN for fewer than two"""
+        value_count = self.count(selected)
+        deviations = values[selected] - self.mean(values, selected)[self.session[selected]]
+        squares_sum = np.bincount(self.session[selected], weights=deviations ** 2, minlength=self.session_count)
+        return np.where(value_count > 1, np.sqrt(squares_sum / np.maximum(value_count - 1, 1)), np.nan)
+
+
+# The number of sessions scored together between the progress reports
+_scoring_chunk_size = 500
+
+
+def _report_progress(progress_callback, stage, fraction):
+    """Report the progress to the callback, if it's specified"""
+    if progress_callback is not None:
+        progress_callback(stage, fraction)
+
+
 class IATAlgorithm:
     """Data model for the algorithm used in IAT data scoring"""
+    # The names of the keyword parameters that each algorithm supports
+    supported_params = {
+        IATAlgorithmName.CONVENTIONAL.value: ("included_blocks", "rt_low_cutoff", "rt_high_cutoff", "recode_outliers",
+                                              "trials_to_drop", "allowed_error_rate", "allowed_rt_upper"),
+        IATAlgorithmName.IMPROVED.value: ("included_blocks", "rt_low_cutoff", "rt_high_cutoff", "allowed_fast_rate",
+                                          "use_all_trials", "rt_delete_cutoff", "pooled_sd_using_all",
+                                          "replacement_option", "rt_punishment")
+    }
+
     def __init__(self, name, **params):
         """Initialize the instance for the algorithm
         :param name: str, the name of the algorithm
-        :param params: dict, additional parameters for the algorithm
+        :param params: dict, additional parameters for the algorithm, whose names are in supported_params[name]
             When the algorithm is conventional, the following keyword parameters are supported:
                 included_blocks: list, the blocks to be used for scoring
                 rt_low_cutoff: int, float, the reaction time low cutoff
@@ -204,6 +698,7 @@ class IATAlgorithm:
                 pooled_sd_using_all: bool, whether to use all trials or only the correct trials to calculate SD
                 replacement_option: IATErrorPenalty or 0, 1, 2, how to replace error trials
                 rt_punishment: int or float, the penalty adjustment for error trials
+        :raise ValueError when the algorithm or any of the parameters isn't supported
             """
         self.name = name
         self.iat_data = None
@@ -225,7 +720,13 @@ class IATAlgorithm:
             self.pooled_sd_using_all = params.get("pooled_sd_using_all", True)
             self.replacement_option = params.get("replacement_option", IATErrorPenalty.ABSOLUTE.value)
             self.rt_punishment = params.get("rt_punishment", 600)
-            
+        else:
+            raise ValueError(f"The algorithm isn't supported: {name}")
+        unsupported_params = sorted(set(params) - set(self.supported_params[name]))
+        if unsupported_params:
+            raise ValueError(f"The parameters aren't supported by the {name} algorithm: "
+                             f"{', '.join(unsupported_params)}")
+
     def __repr__(self):
         """Define the string representation of the instance"""
         params = self.__dict__.copy()
@@ -254,10 +755,11 @@ Pooled SD: {"Using all trials" if self.pooled_sd_using_all else "Using correct t
 Error Trial Replacement: {IATErrorPenalty(self.replacement_option).description}\n
 Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
     
-    def _calculate_reliability(self, trial_data, scored_iat_df=None):
+    def _calculate_reliability(self, trial_data, scored_iat_df=None, progress_callback=None):
         """Calculate the reliability of the IAT measure
         :param trial_data: DataFrame, the trial level data
         :param scored_iat_df: DataFrame, the scored IAT DataFrame, only applies for the improved algorithm
+        :param progress_callback: Union[None, callable], called with the stage and the completed fraction
         """
         reliability_scores = list()
         
@@ -271,15 +773,15 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
         
         if self.name == IATAlgorithmName.CONVENTIONAL.name.lower():
             used_column = "iat_score_logged"
-            _algorithm = self._process_data_conventional
         else:
             used_column = "iat_score"
-            _algorithm = self._process_data_improved
             reliability_scores.append(_compute_reliability_score(scored_iat_df, "iat_score_1", "iat_score_2"))
         
         used_columns = [*self.iat_data.grouped_by, used_column]
-        _, odd_scored_iat_df = _algorithm(trial_data[trial_data["trial_number"] % 2 == 1])
-        _, even_scored_iat_df = _algorithm(trial_data[trial_data["trial_number"] % 2 == 0])
+        odd_scored_iat_df = self._score_responses_by_chunks(
+            trial_data[trial_data["trial_number"] % 2 == 1], progress_callback, "Estimating the reliability", 0.5, 0.75)
+        even_scored_iat_df = self._score_responses_by_chunks(
+            trial_data[trial_data["trial_number"] % 2 == 0], progress_callback, "Estimating the reliability", 0.75, 1.0)
         odd_even_iat = odd_scored_iat_df[used_columns].merge(
             even_scored_iat_df[used_columns],
             on=self.iat_data.grouped_by,
@@ -288,13 +790,50 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
         reliability_scores.append(_compute_reliability_score(odd_even_iat, f"{used_column}_odd", f"{used_column}_even"))
         
         return reliability_scores
+
+    def _score_responses_by_chunks(self, trial_data, progress_callback, stage, start_fraction, end_fraction):
+        """Score the responses by chunks of sessions, and report the progress after each chunk
+        The callback can stop the scoring between the chunks, e.g., when the job is cancelled.
+        :param trial_data: DataFrame, the trial-level data to be scored
+        :param progress_callback: Union[None, callable], called with the stage and the completed fraction
+        :param stage: str, the stage reported to the callback
+        :param start_fraction: float, the completed fraction before the scoring
+        :param end_fraction: float, the completed fraction after the scoring
+        :return DataFrame, the scored response-level data, the same as scoring all sessions together
+        """
+        if self.name == IATAlgorithmName.CONVENTIONAL.value:
+            _score_responses = self._score_responses_conventional
+        else:
+            _score_responses = self._score_responses_improved
+        _report_progress(progress_callback, stage, start_fraction)
+        session_codes = trial_data.groupby(list(self.iat_data.grouped_by), sort=True).ngroup().to_numpy()
+        session_count = int(session_codes.max()) + 1 if len(session_codes) else 0
+        if session_count <= _scoring_chunk_size:
+            scored_iat_df = _score_responses(trial_data)
+            _report_progress(progress_callback, stage, end_fraction)
+            return scored_iat_df
+        
+        # Sort the trials by session, keeping their order in each session, so each chunk is a slice
+        trial_order = np.argsort(session_codes, kind="stable")
+        chunk_starts = np.arange(0, session_count, _scoring_chunk_size)
+        chunk_bounds = np.searchsorted(session_codes[trial_order], [*chunk_starts, session_count])
+        scored_chunks = list()
+        for chunk_index, (chunk_start, chunk_end) in enumerate(zip(chunk_bounds[:-1], chunk_bounds[1:]), start=1):
+            scored_chunks.append(_score_responses(trial_data.iloc[trial_order[chunk_start:chunk_end]]))
+            _report_progress(progress_callback, stage,
+                             start_fraction + (end_fraction - start_fraction) * chunk_index / len(chunk_starts))
+        return pd.concat(scored_chunks, ignore_index=True)
     
-    def _apply_conventional(self):
+    def _apply_conventional(self, progress_callback=None):
         """Apply the conventional algorithm
+        :param progress_callback: Union[None, callable], called with the stage and the completed fraction
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
         trial_data = self.iat_data.iat_data_clean
-        summary_df, scored_iat_df = self._process_data_conventional(trial_data)
-        summary_df["reliability_by_odd_even"] = self._calculate_reliability(trial_data)
+        scored_iat_df = self._score_responses_by_chunks(
+            trial_data, progress_callback, "Scoring the responses", 0.0, 0.5)
+        summary_df = self._summarize_conventional(scored_iat_df)
+        summary_df["reliability_by_odd_even"] = self._calculate_reliability(
+            trial_data, progress_callback=progress_callback)
         summary_df["reliability_by_odd_even"] = pd.to_numeric(summary_df["reliability_by_odd_even"], errors='coerce')
         return self._clean_up_scored_data(summary_df, scored_iat_df)
     
@@ -315,6 +854,13 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
         """Process data using the conventional algorithm
         :param trial_data: DataFrame, the trial-level data to be scored
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
+        scored_iat_df = self._score_responses_conventional(trial_data)
+        return self._summarize_conventional(scored_iat_df), scored_iat_df
+
+    def _score_responses_conventional(self, trial_data: pd.DataFrame):
+        """Score the responses using the conventional algorithm, each session is scored independently
+        :param trial_data: DataFrame, the trial-level data to be scored
+        :return DataFrame, the scored response-level data"""
         iat_data_report, grouped_by = self._process_data_shared(trial_data)
         
         # Use the needed blocks and trials
@@ -361,11 +907,21 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
             values=['rt_recoded', 'rt_logged']
         ).reset_index()
         calculated_iat.columns = [x[0] + '_' + x[1] if x[1] else x[0] for x in calculated_iat.columns]
+        # The task columns are missing when no sessions are included, e.g., when scoring a single session
+        for column in ("rt_recoded_con", "rt_recoded_inc", "rt_logged_con", "rt_logged_inc"):
+            if column not in calculated_iat.columns:
+                calculated_iat[column] = np.nan
         
         calculated_iat['iat_score_raw'] = calculated_iat['rt_recoded_inc'] - calculated_iat['rt_recoded_con']
         calculated_iat['iat_score_logged'] = calculated_iat['rt_logged_inc'] - calculated_iat['rt_logged_con']
         
-        scored_iat_df = iat_data_report.reset_index().merge(calculated_iat, how="left", on=grouped_by)
+        return iat_data_report.reset_index().merge(calculated_iat, how="left", on=grouped_by)
+
+    @staticmethod
+    def _summarize_conventional(scored_iat_df):
+        """Summarize the responses scored by the conventional algorithm by study
+        :param scored_iat_df: DataFrame, the scored response-level data
+        :return DataFrame, the scored summary"""
         summary_gb = scored_iat_df.groupby("study")
         summary_df = summary_gb.agg(
             trial_count_all_blocks=("total_trial_count", sum),
@@ -401,12 +957,19 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
             rt_log_inc_max=("rt_logged_inc", np.max),
             rt_log_inc_sd=("rt_logged_inc", np.std)
         )
-        return summary_df, scored_iat_df
+        return summary_df
     
     def _process_data_improved(self, trial_data: pd.DataFrame):
         """Process data using the improved algorithm
         :param trial_data: DataFrame, the trial-level data to be scored
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
+        scored_iat_df = self._score_responses_improved(trial_data)
+        return self._summarize_improved(scored_iat_df), scored_iat_df
+
+    def _score_responses_improved(self, trial_data: pd.DataFrame):
+        """Score the responses using the improved algorithm, each session is scored independently
+        :param trial_data: DataFrame, the trial-level data to be scored
+        :return DataFrame, the scored response-level data"""
         iat_data_report, grouped_by = self._process_data_shared(trial_data)
         
         # Use the needed blocks
@@ -485,6 +1048,10 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
             columns=['task']
         ).reset_index()
         iat_scores_task.columns = [x[0] + '_' + x[1] if x[1] else x[0] for x in iat_scores_task.columns]
+        # The task columns are missing when no sessions are included, e.g., when scoring a single session
+        for column in ("rt_recoded_con", "rt_recoded_inc"):
+            if column not in iat_scores_task.columns:
+                iat_scores_task[column] = np.nan
     
         pooled_std = (used_data if self.pooled_sd_using_all else used_data[used_data['trial_correct'] == "Y"]). \
             groupby([*grouped_by, 'task_block_counter'])['reaction_time'].std().rename('pooled_std').reset_index()
@@ -499,18 +1066,21 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
         ).reset_index()
     
         iat_scores_session.columns = [f"{x[0]}_{x[1]}" if x[1] else x[0] for x in iat_scores_session.columns]
+        for column in (f"{x}_{y}" for x in ("rt_recoded_con", "rt_recoded_inc", "pooled_std", "iat_score")
+                       for y in (1, 2)):
+            if column not in iat_scores_session.columns:
+                iat_scores_session[column] = np.nan
     
-        def _calculate_means(x):
-            iat_score_mean = np.mean(x[["iat_score_1", "iat_score_2"]])
-            rt_recoded_con_mean = np.mean(x[["rt_recoded_con_1", "rt_recoded_con_2"]])
-            rt_recoded_inc_mean = np.mean(x[["rt_recoded_inc_1", "rt_recoded_inc_2"]])
-            return pd.Series([iat_score_mean, rt_recoded_con_mean, rt_recoded_inc_mean])
-    
-        iat_scores_session["iat_score rt_recoded_con rt_recoded_inc".split()] = \
-            iat_scores_session.apply(_calculate_means, axis=1)
-    
-        scored_iat_df = iat_data_report.reset_index().merge(iat_scores_session, on=grouped_by, how="left")
+        for column in ("iat_score", "rt_recoded_con", "rt_recoded_inc"):
+            iat_scores_session[column] = iat_scores_session[[f"{column}_1", f"{column}_2"]].mean(axis=1)
     
+        return iat_data_report.reset_index().merge(iat_scores_session, on=grouped_by, how="left")
+
+    @staticmethod
+    def _summarize_improved(scored_iat_df):
+        """Summarize the responses scored by the improved algorithm by study
+        :param scored_iat_df: DataFrame, the scored response-level data
+        :return DataFrame, the scored summary"""
         summary_gb = scored_iat_df.groupby("study")
         summary_df = summary_gb.agg(
             total_response_count=("final_used_trial_count", lambda x: (x > -1).sum()),
@@ -543,32 +1113,626 @@ Error Trial Penalty (ms or SD unit): {self.rt_punishment}"""
             rt_inc_max=("rt_recoded_inc", np.max),
             rt_inc_sd=("rt_recoded_inc", np.std),
         )
-        return summary_df, scored_iat_df
+        return summary_df
     
-    def _apply_improved(self):
+    def _apply_improved(self, progress_callback=None):
         """Apply the improved algorithm
+        :param progress_callback: Union[None, callable], called with the stage and the completed fraction
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
         trial_data = self.iat_data.iat_data_clean
-        summary_df, scored_iat_df = self._process_data_improved(trial_data)
+        scored_iat_df = self._score_responses_by_chunks(
+            trial_data, progress_callback, "Scoring the responses", 0.0, 0.5)
+        summary_df = self._summarize_improved(scored_iat_df)
         summary_df["reliability_by_task"], summary_df["reliability_by_odd_even"] = \
-            tuple(self._calculate_reliability(trial_data, scored_iat_df))
+            tuple(self._calculate_reliability(trial_data, scored_iat_df, progress_callback))
         return self._clean_up_scored_data(summary_df, scored_iat_df)
     
     def _clean_up_scored_data(self, summary_df, scored_iat_df):
         """Clean up the return data set
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
         overall_summary_df = summary_df.reset_index()
-        if len(self.iat_data.studies) == 1 and self.iat_data.studies.pop() == IATData.mock_study:
+        if self._uses_mock_study:
             scored_iat_df.drop(columns=self.iat_data.grouped_by[0], inplace=True)
             overall_summary_df.drop(columns=self.iat_data.grouped_by[0], inplace=True)
         return overall_summary_df, scored_iat_df
     
-    def process_data(self, iat_data: IATData):
+    @property
+    def _uses_mock_study(self):
+        """Whether the data have only the mock study, whose name isn't reported"""
+        return self.iat_data.studies == {IATData.mock_study}
+    
+    def score_trials(self, iat_data: IATData, trial_data: pd.DataFrame):
+        """Score the trial-level data, such as a subset of the cleaned data, without the reliability estimates
+        :param iat_data: IATData, the IATData instance that the trial data are from
+        :param trial_data: DataFrame, the cleaned trial-level data to be scored
+        :return DataFrame, the response-level scored data"""
+        self.iat_data = iat_data
+        if self.name == IATAlgorithmName.CONVENTIONAL.value:
+            _, scored_iat_df = self._process_data_conventional(trial_data)
+        else:
+            _, scored_iat_df = self._process_data_improved(trial_data)
+        if self._uses_mock_study:
+            scored_iat_df.drop(columns=iat_data.grouped_by[0], inplace=True)
+        return scored_iat_df
+    
+    def score_session(self,
+                      block_responses,
+                      block_conditions,
+                      trial_response_separator="_",
+                      congruency_labels=None):
+        """Score a single session directly from its embedded data using NumPy, without the DataFrame pipeline
+        It's designed for low-latency uses, such as feedback right after the task, and its results match
+        the response-level data returned by process_data for the same session.
+        :param block_responses: Union[list, dict], the blockNResponses strings in the block order, or by block numbers
+        :param block_conditions: str, the blockConditions string, such as "px|x+|p+|p+|x-|p-|p-"
+        :param trial_response_separator: str, the separator between responses in the embedded data
+        :param congruency_labels: Union[None, dict], the labels by congruency
+        :return dict, the scored session data, including the exclusion flags
+        """
+        trials = _parse_session_trials(block_responses, block_conditions, trial_response_separator, congruency_labels)
+        return self._score_parsed_sessions([trials])[0]
+
+    def score_sessions(self,
+                       sessions,
+                       trial_response_separator="_",
+                       congruency_labels=None):
+        """Score many sessions from their embedded data together, in one vectorized pass over all their trials
+        :param sessions: list[tuple], the (block_responses, block_conditions) of each session, as in score_session
+        :param trial_response_separator: str, the separator between responses in the embedded data
+        :param congruency_labels: Union[None, dict], the labels by congruency
+        :return list[dict], the scored data of each session, the same as score_session's, or the error of the session
+            whose embedded data can't be parsed, e.g., {"error": "can't cast the response"}
+        """
+        session_scores = [None] * len(sessions)
+        parsed_sessions = dict()
+        for session_index, (block_responses, block_conditions) in enumerate(sessions):
+            try:
+                if not isinstance(block_conditions, str):
+                    raise ValueError("No block conditions were recorded")
+                parsed_sessions[session_index] = _parse_session_trials(
+                    block_responses, block_conditions, trial_response_separator, congruency_labels)
+            except (ValueError, AssertionError) as e:
+                session_scores[session_index] = {"error": str(e)}
+        for session_index, session_score in zip(parsed_sessions,
+                                                 self._score_parsed_sessions(list(parsed_sessions.values()))):
+            session_scores[session_index] = session_score
+        return session_scores
+
+    def _score_parsed_sessions(self, sessions_trials):
+        """Score the parsed trial arrays of the sessions, which are concatenated and reduced by session
+        :param sessions_trials: list[dict], the trial arrays of each session, returned by _parse_session_trials
+        :return list[dict], the scored data of each session
+        """
+        session_count = len(sessions_trials)
+        if not session_count:
+            return []
+        trials = {x: np.concatenate([session_trials[x] for session_trials in sessions_trials])
+                  for x in sessions_trials[0]}
+        trials["session"] = np.repeat(
+            np.arange(session_count), [len(session_trials["reaction_time"]) for session_trials in sessions_trials])
+        trials["block_number"] = trials["block_number"].astype(int)
+        reducer = _SessionReducer(trials["session"], session_count)
+        total_trial_count = reducer.count()
+        total_error_trial_count = reducer.count(~trials["trial_correct"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            session_scores = {
+                "total_trial_count": total_trial_count,
+                "total_error_trial_count": total_error_trial_count,
+                "overall_error_rate":
+                    np.where(total_trial_count > 0, total_error_trial_count / total_trial_count, np.nan)
+            }
+            if self.name == IATAlgorithmName.CONVENTIONAL.value:
+                session_scores.update(self._score_sessions_conventional(trials, reducer))
+            else:
+                session_scores.update(self._score_sessions_improved(trials, reducer))
+        score_lists = {x: values.tolist() for x, values in session_scores.items()}
+        return [{x: values[i] for x, values in score_lists.items()} for i in range(session_count)]
+
+    def _in_included_blocks(self, block_number):
+        """Whether the trials are in the included blocks, faster than np.isin for the small arrays"""
+        included = np.zeros(len(block_number), dtype=bool)
+        for block in self.included_blocks:
+            included |= block_number == block
+        return included
+
+    def _score_sessions_conventional(self, trials, reducer):
+        """Score the sessions' concatenated trial arrays using the conventional algorithm"""
+        reaction_time, trial_correct, task = trials["reaction_time"], trials["trial_correct"], trials["task"]
+        used = self._in_included_blocks(trials["block_number"]) & (trials["trial_number"] > self.trials_to_drop)
+        used_trial_count = reducer.count(used)
+        error_trial_count = reducer.count(used & ~trial_correct)
+        error_rate = error_trial_count / np.where(used_trial_count > 0, used_trial_count, np.nan)
+        rt_mean = reducer.mean(reaction_time, used)
+        excluded_for_error_rate = ~(error_rate < self.allowed_error_rate)
+        excluded_for_slow_responses = ~(rt_mean < self.allowed_rt_upper)
+        excluded = excluded_for_error_rate | excluded_for_slow_responses
+        used_trial_count = used_trial_count.astype(object)
+        used_trial_count[used_trial_count == 0] = np.nan
+
+        if self.recode_outliers:
+            rt_recoded = reaction_time.clip(self.rt_low_cutoff, self.rt_high_cutoff)
+        else:
+            in_range = (reaction_time >= self.rt_low_cutoff) & (reaction_time <= self.rt_high_cutoff)
+            rt_recoded = np.where(in_range, reaction_time, np.nan)
+        rt_logged = np.log10(rt_recoded)
+        rt_means = dict()
+        for task_name in ("con", "inc"):
+            task_used = used & (task == task_name) & ~np.isnan(rt_recoded) & ~excluded[reducer.session]
+            rt_means[f"rt_recoded_{task_name}"] = reducer.mean(rt_recoded, task_used)
+            rt_means[f"rt_logged_{task_name}"] = reducer.mean(rt_logged, task_used)
+
+        return {
+            "used_trial_count": used_trial_count,
+            "error_trial_count": error_trial_count.astype(float),
+            "error_rate": error_rate,
+            "rt_mean": rt_mean,
+            **{x: rt_means[x] for x in ("rt_recoded_con", "rt_recoded_inc", "rt_logged_con", "rt_logged_inc")},
+            "iat_score_raw": rt_means["rt_recoded_inc"] - rt_means["rt_recoded_con"],
+            "iat_score_logged": rt_means["rt_logged_inc"] - rt_means["rt_logged_con"],
+            "excluded": excluded,
+            "excluded_for_error_rate": excluded_for_error_rate,
+            "excluded_for_slow_responses": excluded_for_slow_responses
+        }
+
+    def _score_sessions_improved(self, trials, reducer):
+        """Score the sessions' concatenated trial arrays using the improved algorithm"""
+        reaction_time, trial_correct = trials["reaction_time"], trials["trial_correct"]
+        block_number, task, task_block_counter = trials["block_number"], trials["task"], trials["task_block_counter"]
+        session = reducer.session
+        used = self._in_included_blocks(block_number)
+        used_trial_count = reducer.count(used)
+        above_rt_upper_limit = reaction_time > self.rt_high_cutoff
+        fast_trial_count = reducer.count(used & (reaction_time < self.rt_low_cutoff))
+        fast_trial_pct = np.where(fast_trial_count > 0, fast_trial_count / used_trial_count, 0.0)
+        too_many_fast_trial = fast_trial_pct > self.allowed_fast_rate
+        below_rt_fast_limit = reaction_time < self.rt_delete_cutoff
+
+        kept = used & ~above_rt_upper_limit & ~too_many_fast_trial[session]
+        if not self.use_all_trials:
+            kept = kept & ~below_rt_fast_limit
+        final_used_trial_count = reducer.count(kept)
+        error_trial_count = np.where(final_used_trial_count > 0, reducer.count(kept & ~trial_correct), np.nan)
+        error_rate = error_trial_count / np.where(final_used_trial_count > 0, final_used_trial_count, np.nan)
+
+        # Recode error latencies, trials in the blocks without correct trials are dropped for the block mean options
+        rt_recoded = reaction_time.copy()
+        error_penalty = IATErrorPenalty(self.replacement_option)
+        if error_penalty in (IATErrorPenalty.ABSOLUTE, IATErrorPenalty.RELATIVE):
+            session_block = session * (block_number.max(initial=0) + 1) + block_number
+            block_reducer = _SessionReducer(session_block, int(session_block.max(initial=0)) + 1)
+            block_correct = kept & trial_correct
+            kept = kept & (block_reducer.count(block_correct) > 0)[session_block]
+            block_mean = block_reducer.mean(reaction_time, block_correct)
+            if error_penalty == IATErrorPenalty.ABSOLUTE:
+                error_rt = block_mean + self.rt_punishment
+            else:
+                error_rt = block_mean + self.rt_punishment * block_reducer.std(reaction_time, block_correct)
+            recoded_trials = kept & ~trial_correct
+            rt_recoded[recoded_trials] = error_rt[session_block[recoded_trials]]
+
+        sd_trials = kept if self.pooled_sd_using_all else kept & trial_correct
+        block_scores = dict()
+        for counter in (1, 2):
+            counter_sd_trials = sd_trials & (task_block_counter == counter)
+            counter_kept = kept & (task_block_counter == counter)
+            scored = (reducer.count(counter_sd_trials) > 0) & (reducer.count(counter_kept) > 0)
+            counter_rt_means = {
+                task_name: reducer.mean(rt_recoded, counter_kept & (task == task_name) & ~np.isnan(rt_recoded))
+                for task_name in ("con", "inc")
+            }
+            pooled_std = np.where(scored, reducer.std(reaction_time, counter_sd_trials), np.nan)
+            block_scores[f"rt_recoded_con_{counter}"] = np.where(scored, counter_rt_means["con"], np.nan)
+            block_scores[f"rt_recoded_inc_{counter}"] = np.where(scored, counter_rt_means["inc"], np.nan)
+            block_scores[f"pooled_std_{counter}"] = pooled_std
+            block_scores[f"iat_score_{counter}"] = \
+                (block_scores[f"rt_recoded_inc_{counter}"] - block_scores[f"rt_recoded_con_{counter}"]) / pooled_std
+
+        def _nan_mean(x, y):
+            value_count = (~np.isnan(x)).astype(int) + ~np.isnan(y)
+            return np.where(value_count > 0, (np.nan_to_num(x) + np.nan_to_num(y)) / value_count, np.nan)
+
+        return {
+            "used_trial_count": used_trial_count,
+            "high_latency_trial_count": reducer.count(used & above_rt_upper_limit).astype(float),
+            "fast_trial_count": fast_trial_count.astype(float),
+            "fast_trial_pct": fast_trial_pct,
+            "fast_latency_trial_count": reducer.count(used & below_rt_fast_limit).astype(float),
+            "final_used_trial_count": final_used_trial_count.astype(float),
+            "error_trial_count": error_trial_count,
+            "error_rate": error_rate,
+            **block_scores,
+            "iat_score": _nan_mean(block_scores["iat_score_1"], block_scores["iat_score_2"]),
+            "rt_recoded_con": _nan_mean(block_scores["rt_recoded_con_1"], block_scores["rt_recoded_con_2"]),
+            "rt_recoded_inc": _nan_mean(block_scores["rt_recoded_inc_1"], block_scores["rt_recoded_inc_2"]),
+            "excluded": too_many_fast_trial | (final_used_trial_count == 0),
+            "too_many_fast_trial": too_many_fast_trial
+        }
+
+    def process_data(self, iat_data: IATData, cache=None, progress_callback=None):
         """Process the data using the current algorithm
         :param iat_data: IATData, the IATData instance
+        :param cache: Union[None, IATResultCache], the cache of the results, which are reused for the same data
+            and parameters
+        :param progress_callback: Union[None, callable], called with the stage (str) and the completed fraction
+            (float) as the processing proceeds, it may raise an exception to stop the processing
         :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
         self.iat_data = iat_data
+        if cache is not None and iat_data.iat_data_clean is not None:
+            results = cache.get_or_compute(self, iat_data, lambda: self._apply_algorithm(progress_callback))
+        else:
+            results = self._apply_algorithm(progress_callback)
+        _report_progress(progress_callback, "Done", 1.0)
+        return results
+    
+    def _apply_algorithm(self, progress_callback=None):
+        """Apply the algorithm to the current data
+        :return tuple, (DataFrame, DataFrame), the scored summary and response-level data"""
         if self.name == IATAlgorithmName.CONVENTIONAL.value:
-            return self._apply_conventional()
+            return self._apply_conventional(progress_callback)
         elif self.name == IATAlgorithmName.IMPROVED.value:
-            return self._apply_improved()
+            return self._apply_improved(progress_callback)
+    
+    @property
+    def params(self):
+        """The keyword parameters of the algorithm, which recreate the same algorithm with its name"""
+        return {x: value for x, value in self.__dict__.items() if x not in ("name", "iat_data")}
+    
+    @property
+    def bootstrap_score_name(self):
+        """The name of the score whose uncertainty is estimated by bootstrap"""
+        return "iat_score_logged" if self.name == IATAlgorithmName.CONVENTIONAL.value else "iat_score"
+    
+    def bootstrap(self,
+                  iat_data: IATData,
+                  replicates=2000,
+                  confidence_level=0.95,
+                  seed=None,
+                  max_workers=None,
+                  sessions_per_task=256,
+                  progress_callback=None):
+        """Estimate the uncertainty of each session's score by resampling its trials within blocks
+        The trials used by the algorithm are resampled with replacement within each block, and the scores of all
+        replicates are computed in batched NumPy arrays (replicates x sessions x blocks x trials). The exclusion of
+        sessions is determined by the original data, and excluded sessions have missing estimates.
+        :param iat_data: IATData, the IATData instance, which has been cleaned up
+        :param replicates: int, the number of bootstrap replicates
+        :param confidence_level: float, the confidence level of the percentile confidence intervals
+        :param seed: Union[None, int], the seed of the random streams, each chunk of sessions uses its own stream
+        :param max_workers: Union[None, int], the maximum number of worker processes, 1 runs in the current process
+        :param sessions_per_task: int, the number of sessions scored in each task submitted to the process pool
+        :param progress_callback: Union[None, callable], called with the stage and the completed fraction after
+            each task, it may raise an exception to stop the resampling
+        :return DataFrame, one row per session with the grouped_by columns (without the study when the data have
+            only the mock study) and the score's standard error and confidence interval, such as iat_score_se,
+            iat_score_ci_lower, and iat_score_ci_upper for the improved algorithm, which are merged with the scored
+            response-level data on the grouped_by columns by the caller
+        """
+        self.iat_data = iat_data
+        session_keys, session_arrays = self._bootstrap_arrays(iat_data.iat_data_clean)
+        algorithm_params = self.params
+        chunk_starts = range(0, len(session_keys), sessions_per_task)
+        seed_sequences = np.random.SeedSequence(seed).spawn(len(chunk_starts))
+        chunk_args = [
+            (self.name, algorithm_params, {x: value[start:start + sessions_per_task]
+                                           for x, value in session_arrays.items()},
+             replicates, seed_sequence, confidence_level)
+            for start, seed_sequence in zip(chunk_starts, seed_sequences)
+        ]
+        chunk_estimates = list()
+        _report_progress(progress_callback, "Resampling the trials", 0.0)
+        if max_workers == 1 or len(chunk_args) <= 1:
+            for chunk_arg in chunk_args:
+                chunk_estimates.append(_bootstrap_session_chunk(*chunk_arg))
+                _report_progress(progress_callback, "Resampling the trials", len(chunk_estimates) / len(chunk_args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_bootstrap_session_chunk, *x) for x in chunk_args]
+                try:
+                    for future in futures:
+                        chunk_estimates.append(future.result())
+                        _report_progress(
+                            progress_callback, "Resampling the trials", len(chunk_estimates) / len(chunk_args))
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        
+        score_name = self.bootstrap_score_name
+        bootstrap_df = pd.DataFrame(session_keys, columns=list(iat_data.grouped_by))
+        estimates = np.concatenate(chunk_estimates) if chunk_estimates else np.empty((0, 3))
+        for column_index, suffix in enumerate(("se", "ci_lower", "ci_upper")):
+            bootstrap_df[f"{score_name}_{suffix}"] = estimates[:, column_index]
+        if self._uses_mock_study:
+            bootstrap_df.drop(columns=iat_data.grouped_by[0], inplace=True)
+        return bootstrap_df
+    
+    def _bootstrap_arrays(self, trial_data):
+        """Select the trials used by the algorithm and pad them into the session x block x trial arrays
+        :param trial_data: DataFrame, the cleaned trial-level data
+        :return tuple, (list, dict), the session identifiers and the arrays of reaction_time, trial_correct,
+            trial_count (session x block), task (0=con, 1=inc, 2=others), and task_block_counter
+        """
+        grouped_by = list(self.iat_data.grouped_by)
+        trial_data = trial_data.copy()
+        trial_data["session_index"] = trial_data.groupby(grouped_by, sort=True).ngroup()
+        session_keys = trial_data.groupby(grouped_by, sort=True).size().index.tolist()
+        session_index = trial_data["session_index"]
+        used = trial_data["block_number"].isin(self.included_blocks)
+        reaction_time = trial_data["reaction_time"]
+        
+        if self.name == IATAlgorithmName.CONVENTIONAL.value:
+            used &= trial_data["trial_number"] > self.trials_to_drop
+            error_rate = (used & (trial_data["trial_correct"] == "N")).groupby(session_index).sum() / \
+                used.groupby(session_index).sum()
+            rt_mean = reaction_time.where(used).groupby(session_index).mean()
+            excluded = ~(error_rate < self.allowed_error_rate) | ~(rt_mean < self.allowed_rt_upper)
+            if self.recode_outliers:
+                reaction_time = reaction_time.clip(self.rt_low_cutoff, self.rt_high_cutoff)
+            else:
+                used &= (reaction_time >= self.rt_low_cutoff) & (reaction_time <= self.rt_high_cutoff)
+            # The conventional score is the difference of the mean logged latencies
+            reaction_time = np.log10(reaction_time)
+            kept = used & ~session_index.map(excluded).astype(bool)
+        else:
+            fast_trial_count = (used & (reaction_time < self.rt_low_cutoff)).groupby(session_index).sum()
+            fast_trial_pct = (fast_trial_count / used.groupby(session_index).sum()).where(fast_trial_count > 0, 0)
+            too_many_fast_trial = fast_trial_pct > self.allowed_fast_rate
+            kept = used & (reaction_time <= self.rt_high_cutoff) & ~session_index.map(too_many_fast_trial).astype(bool)
+            if not self.use_all_trials:
+                kept &= reaction_time >= self.rt_delete_cutoff
+        
+        kept_data = trial_data[kept].assign(reaction_time=reaction_time[kept])
+        block_index = kept_data["block_number"].map({x: i for i, x in enumerate(self.included_blocks)}).to_numpy()
+        kept_session_index = kept_data["session_index"].to_numpy()
+        trial_index = kept_data.groupby(["session_index", "block_number"]).cumcount().to_numpy()
+        shape = (len(session_keys), len(self.included_blocks), trial_index.max() + 1 if len(trial_index) else 1)
+        session_arrays = {
+            "reaction_time": np.zeros(shape),
+            "trial_correct": np.zeros(shape, dtype=bool),
+            "trial_count": np.zeros(shape[:2], dtype=int),
+            "task": np.full(shape[:2], 2, dtype=np.int8),
+            "task_block_counter": np.zeros(shape[:2], dtype=np.int8)
+        }
+        session_arrays["reaction_time"][kept_session_index, block_index, trial_index] = kept_data["reaction_time"]
+        session_arrays["trial_correct"][kept_session_index, block_index, trial_index] = \
+            kept_data["trial_correct"] == "Y"
+        np.add.at(session_arrays["trial_count"], (kept_session_index, block_index), 1)
+        session_arrays["task"][kept_session_index, block_index] = \
+            kept_data["task"].map({"con": 0, "inc": 1}).fillna(2)
+        session_arrays["task_block_counter"][kept_session_index, block_index] = kept_data["task_block_counter"]
+        return session_keys, session_arrays
+    
+    def _bootstrap_replicate_scores(self, reaction_time, trial_correct, trial_used, task, task_block_counter):
+        """Score the resampled replicates
+        :param reaction_time: ndarray, the latencies, replicates x sessions x blocks x trials
+        :param trial_correct: ndarray, whether the trials are correct, in the same shape as reaction_time
+        :param trial_used: ndarray, whether the trials are used, in the same shape as reaction_time
+        :param task: ndarray, the blocks' tasks (0=con, 1=inc, 2=others), sessions x blocks
+        :param task_block_counter: ndarray, the blocks' counters within the task, sessions x blocks
+        :return ndarray, the scores, replicates x sessions
+        """
+        def _task_mean(block_sum, block_count, block_selected):
+            task_count = (block_count * block_selected).sum(-1)
+            return (block_sum * block_selected).sum(-1) / np.where(task_count > 0, task_count, np.nan)
+        
+        if self.name == IATAlgorithmName.CONVENTIONAL.value:
+            block_sum = np.where(trial_used, reaction_time, 0).sum(-1)
+            block_count = trial_used.sum(-1)
+            return _task_mean(block_sum, block_count, task == 1) - _task_mean(block_sum, block_count, task == 0)
+        
+        rt_recoded = reaction_time
+        error_penalty = IATErrorPenalty(self.replacement_option)
+        if error_penalty in (IATErrorPenalty.ABSOLUTE, IATErrorPenalty.RELATIVE):
+            correct_used = trial_used & trial_correct
+            correct_count = correct_used.sum(-1)
+            correct_mean = \
+                np.where(correct_used, reaction_time, 0).sum(-1) / np.where(correct_count > 0, correct_count, 1)
+            if error_penalty == IATErrorPenalty.ABSOLUTE:
+                error_rt = correct_mean + self.rt_punishment
+            else:
+                squared_deviation = np.where(correct_used, (reaction_time - correct_mean[..., None]) ** 2, 0).sum(-1)
+                error_rt = correct_mean + self.rt_punishment * np.sqrt(
+                    squared_deviation / np.where(correct_count > 1, correct_count - 1, np.nan))
+            # The blocks without correct trials are dropped
+            trial_used = trial_used & (correct_count > 0)[..., None]
+            rt_recoded = np.where(trial_correct, reaction_time, error_rt[..., None])
+        
+        sd_used = trial_used if self.pooled_sd_using_all else trial_used & trial_correct
+        recoded_used = trial_used & ~np.isnan(rt_recoded)
+        block_sum = np.where(recoded_used, rt_recoded, 0).sum(-1)
+        block_count = recoded_used.sum(-1)
+        sd_rt = np.where(sd_used, reaction_time, 0)
+        sd_sum, sd_squared_sum, sd_count = sd_rt.sum(-1), (sd_rt ** 2).sum(-1), sd_used.sum(-1)
+        counter_scores = list()
+        for counter in (1, 2):
+            counter_selected = task_block_counter == counter
+            counter_count = (sd_count * counter_selected).sum(-1)
+            counter_sum = (sd_sum * counter_selected).sum(-1)
+            counter_variance = ((sd_squared_sum * counter_selected).sum(-1) - counter_sum ** 2 /
+                                np.where(counter_count > 0, counter_count, np.nan)) / \
+                np.where(counter_count > 1, counter_count - 1, np.nan)
+            pooled_std = np.sqrt(np.maximum(counter_variance, 0))
+            counter_scores.append((_task_mean(block_sum, block_count, counter_selected & (task == 1)) -
+                                   _task_mean(block_sum, block_count, counter_selected & (task == 0))) / pooled_std)
+        counter_scores = np.stack(counter_scores)
+        scored_count = (~np.isnan(counter_scores)).sum(0)
+        return np.nansum(counter_scores, axis=0) / np.where(scored_count > 0, scored_count, np.nan)
+
+
+def parse_algorithm_params(param_items, algorithm_name=None):
+    """Parse the algorithm parameters specified as KEY=VALUE pairs
+    :param param_items: list[str], the KEY=VALUE pairs, values are evaluated as Python literals when possible
+    :param algorithm_name: str, the algorithm whose supported parameters the keys are checked against, if specified
+    :return dict, the keyword parameters for the IATAlgorithm
+    :raise ValueError when an item isn't a KEY=VALUE pair or the algorithm doesn't support its key
+    """
+    supported_params = IATAlgorithm.supported_params.get(algorithm_name) if algorithm_name else None
+    params = dict()
+    for param_item in param_items or ():
+        key, separator, value = param_item.partition("=")
+        if not separator or not key.strip():
+            raise ValueError(f"Algorithm parameters should be specified as KEY=VALUE: {param_item}")
+        if supported_params is not None and key.strip() not in supported_params:
+            raise ValueError(f"The parameter isn't supported by the {algorithm_name} algorithm: {key.strip()}, "
+                             f"use one of {', '.join(supported_params)}")
+        try:
+            params[key.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            params[key.strip()] = value.strip()
+    return params
+
+
+def _bootstrap_session_chunk(algorithm_name,
+                             algorithm_params,
+                             session_arrays,
+                             replicates,
+                             seed_sequence,
+                             confidence_level,
+                             max_array_size=4_000_000):
+    """Bootstrap a chunk of sessions, which runs in the worker processes
+    :return ndarray, the standard error, the lower and upper bounds of the confidence interval, sessions x 3
+    """
+    algorithm = IATAlgorithm(algorithm_name, **algorithm_params)
+    rng = np.random.default_rng(seed_sequence)
+    reaction_time, trial_correct = session_arrays["reaction_time"], session_arrays["trial_correct"]
+    trial_count = session_arrays["trial_count"]
+    trial_used = np.arange(reaction_time.shape[-1]) < trial_count[..., None]
+    replicates_per_batch = max(1, max_array_size // max(reaction_time.size, 1))
+    replicate_scores = list()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, replicates, replicates_per_batch):
+            batch_shape = (min(replicates_per_batch, replicates - start), *reaction_time.shape)
+            trial_index = (rng.random(batch_shape) * trial_count[..., None]).astype(np.intp)
+            trial_index = np.minimum(trial_index, np.maximum(trial_count - 1, 0)[..., None])
+            replicate_scores.append(algorithm._bootstrap_replicate_scores(
+                np.take_along_axis(np.broadcast_to(reaction_time, batch_shape), trial_index, axis=-1),
+                np.take_along_axis(np.broadcast_to(trial_correct, batch_shape), trial_index, axis=-1),
+                np.broadcast_to(trial_used, batch_shape),
+                session_arrays["task"],
+                session_arrays["task_block_counter"]
+            ))
+    replicate_scores = np.concatenate(replicate_scores)
+    alpha = (1 - confidence_level) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.column_stack([
+            np.nanstd(replicate_scores, axis=0, ddof=1),
+            *np.nanpercentile(replicate_scores, [alpha * 100, (1 - alpha) * 100], axis=0)
+        ])
+
+
+class IATResultCache:
+    """Bounded LRU cache of the scored results, keyed by the cleaned data's fingerprint and the algorithm's parameters
+    Parameters:
+    -----------
+    max_size: int, the maximum number of results kept in the memory, and on the disk when cache_dir is set
+    cache_dir: Union[None, str, Path], the folder where the results are also pickled to persist between sessions
+    """
+    def __init__(self, max_size=16, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._results = OrderedDict()
+        self._data_fingerprints = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+        self.hits = self.misses = 0
+    
+    def __repr__(self):
+        return f"{self.__class__.__name__}(max_size={self.max_size}, cache_dir={self.cache_dir!r})"
+    
+    def __len__(self):
+        return len(self._results)
+    
+    def get(self, algorithm, iat_data):
+        """Get the cached results of the algorithm for the data
+        :param algorithm: IATAlgorithm, the algorithm, whose repr normalizes its parameters
+        :param iat_data: IATData, the cleaned data
+        :return Union[None, tuple], copies of the scored summary and response-level data, None when not cached
+        """
+        key = self._key(algorithm, iat_data)
+        with self._lock:
+            results = self._get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return tuple(x.copy() for x in results)
+    
+    def put(self, algorithm, iat_data, results):
+        """Cache the results of the algorithm for the data
+        :param algorithm: IATAlgorithm, the algorithm, whose repr normalizes its parameters
+        :param iat_data: IATData, the cleaned data
+        :param results: tuple, (DataFrame, DataFrame), the scored summary and response-level data
+        :return None
+        """
+        key = self._key(algorithm, iat_data)
+        with self._lock:
+            self._put(key, results)
+    
+    def get_or_compute(self, algorithm, iat_data, compute):
+        """Get the cached results of the algorithm for the data, or compute and cache them
+        :param algorithm: IATAlgorithm, the algorithm, whose repr normalizes its parameters
+        :param iat_data: IATData, the cleaned data
+        :param compute: callable, the function that computes the results when they're not cached
+        :return tuple, (DataFrame, DataFrame), copies of the scored summary and response-level data
+        """
+        results = self.get(algorithm, iat_data)
+        if results is None:
+            results = compute()
+            self.put(algorithm, iat_data, results)
+            results = tuple(x.copy() for x in results)
+        return results
+    
+    def evict(self, data_fingerprint=None):
+        """Evict the cached results
+        :param data_fingerprint: Union[None, str], the fingerprint of the data whose results are evicted, by default,
+            all results are evicted
+        :return None
+        """
+        prefix = data_fingerprint[:32] if data_fingerprint else ""
+        with self._lock:
+            for key in [x for x in self._results if x.startswith(prefix)]:
+                del self._results[key]
+            if self.cache_dir is not None:
+                for cache_file in self.cache_dir.glob(f"{prefix}*.pkl"):
+                    cache_file.unlink(missing_ok=True)
+    
+    def _key(self, algorithm, iat_data):
+        data_fingerprint = iat_data.fingerprint()
+        params_hash = hashlib.sha256(repr(algorithm).encode()).hexdigest()
+        with self._lock:
+            # The data of the same instance changed, so the results of its earlier data are stale
+            old_fingerprint = self._data_fingerprints.get(iat_data)
+            if old_fingerprint is not None and old_fingerprint != data_fingerprint:
+                self.evict(old_fingerprint)
+            self._data_fingerprints[iat_data] = data_fingerprint
+        return f"{data_fingerprint[:32]}-{params_hash[:32]}"
+    
+    def _get(self, key):
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+        if self.cache_dir is not None:
+            cache_file = self.cache_dir / f"{key}.pkl"
+            try:
+                with open(cache_file, "rb") as file:
+                    results = pickle.load(file)
+            except (OSError, pickle.PickleError, EOFError):
+                return None
+            cache_file.touch()
+            self._put(key, results, save=False)
+            return results
+        return None
+    
+    def _put(self, key, results, save=True):
+        self._results[key] = results
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+        if self.cache_dir is not None and save:
+            with open(self.cache_dir / f"{key}.pkl", "wb") as file:
+                pickle.dump(results, file, protocol=pickle.HIGHEST_PROTOCOL)
+            cache_files = sorted(self.cache_dir.glob("*.pkl"), key=lambda x: x.stat().st_mtime, reverse=True)
+            for cache_file in cache_files[self.max_size:]:
+                cache_file.unlink(missing_ok=True)
@@ -0,0 +1,193 @@
+"""Background jobs for the heavy scoring work, which run on a bounded process pool shared by the web app's sessions
+
+Example:
+    scheduler = JobScheduler(max_workers=2, max_jobs=8)
+    job = scheduler.submit(score_data, iat_data, "improved", {"rt_punishment": 600})
+    while not job.done():
+        stage, fraction = job.poll()
+    scoring_summary, scored_iat_data = job.result()
+"""
+
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+import iat_scorer
+
+
+class JobCancelledError(Exception):
+    """The job was cancelled by the user"""
+
+
+class SchedulerBusyError(Exception):
+    """The scheduler has too many jobs, and the new job isn't accepted"""
+
+
+class ScoringJob:
+    """A job submitted to the JobScheduler, which reports its progress by stages and can be cancelled"""
+    def __init__(self, future, progress_queue, cancel_event, release_slot=None):
+        self.future = future
+        self.stage = "Waiting for a worker"
+        self.fraction = 0.0
+        self._progress_queue = progress_queue
+        self._cancel_event = cancel_event
+        self._release_slot = release_slot
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(state={self.state!r}, stage={self.stage!r}, fraction={self.fraction:.2f})"
+
+    @property
+    def state(self):
+        """The state of the job: queued, running, cancelled, failed, or finished"""
+        if self.future.cancelled() or self._cancel_event.is_set():
+            return "cancelled"
+        if self.future.running():
+            return "running"
+        if not self.future.done():
+            return "queued"
+        return "failed" if self.future.exception() is not None else "finished"
+
+    def poll(self):
+        """Update the progress with the reports sent by the worker
+        :return tuple, (str, float), the current stage and the completed fraction
+        """
+        while True:
+            try:
+                self.stage, self.fraction = self._progress_queue.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                break
+        return self.stage, self.fraction
+
+    def cancel(self):
+        """Cancel the job, a queued job is removed, and a running job stops at its next progress report, which is
+        sent after each chunk of sessions, and its worker is freed for the next job
+        The job's slot is released right away, so a new job can be submitted in its place.
+        :return None
+        """
+        self._cancel_event.set()
+        self.future.cancel()
+        if self._release_slot is not None:
+            self._release_slot()
+
+    def done(self):
+        """Whether the job has finished, failed, or been cancelled"""
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """Get the result of the job
+        :param timeout: Union[None, float], the maximum time in seconds to wait for the result
+        :return the result returned by the job's function
+        :raise JobCancelledError when the job was cancelled, or the exception raised by the job's function
+        """
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            raise JobCancelledError("The job was cancelled.")
+
+
+class JobScheduler:
+    """Run jobs on a bounded process pool, and limit the number of jobs that are queued or running
+    Parameters:
+    -----------
+    max_workers: int, the number of worker processes, which is the maximum number of jobs running at the same time
+    max_jobs: int, the maximum number of jobs that are queued or running, new jobs are rejected beyond it
+    """
+    def __init__(self, max_workers=2, max_jobs=8):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._manager = None
+        self._job_slots = threading.BoundedSemaphore(max_jobs)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(max_workers={self.max_workers}, max_jobs={self.max_jobs})"
+
+    def submit(self, func, *args, **kwargs):
+        """Submit a job, the function is called in a worker process with the additional progress_callback parameter
+        :param func: callable, a module-level function that accepts progress_callback as a keyword parameter
+        :param args: the positional parameters of the function
+        :param kwargs: the keyword parameters of the function
+        :return ScoringJob, the submitted job
+        :raise SchedulerBusyError when the maximum number of jobs are queued or running
+        """
+        if not self._job_slots.acquire(blocking=False):
+            raise SchedulerBusyError("Too many scoring jobs are running. Please try again later.")
+        try:
+            with self._lock:
+                # The manager runs a server process, which is started only when the first job is submitted
+                if self._manager is None:
+                    self._manager = multiprocessing.Manager()
+                progress_queue = self._manager.Queue()
+                cancel_event = self._manager.Event()
+            future = self._executor.submit(_run_job, func, args, kwargs, progress_queue, cancel_event)
+        except BaseException:
+            self._job_slots.release()
+            raise
+        release_slot = self._job_slot_releaser()
+        future.add_done_callback(lambda _: release_slot())
+        return ScoringJob(future, progress_queue, cancel_event, release_slot)
+
+    def _job_slot_releaser(self):
+        """Create the function that releases a job's slot only once, when the job is cancelled or done"""
+        release_lock = threading.Lock()
+        released = list()
+
+        def _release_slot():
+            with release_lock:
+                if not released:
+                    released.append(True)
+                    self._job_slots.release()
+
+        return _release_slot
+
+    def shutdown(self, cancel_jobs=True):
+        """Shut down the worker processes
+        :param cancel_jobs: bool, whether the queued jobs are cancelled
+        :return None
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel_jobs)
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+def _run_job(func, args, kwargs, progress_queue, cancel_event):
+    """Run the job's function in a worker process, with the progress reported to the queue"""
+    def _report_progress(stage, fraction):
+        if cancel_event.is_set():
+            raise JobCancelledError("The job was cancelled.")
+        progress_queue.put((stage, fraction))
+
+    _report_progress("Starting", 0.0)
+    return func(*args, progress_callback=_report_progress, **kwargs)
+
+
+def score_data(iat_data, algorithm_name, algorithm_params, progress_callback=None):
+    """Score the cleaned data, which is the job function for IATAlgorithm.process_data
+    :param iat_data: IATData, the cleaned data
+    :param algorithm_name: str, the name of the algorithm
+    :param algorithm_params: dict, the keyword parameters of the algorithm
+    :param progress_callback: Union[None, callable], called with the stage and the completed fraction
+    :return tuple, (DataFrame, DataFrame), the scored summary and response-level data
+    """
+    algorithm = iat_scorer.IATAlgorithm(algorithm_name, **algorithm_params)
+    return algorithm.process_data(iat_data, progress_callback=progress_callback)
+
+
+def bootstrap_data(iat_data, algorithm_name, algorithm_params, replicates, confidence_level, seed=None,
+                   progress_callback=None):
+    """Estimate the scores' confidence intervals, which is the job function for IATAlgorithm.bootstrap
+    The resampling runs in the job's worker process, so the job counts as one worker against the pool's limit.
+    :param iat_data: IATData, the cleaned data
+    :param algorithm_name: str, the name of the algorithm
+    :param algorithm_params: dict, the keyword parameters of the algorithm
+    :param replicates: int, the number of bootstrap replicates
+    :param confidence_level: float, the confidence level of the percentile confidence intervals
+    :param seed: Union[None, int], the seed of the random streams
+    :param progress_callback: Union[None, callable], called with the stage and the completed fraction
+    :return DataFrame, the sessions' standard errors and confidence intervals, which are merged with the scored data
+    """
+    algorithm = iat_scorer.IATAlgorithm(algorithm_name, **algorithm_params)
+    return algorithm.bootstrap(iat_data, replicates, confidence_level, seed, max_workers=1,
+                               progress_callback=progress_callback)
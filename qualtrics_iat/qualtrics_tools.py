@@ -1,6 +1,15 @@
+import hashlib
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+import pandas as pd
 from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 
 # api_token = "iNKzBVNVAoTMhwnT2amhZRAP4dTBjkEVw9AbpRWg"
 # brand_center = "mdanderson.co1"
@@ -8,6 +17,11 @@ from requests_toolbelt.multipart.encoder import MultipartEncoder
 # headers = {"x-api-token": api_token}
 
 
+class ExportError(Exception):
+    """The response export failed on the Qualtrics server, its progress couldn't be read, or the exported file
+    couldn't be verified"""
+
+
 class QualtricsTool:
     """Data model to manage Qualtrics-related tools
     Parameters:
@@ -15,11 +29,71 @@ class QualtricsTool:
     api_token: str, the API token for the user
     data_center: str, the data center for the user
     brand_center: str, the brand center for the user
+    Refer to the __init__ for other parameters
+        """
+    def __init__(self, api_token=None, data_center=None, brand_center=None, **kwargs):
+        """Initialization of the QualtricsTool
+        :param timeout: float, tuple, the connect and read timeouts in seconds for each request
+        :param max_retries: int, the maximum number of retries for the connection errors and the transient server
+            errors (429, 500, 502, 503, 504), POST requests, which may not be idempotent, are only retried when they
+            couldn't connect
+        :param backoff_factor: float, the backoff between the retries, which are delayed for
+            backoff_factor * 2 ** (retry - 1) seconds, unless the server sets the Retry-After header
+        :param pool_size: int, the maximum number of the kept-alive connections to the server
+        :param server_url: str, the server used instead of the data center's server, e.g., a local stand-in server
+        :param poll_interval: float, the initial interval (s) between the polls of an export's progress, which doubles
+            after each poll, and each interval is randomly shortened by up to half (jitter)
+        :param max_poll_interval: float, the maximum interval (s) between the polls of an export's progress
         """
-    def __init__(self, api_token=None, data_center=None, brand_center=None):
         self.api_token = api_token
         self.data_center = data_center
         self.brand_center = brand_center
+        self.timeout = kwargs.get("timeout", (10, 60))
+        self.max_retries = kwargs.get("max_retries", 3)
+        self.backoff_factor = kwargs.get("backoff_factor", 0.5)
+        self.pool_size = kwargs.get("pool_size", 10)
+        self.server_url = kwargs.get("server_url")
+        self.poll_interval = kwargs.get("poll_interval", 1)
+        self.max_poll_interval = kwargs.get("max_poll_interval", 15)
+        self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
+        """The HTTP session shared by the API methods, which pools the connections and retries the failed requests"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        """Close the HTTP session and its pooled connections, a new session is created when it's needed again
+        :return None
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
 
     @property
     def api_headers(self):
@@ -29,6 +103,8 @@ class QualtricsTool:
     @property
     def base_url(self):
         """The default base URL"""
+        if self.server_url:
+            return self.server_url.rstrip("/")
         return f"https://{self.data_center}.qualtrics.com"
     
     @property
@@ -41,84 +117,138 @@ class QualtricsTool:
                           library_id,
                           creating_full_url=True,
                           qualtrics_folder=None,
-                          filename_pattern="*"):
+                          filename_pattern="*",
+                          max_workers=1,
+                          with_report=False):
         """Upload images from the local folder to the Qualtrics server
         :param local_image_folder: str, Path, the local folder containing the images
         :param library_id: str, Qualtrics library ID number
         :param creating_full_url: bool, whether returns the IDs only or the full URLs
         :param qualtrics_folder: str, the Qualtrics Graphics folder for the uploaded images
         :param filename_pattern: str, the pattern using which to select the images for uploading
-        :return list[str], the list of image IDs or URLs
+        :param max_workers: int, the number of images uploaded concurrently, each image is read from the disk by its
+            upload, so at most this many files are open at once
+        :param with_report: bool, whether returns the upload report for each image instead of the IDs or URLs
+        :return list[str], the list of image IDs or URLs, sorted by the file names, or list[dict], the upload report
+        :raise ValueError when any image isn't a PNG, GIF, or JPEG image, or when the report isn't requested and any
+            image fails to upload
         """
-        upload_url = f"{self.api_base_url}/libraries/{library_id}/graphics"
-        image_urls = list()
-        for file in Path(local_image_folder).glob(filename_pattern):
-            file_type = Path(file)[1:]
+        uploads = list()
+        for file in sorted(Path(local_image_folder).glob(filename_pattern)):
+            file_type = file.suffix[1:].lower()
             if file_type not in ("png", "gif", "jpg", "jpeg"):
                 raise ValueError("Qualtrics only accepts PNG, GIF, and JPEG images.")
-            encoded_fields = {'file': (file.name, open(file, 'rb'), f'image/{file_type}')}
-            image_url_id = self._upload_image(encoded_fields, qualtrics_folder, upload_url, file, creating_full_url)
-            image_urls.append(image_url_id)
-        return image_urls
+            uploads.append((file.name, file_type, lambda file=file: open(file, 'rb')))
+        return self._upload_images(uploads, library_id, creating_full_url, qualtrics_folder, max_workers, with_report)
     
     def upload_images_web(self,
                           image_files,
                           library_id,
                           creating_full_url,
                           qualtrics_folder,
-                          image_type):
+                          image_type,
+                          max_workers=1,
+                          with_report=False):
         """Upload images from the web app to the Qualtrics server
         :param image_files: Bytes, the uploaded bytes data from the web app
         :param library_id: str, Qualtrics library ID number
         :param creating_full_url: bool, whether returns the IDs only or the full URLs
         :param qualtrics_folder: str, the Qualtrics Graphics folder for the uploaded images
         :param image_type: str, the image file type
-        :return list[str], the list of image IDs or URLs
+        :param max_workers: int, the number of images uploaded concurrently
+        :param with_report: bool, whether returns the upload report for each image instead of the IDs or URLs
+        :return list[str], the list of image IDs or URLs, or list[dict], the upload report
+        :raise ValueError when the report isn't requested and any image fails to upload
         """
-        image_urls = list()
-        upload_url = f"{self.api_base_url}/libraries/{library_id}/graphics"
         file_count_digit = len(str(len(image_files)))
-        for file_i, file in enumerate(image_files, start=1):
-            encoded_fields = {'file': (f"image{file_i:0>{file_count_digit}}.{image_type}", file, f'image/{image_type}')}
-            image_url_id = self._upload_image(encoded_fields, qualtrics_folder, upload_url, file, creating_full_url)
-            image_urls.append(image_url_id)
-        return image_urls
+        uploads = [
+            (f"image{file_i:0>{file_count_digit}}.{image_type}", image_type, lambda file=file: nullcontext(file))
+            for file_i, file in enumerate(image_files, start=1)
+        ]
+        return self._upload_images(uploads, library_id, creating_full_url, qualtrics_folder, max_workers, with_report)
+
+    def _upload_images(self, uploads, library_id, creating_full_url, qualtrics_folder, max_workers, with_report):
+        upload_url = f"{self.api_base_url}/libraries/{library_id}/graphics"
+
+        def upload(upload_item):
+            file_name, file_type, open_file = upload_item
+            try:
+                with open_file() as file:
+                    encoded_fields = {'file': (file_name, file, f'image/{file_type}')}
+                    image_url_id = self._upload_image(
+                        encoded_fields, qualtrics_folder, upload_url, file_name, creating_full_url)
+            except (OSError, ValueError, requests.RequestException) as e:
+                return {"file": file_name, "status": "Error", "url": None, "error": str(e)}
+            return {"file": file_name, "status": "Uploaded", "url": image_url_id, "error": None}
+
+        # map keeps the reports in the order of the images, however the uploads finish
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            upload_report = list(executor.map(upload, uploads))
+        if with_report:
+            return upload_report
+        failed_uploads = [x for x in upload_report if x["status"] == "Error"]
+        if failed_uploads:
+            raise ValueError(
+                f"Failed to upload {len(failed_uploads)} of {len(upload_report)} images: " +
+                "; ".join(f"{x['file']} ({x['error']})" for x in failed_uploads)
+            )
+        return [x["url"] for x in upload_report]
     
-    def _upload_image(self, encoded_fields, qualtrics_folder, upload_url, file, creating_full_url):
+    def _upload_image(self, encoded_fields, qualtrics_folder, upload_url, file_name, creating_full_url):
         if qualtrics_folder:
             encoded_fields['folder'] = qualtrics_folder
         mp_encoder = MultipartEncoder(fields=encoded_fields)
-        post_request = requests.post(
+        post_request = self._request(
+            "POST",
             upload_url,
             data=mp_encoder,
             headers={'Content-Type': mp_encoder.content_type, **self.api_headers}
         )
         try:
             image_url_id = post_request.json()['result']['id']
-        except KeyError:
-            raise Exception(f"Failed to upload image {file.name}")
+        except (KeyError, ValueError):
+            raise ValueError(f"Failed to upload image {file_name}, HTTP status {post_request.status_code}")
         if creating_full_url:
             image_url_id = f"{self.base_url}/ControlPanel/Graphic.php?IM={image_url_id}"
         return image_url_id
     
-    def delete_images(self, library_id, image_url_ids):
+    def delete_images(self, library_id, image_url_ids, max_workers=1, with_report=False):
         """Delete images from the specified library
         :param library_id: str, the library ID number
         :param image_url_ids: list[str], the image IDs or full URLs
-        :return dict, the deletion report"""
-        report = dict()
-        for image_url_id in image_url_ids:
-            if image_url_id.find("=") > 0:
-                image_url_id = image_url_id[image_url_id.index("=") + 1:]
-            url = f'{self.api_base_url}/libraries/{library_id}/graphics/{image_url_id}'
-            delete_response = requests.delete(url, headers=self.api_headers)
+        :param max_workers: int, the number of images deleted concurrently
+        :param with_report: bool, whether returns the detailed report for each image, including its HTTP status, latency
+            (s), and error, instead of the status only
+        :return dict, the deletion report, the status (Deleted or Error) by image ID, or list[dict], the detailed report
+            in the order of the images, each image is reported even when the others fail
+        """
+        image_ids = [x[x.index("=") + 1:] if x.find("=") > 0 else x for x in image_url_ids]
+
+        def delete(image_id):
+            url = f'{self.api_base_url}/libraries/{library_id}/graphics/{image_id}'
+            start_time = time.perf_counter()
+            image_report = {"id": image_id, "status": "Error", "http_status": None, "latency": None, "error": None}
             try:
-                http_status = delete_response.json()['meta']['httpStatus']
-            except KeyError:
-                raise Exception(f"Failed to delete image: {image_url_id}")
-            else:
-                report[image_url_id] = "Deleted" if http_status.startswith('200') else "Error"
-        return report
+                delete_response = self._request("DELETE", url, headers=self.api_headers)
+                image_report["http_status"] = delete_response.status_code
+                response_meta = delete_response.json()['meta']
+                if response_meta['httpStatus'].startswith('200'):
+                    image_report["status"] = "Deleted"
+                else:
+                    response_error = response_meta.get('error', {})
+                    image_report["error"] = response_error.get('errorMessage', response_meta['httpStatus'])
+            except (KeyError, ValueError, AttributeError):
+                image_report["error"] = f"Failed to delete image: {image_id}, the response is malformed"
+            except requests.RequestException as e:
+                image_report["error"] = f"{e.__class__.__name__}: {e}"
+            image_report["latency"] = time.perf_counter() - start_time
+            return image_report
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            delete_report = list(executor.map(delete, image_ids))
+        if with_report:
+            return delete_report
+        return {x["id"]: x["status"] for x in delete_report}
     
     def create_survey(self, template_json):
         """Create the survey using the JSON template
@@ -126,7 +256,8 @@ class QualtricsTool:
         :return str, the created Survey ID number
         """
         upload_url = f"{self.api_base_url}/survey-definitions"
-        creation_response = requests.post(
+        creation_response = self._request(
+            "POST",
             upload_url,
             json=template_json,
             headers={**self.api_headers, "content-type": "application/json"}
@@ -145,7 +276,7 @@ class QualtricsTool:
         """
         report = dict()
         delete_url = f"{self.api_base_url}/survey-definitions/{survey_id}"
-        delete_response = requests.delete(delete_url, headers=self.api_headers)
+        delete_response = self._request("DELETE", delete_url, headers=self.api_headers)
         try:
             http_status = delete_response.json()['meta']['httpStatus']
         except KeyError:
@@ -154,31 +285,243 @@ class QualtricsTool:
             report[survey_id] = "Deleted" if http_status.startswith('200') else "Error"
         return report
     
-    def export_responses(self, survey_id, file_format="csv", data_folder=None):
-        """Export responses from the Qualtrics survey"""
+    def export_responses(self, survey_id, file_format="csv", data_folder=None, max_wait=600, progress_callback=None):
+        """Export responses from the Qualtrics survey
+        :param survey_id: str, the survey ID number
+        :param file_format: str, the export file format, e.g., csv
+        :param data_folder: str, Path, the folder to which the exported zip file is streamed, as
+            <survey_id>_responses.zip, instead of being returned as bytes
+        :param max_wait: float, the maximum time (s) to wait for the export to complete
+        :param progress_callback: callable, it's called with the percent complete (0-100) and the export status each
+            time the progress is polled
+        :return bytes, the content of the exported zip file, or Path, the path of the zip file in the data folder,
+            which can be read by IATData directly
+        :raise ExportError when the export fails or its progress can't be read
+        :raise TimeoutError when the export doesn't complete within the maximum wait
+        """
+        if data_folder is not None:
+            Path(data_folder).mkdir(parents=True, exist_ok=True)
+            zip_path = Path(data_folder) / f"{survey_id}_responses.zip"
+            return self.download_responses(
+                survey_id, zip_path, file_format, max_wait=max_wait, progress_callback=progress_callback)["target"]
+        download_url, progress_result = self._export_file(
+            survey_id, {"format": file_format}, max_wait, progress_callback)
+        return self._download_file(download_url, progress_result["fileId"])
+
+    def download_responses(self,
+                           survey_id,
+                           target,
+                           file_format="csv",
+                           max_wait=600,
+                           progress_callback=None,
+                           expected_sha256=None,
+                           chunk_size=1024 * 1024):
+        """Export responses from the Qualtrics survey, and stream the exported zip file to the target chunk by chunk,
+        so the file is never held in the memory as a whole
+        :param survey_id: str, the survey ID number
+        :param target: Union[str, Path, file-like], the path of the zip file, which is only replaced when the download
+            is complete and verified, or the binary file-like object to which the file is written
+        :param file_format: str, the export file format, e.g., csv
+        :param max_wait: float, the maximum time (s) to wait for the export to complete
+        :param progress_callback: callable, it's called with the percent complete (0-100) and the export status each
+            time the progress is polled
+        :param expected_sha256: str, the expected SHA-256 hex digest of the zip file, when it's known
+        :param chunk_size: int, the size (bytes) of the chunks written to the target
+        :return dict, the target, the size (bytes) and the SHA-256 hex digest of the downloaded zip file, and the
+            export's continuation token, if any
+        :raise ExportError when the export fails, or the downloaded file's size or checksum doesn't match
+        :raise TimeoutError when the export doesn't complete within the maximum wait
+        """
+        return self._download_export(
+            survey_id, {"format": file_format}, target, max_wait, progress_callback, expected_sha256, chunk_size)
+
+    def _download_export(self, survey_id, export_options, target, max_wait, progress_callback, expected_sha256=None,
+                         chunk_size=1024 * 1024):
+        download_url, progress_result = self._export_file(survey_id, export_options, max_wait, progress_callback)
+        file_id = progress_result["fileId"]
+        if isinstance(target, (str, Path)):
+            target_path = Path(target)
+            partial_path = target_path.with_name(f"{target_path.name}.part")
+            try:
+                with open(partial_path, "wb") as file:
+                    download_report = self._stream_file(download_url, file_id, file, expected_sha256, chunk_size)
+            except BaseException:
+                partial_path.unlink(missing_ok=True)
+                raise
+            partial_path.replace(target_path)
+            download_report["target"] = target_path
+        else:
+            download_report = self._stream_file(download_url, file_id, target, expected_sha256, chunk_size)
+        download_report["continuation_token"] = progress_result.get("continuationToken")
+        return download_report
+
+    def sync_responses(self, survey_id, store_file, state_file=None, max_wait=600, progress_callback=None):
+        """Export only the responses recorded since the last sync, and append them to the local response store
+        The first sync exports all responses. Each sync saves the survey's watermark to the state file: the export's
+        continuation token, with which the next export includes only the newer responses, and the last recorded date,
+        which is used as the start date when no continuation token is available, or when the export with the token
+        fails, e.g., the token has expired. All exports use the UTC time zone, so the recorded dates are comparable
+        with the watermark. The responses are de-duplicated by their ResponseId, so a sync that overlaps the previous
+        one doesn't add any response twice.
+        :param survey_id: str, the survey ID number
+        :param store_file: str, Path, the CSV file of the synced responses, which can be read by IATData
+        :param state_file: str, Path, the JSON file of the watermarks by survey ID, by default,
+            qualtrics_sync_state.json in the store file's folder
+        :param max_wait: float, the maximum time (s) to wait for the export to complete
+        :param progress_callback: callable, it's called with the percent complete (0-100) and the export status each
+            time the progress is polled
+        :return dict, the store file, the numbers of the exported, new, and stored responses, and the watermark
+        :raise ExportError when the export fails or its progress can't be read
+        :raise TimeoutError when the export doesn't complete within the maximum wait
+        """
+        store_path = Path(store_file)
+        state_path = Path(state_file) if state_file else store_path.parent / "qualtrics_sync_state.json"
+        sync_states = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else dict()
+        sync_state = sync_states.get(survey_id, dict())
+
+        store_path.parent.mkdir(parents=True, exist_ok=True)
+        export_path = store_path.with_name(f"{store_path.stem}_{survey_id}_export.zip")
+        try:
+            try:
+                download_report = self._download_export(
+                    survey_id, self._sync_export_options(sync_state), export_path, max_wait, progress_callback)
+            except ExportError:
+                if not sync_state.get("continuationToken"):
+                    raise
+                # the continuation token is rejected, e.g., it has expired, so the export starts from the last date
+                sync_state.pop("continuationToken")
+                download_report = self._download_export(
+                    survey_id, self._sync_export_options(sync_state), export_path, max_wait, progress_callback)
+            exported_responses = pd.read_csv(export_path, dtype=str, keep_default_na=False)
+        finally:
+            export_path.unlink(missing_ok=True)
+
+        # Qualtrics adds the rows of the question texts and import IDs, which are only kept at the top of the store
+        is_response = exported_responses["ResponseId"].str.startswith("R_")
+        if store_path.exists():
+            stored_columns = pd.read_csv(store_path, nrows=0).columns
+            stored_ids = set(pd.read_csv(store_path, usecols=["ResponseId"], dtype=str)["ResponseId"])
+            new_responses = exported_responses[is_response & ~exported_responses["ResponseId"].isin(stored_ids)]
+            stored_count = sum(x.startswith("R_") for x in stored_ids if isinstance(x, str))
+        else:
+            stored_columns = None
+            new_responses = exported_responses[is_response]
+            stored_count = 0
+        new_responses = new_responses.drop_duplicates("ResponseId")
+
+        if stored_columns is None:
+            self._write_store(store_path, exported_responses[~is_response], new_responses)
+        elif list(stored_columns) == list(new_responses.columns):
+            if not new_responses.empty:
+                new_responses.to_csv(store_path, mode="a", header=False, index=False)
+        elif not new_responses.empty:
+            # the survey's questions have changed, so the store is rewritten with the columns of both exports
+            stored_responses = pd.read_csv(store_path, dtype=str, keep_default_na=False)
+            self._write_store(store_path, stored_responses, new_responses)
+
+        if "RecordedDate" in new_responses and not new_responses.empty:
+            # the exported dates are in UTC, and the watermark only moves forward
+            last_recorded_date = new_responses["RecordedDate"].max().replace(" ", "T") + "Z"
+            sync_state["lastRecordedDate"] = max(last_recorded_date, sync_state.get("lastRecordedDate") or "")
+        sync_state["continuationToken"] = download_report["continuation_token"]
+        sync_states[survey_id] = sync_state
+        partial_state_path = state_path.with_name(f"{state_path.name}.part")
+        partial_state_path.write_text(json.dumps(sync_states, indent=2), encoding="utf-8")
+        partial_state_path.replace(state_path)
+        return {
+            "store": store_path,
+            "exported": int(is_response.sum()),
+            "new": len(new_responses),
+            "stored": stored_count + len(new_responses),
+            "watermark": sync_state
+        }
+
+    @staticmethod
+    def _sync_export_options(sync_state):
+        export_options = {"format": "csv", "timeZone": "UTC"}
+        if sync_state.get("continuationToken"):
+            export_options["continuationToken"] = sync_state["continuationToken"]
+        else:
+            export_options["allowContinuation"] = True
+            if sync_state.get("lastRecordedDate"):
+                export_options["startDate"] = sync_state["lastRecordedDate"]
+        return export_options
+
+    @staticmethod
+    def _write_store(store_path, *response_frames):
+        partial_path = store_path.with_name(f"{store_path.name}.part")
+        pd.concat(response_frames, ignore_index=True).fillna("").to_csv(partial_path, index=False)
+        partial_path.replace(store_path)
+
+    def _export_file(self, survey_id, export_options, max_wait, progress_callback):
         download_url = f"{self.api_base_url}/surveys/{survey_id}/export-responses/"
-        download_payload = f'{{"format": "{file_format}"}}'
-        download_response = requests.post(
+        download_response = self._request(
+            "POST",
             download_url,
-            data=download_payload,
+            json=export_options,
             headers={**self.api_headers, "content-type": "application/json"}
         )
         try:
             progress_id = download_response.json()["result"]["progressId"]
-            file_id = self._monitor_progress(download_url, progress_id)
-            file_content = self._download_file(download_url, file_id)
-        except KeyError:
-            raise Exception("Can't download the responses. Please check the params.")
-        return file_content
+        except (KeyError, ValueError):
+            raise ExportError("Can't download the responses. Please check the params.")
+        progress_result = self._monitor_progress(download_url, progress_id, max_wait, progress_callback)
+        return download_url, progress_result
     
-    def _monitor_progress(self, download_url, progress_id):
-        progress_status = "inProgress"
-        while progress_status != "complete" and progress_status != "failed":
-            progress_response = requests.get(download_url + progress_id, headers=self.api_headers)
-            progress_status = progress_response.json()["result"]["status"]
-        return progress_response.json()["result"]["fileId"]
+    def _monitor_progress(self, download_url, progress_id, max_wait=600, progress_callback=None):
+        deadline = time.monotonic() + max_wait
+        poll_interval = self.poll_interval
+        while True:
+            progress_response = self._request("GET", download_url + progress_id, headers=self.api_headers)
+            try:
+                progress_result = progress_response.json()["result"]
+                progress_status = progress_result["status"]
+            except (KeyError, TypeError, ValueError):
+                raise ExportError(
+                    f"Can't read the progress of the export {progress_id}, HTTP status {progress_response.status_code}"
+                )
+            percent_complete = progress_result.get("percentComplete", 0)
+            if progress_callback is not None:
+                progress_callback(percent_complete, progress_status)
+            if progress_status == "complete":
+                if "fileId" not in progress_result:
+                    raise ExportError(f"The export {progress_id} completed without a file")
+                return progress_result
+            if progress_status == "failed":
+                raise ExportError(f"The export {progress_id} failed at {percent_complete:.0f}% on the Qualtrics server")
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                raise TimeoutError(
+                    f"The export {progress_id} didn't complete within {max_wait} s, it's {percent_complete:.0f}% done"
+                )
+            # the interval doubles up to the maximum, and the jitter spreads out the polls of concurrent exports
+            time.sleep(min(remaining_time, poll_interval * random.uniform(0.5, 1)))
+            poll_interval = min(poll_interval * 2, self.max_poll_interval)
     
     def _download_file(self, download_url, file_id):
-        file_url = f"{download_url}/{file_id}/file"
-        file_response = requests.get(file_url, headers=self.api_headers, stream=True)
+        file_url = f"{download_url}{file_id}/file"
+        file_response = self._request("GET", file_url, headers=self.api_headers)
         return file_response.content
+
+    def _stream_file(self, download_url, file_id, file, expected_sha256, chunk_size):
+        file_url = f"{download_url}{file_id}/file"
+        file_hash = hashlib.sha256()
+        file_size = 0
+        with self._request("GET", file_url, headers=self.api_headers, stream=True) as file_response:
+            if file_response.status_code != 200:
+                raise ExportError(
+                    f"Can't download the exported file {file_id}, HTTP status {file_response.status_code}"
+                )
+            for chunk in file_response.iter_content(chunk_size=chunk_size):
+                file.write(chunk)
+                file_hash.update(chunk)
+                file_size += len(chunk)
+            # the content length counts the bytes sent by the server, which may be compressed
+            content_length = file_response.headers.get("Content-Length")
+            if content_length is not None and int(content_length) != file_response.raw.tell():
+                raise ExportError(
+                    f"The exported file {file_id} is incomplete, {file_response.raw.tell()} of {content_length} bytes"
+                )
+        if expected_sha256 is not None and file_hash.hexdigest() != expected_sha256.lower():
+            raise ExportError(f"The checksum of the exported file {file_id} doesn't match the expected SHA-256")
+        return {"target": file, "size": file_size, "sha256": file_hash.hexdigest()}
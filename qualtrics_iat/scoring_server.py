@@ -0,0 +1,289 @@
+"""Local HTTP service that scores IAT sessions posted in the Qualtrics embedded data format
+
+Example:
+    python scoring_server.py --port 8765 --algorithm improved
+
+    POST /score {"session": {"ResponseId": "R_1", "block1Responses": "1Y650_2N720_...", ...,
+                             "blockConditions": "px|x+|p+|p+|x-|p-|p-"}}
+    POST /score {"algorithm": "conventional", "params": {"trials_to_drop": 2}, "sessions": [{...}, {...}]}
+"""
+
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import iat_scorer
+
+
+class SessionBatcher:
+    """Collect the concurrently submitted sessions into micro-batches scored together by a worker thread
+    Parameters:
+    -----------
+    score_batch: callable, the function that takes the list of (algorithm, session) and returns the scores
+    batch_size: int, the maximum number of sessions in a batch
+    batch_wait: float, the maximum time in seconds to wait for more sessions after the first one arrives
+    """
+    def __init__(self, score_batch, batch_size=64, batch_wait=0.002):
+        self.score_batch = score_batch
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="iat-session-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, algorithm, session):
+        """Submit a session for scoring
+        :param algorithm: IATAlgorithm, the algorithm for scoring the session
+        :param session: dict, the session's embedded data
+        :return Future, the future of the session's scores
+        """
+        future = Future()
+        self._queue.put((algorithm, session, future))
+        return future
+
+    def close(self):
+        """Stop the worker thread after the submitted sessions are scored"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                batch_scores = self.score_batch([(algorithm, session) for algorithm, session, _ in batch])
+            except Exception as e:
+                for *_, future in batch:
+                    future.set_exception(e)
+            else:
+                for (*_, future), session_scores in zip(batch, batch_scores):
+                    future.set_result(session_scores)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    """HTTP server that keeps the IAT algorithms warm and scores the posted sessions in micro-batches
+    Parameters:
+    -----------
+    server_address: tuple, the (host, port) to listen to, use port 0 to pick a free port
+    default_algorithm: IATAlgorithm, the algorithm used when a request doesn't specify one
+    trial_response_separator: str, the separator between responses in the embedded data
+    congruency_labels: Union[None, dict], the labels by congruency
+    batch_size: int, the maximum number of sessions scored in a batch
+    batch_wait: float, the maximum time in seconds to wait for more sessions to form a batch
+    max_algorithms: int, the maximum number of warm algorithms, the least recently used ones are dropped first
+    """
+    daemon_threads = True
+    request_queue_size = 128
+    verbose = False
+
+    def __init__(self,
+                 server_address,
+                 default_algorithm=None,
+                 trial_response_separator="_",
+                 congruency_labels=None,
+                 batch_size=64,
+                 batch_wait=0.002,
+                 max_algorithms=32):
+        super().__init__(server_address, ScoringRequestHandler)
+        if default_algorithm is None:
+            default_algorithm = iat_scorer.IATAlgorithm(iat_scorer.IATAlgorithmName.IMPROVED.value)
+        self.default_algorithm = default_algorithm
+        self.trial_response_separator = trial_response_separator
+        self.congruency_labels = congruency_labels
+        self.max_algorithms = max_algorithms
+        self.algorithms = OrderedDict({repr(default_algorithm): default_algorithm})
+        self._algorithms_lock = threading.Lock()
+        self.batcher = SessionBatcher(self.score_batch, batch_size, batch_wait)
+
+    def get_algorithm(self, name=None, params=None):
+        """Get the warm algorithm instance with the name and parameters, which is created when it's first used
+        :param name: Union[None, str], the name of the algorithm, by default, the default algorithm
+        :param params: Union[None, dict], the keyword parameters for the algorithm
+        :return IATAlgorithm, the algorithm instance
+        :raise ValueError when the algorithm or any of the parameters isn't supported
+        """
+        if name is None and not params:
+            return self.default_algorithm
+        algorithm = iat_scorer.IATAlgorithm(name or self.default_algorithm.name, **(params or {}))
+        algorithm_key = repr(algorithm)
+        with self._algorithms_lock:
+            algorithm = self.algorithms.setdefault(algorithm_key, algorithm)
+            self.algorithms.move_to_end(algorithm_key)
+            while len(self.algorithms) > self.max_algorithms:
+                self.algorithms.popitem(last=False)
+        return algorithm
+
+    def score_batch(self, batch):
+        """Score a batch of sessions, the studies scored by the same algorithm are scored together in one pass
+        :param batch: list[tuple], the list of (algorithm, session)
+        :return list[list[dict]], the scores of each session, one for each study in the session
+        """
+        batch_scores = list()
+        algorithm_studies = dict()
+        for algorithm, session in batch:
+            session_scores = list()
+            for session_score, block_responses, block_conditions in self._session_studies(session):
+                session_scores.append(session_score)
+                if "error" not in session_score:
+                    studies = algorithm_studies.setdefault(id(algorithm), (algorithm, list()))[1]
+                    studies.append((session_score, block_responses, block_conditions))
+            batch_scores.append(session_scores)
+        for algorithm, studies in algorithm_studies.values():
+            study_scores = algorithm.score_sessions([(block_responses, block_conditions)
+                                                     for _, block_responses, block_conditions in studies],
+                                                    self.trial_response_separator, self.congruency_labels)
+            for (session_score, *_), study_score in zip(studies, study_scores):
+                session_score.update(study_score)
+        return [[{x: _to_json_value(value) for x, value in session_score.items()} for session_score in session_scores]
+                for session_scores in batch_scores]
+
+    @staticmethod
+    def _session_studies(session):
+        """Find the studies in a session's embedded data
+        :param session: dict, the session's embedded data
+        :return list[tuple], the (session_score, block_responses, block_conditions) of each study, where session_score
+            has the session's ResponseId, the study, and the error when the study's data can't be scored
+        """
+        suffix_conditions = "blockConditions"
+        session_studies = list()
+        for conditions_field in (x for x in session if x.endswith(suffix_conditions)):
+            prefix = conditions_field[:-len(suffix_conditions)]
+            session_score = {"ResponseId": session.get("ResponseId")}
+            if prefix:
+                session_score["study"] = prefix.rstrip("_")
+            block_responses = {
+                int(x[len(prefix) + len("block"):-len("Responses")]): value for x, value in session.items()
+                if x.startswith(f"{prefix}block") and x.endswith("Responses") and
+                x[len(prefix) + len("block"):-len("Responses")].isdigit()
+            }
+            if not isinstance(session[conditions_field], str):
+                session_score["error"] = f"No block conditions were recorded in {conditions_field}"
+            session_studies.append((session_score, block_responses, session[conditions_field]))
+        if not session_studies:
+            session_studies.append(
+                ({"ResponseId": session.get("ResponseId"), "error": "No block conditions were found"}, None, None))
+        return session_studies
+
+    def server_close(self):
+        """Close the server and stop the batcher"""
+        super().server_close()
+        self.batcher.close()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """Handle the scoring requests, GET /health and POST /score"""
+    server_version = "QualtricsIATScoring/1.0"
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            with self.server._algorithms_lock:
+                algorithms = list(self.server.algorithms)
+            self._send_json(200, {"status": "ok", "algorithms": algorithms})
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/score":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            algorithm = self.server.get_algorithm(request.get("algorithm"), request.get("params"))
+            if "sessions" in request:
+                sessions = request["sessions"]
+            elif "session" in request:
+                sessions = [request["session"]]
+            else:
+                raise ValueError("Please specify the session or sessions to score.")
+            if not all(isinstance(x, dict) for x in sessions):
+                raise ValueError("Each session should be an object of the embedded data fields.")
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        futures = [self.server.batcher.submit(algorithm, session) for session in sessions]
+        try:
+            scores = [score for future in futures for score in future.result()]
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"algorithm": repr(algorithm), "scores": scores})
+
+    def _send_json(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def _to_json_value(value):
+    """Convert the NumPy and NaN values to JSON-compatible values"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def main(argv=None):
+    """Run the scoring server from the command line
+    :param argv: list[str], the command-line arguments, by default, sys.argv[1:]
+    :return int, the exit code
+    """
+    parser = argparse.ArgumentParser(description="Serve IAT scores for sessions posted as Qualtrics embedded data.")
+    parser.add_argument("--host", default="127.0.0.1", help="the host to listen to")
+    parser.add_argument("--port", type=int, default=8765, help="the port to listen to")
+    parser.add_argument("-a", "--algorithm", default=iat_scorer.IATAlgorithmName.IMPROVED.value,
+                        choices=[x.value for x in iat_scorer.IATAlgorithmName], help="the default scoring algorithm")
+    parser.add_argument("-p", "--param", action="append", metavar="KEY=VALUE",
+                        help="a parameter of the default algorithm (e.g., rt_low_cutoff=300), can be repeated")
+    parser.add_argument("--separator", default="_", help="the separator between trial responses")
+    parser.add_argument("--batch-size", type=int, default=64, help="the maximum number of sessions in a batch")
+    parser.add_argument("--batch-wait", type=float, default=0.002, help="the maximum batching delay in seconds")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the requests")
+    args = parser.parse_args(argv)
+
+    try:
+        algorithm_params = iat_scorer.parse_algorithm_params(args.param, args.algorithm)
+        algorithm = iat_scorer.IATAlgorithm(args.algorithm, **algorithm_params)
+    except ValueError as e:
+        parser.error(str(e))
+    server = ScoringServer((args.host, args.port), algorithm, args.separator,
+                           batch_size=args.batch_size, batch_wait=args.batch_wait)
+    server.verbose = args.verbose
+    print(f"Serving {algorithm!r} on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
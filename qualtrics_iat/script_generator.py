@@ -1,6 +1,299 @@
+import copy
+import functools
 import importlib.resources as pkg_resources
 import json
+import os
 
+_regex_preceding_chars = set("(,=:[!&|?{};+-*%<>~^")
+_regex_preceding_words = {"return", "typeof", "case", "do", "else", "in", "of", "void", "delete", "new", "throw"}
+_unspaced_chars = set("{}()[];,:=<>!&|?*")
+# The prefixes of the embedded data fields that are renamed with the study name
+_study_field_prefixes = ("block", "preload")
+
+
+@functools.lru_cache(maxsize=None)
+def read_template_text(file_name):
+    """Read a text file in the templates package, which is read only once
+    :param file_name: str, the file name, such as iat_question_js_code.js
+    :return str, the file's text
+    """
+    return pkg_resources.read_text("templates", file_name)
+
+
+@functools.lru_cache(maxsize=None)
+def read_minified_template_text(file_name):
+    """Read and minify a JavaScript file in the templates package, which is minified only once
+    :param file_name: str, the file name, such as iat_question_js_code.js
+    :return str, the minified JavaScript code
+    """
+    return minify_script(read_template_text(file_name))
+
+
+def minify_script(script):
+    """Minify the JavaScript code by removing the comments and the whitespaces that aren't needed
+    The strings, template literals, and regular expressions are kept as they are. Line breaks are kept, unless
+    they follow {, ;, or , or precede }, so the automatic semicolon insertion works the same way.
+    :param script: str, the JavaScript code
+    :return str, the minified code
+    """
+    output = list()
+    pending_space = pending_line_break = False
+    position, script_length = 0, len(script)
+
+    def _last_word():
+        word = list()
+        for char in reversed(output):
+            if not (char.isalnum() or char in "_$"):
+                break
+            word.append(char)
+        return "".join(reversed(word))
+
+    while position < script_length:
+        char = script[position]
+        if char in " \t\r\n":
+            pending_line_break |= char == "\n"
+            pending_space = True
+            position += 1
+            continue
+        if char == "/" and script.startswith("//", position):
+            position = script.find("\n", position)
+            position = script_length if position < 0 else position
+            continue
+        if char == "/" and script.startswith("/*", position):
+            position = script.find("*/", position + 2)
+            position = script_length if position < 0 else position + 2
+            pending_space = True
+            continue
+
+        # Write the whitespaces before the current token when they're needed
+        last_char = output[-1] if output else ""
+        if pending_line_break and output and last_char not in "{;," and char != "}":
+            output.append("\n")
+        elif pending_space and output and last_char != "\n" and \
+                last_char not in _unspaced_chars and char not in _unspaced_chars:
+            output.append(" ")
+        last_char = output[-1] if output else ""
+        pending_space = pending_line_break = False
+
+        if char in "'\"`" or (char == "/" and (not output or last_char in _regex_preceding_chars or
+                                               _last_word() in _regex_preceding_words)):
+            # Copy the string, template literal, or regular expression literal as it is
+            end, in_class = position + 1, False
+            while end < script_length:
+                if script[end] == "\\":
+                    end += 2
+                    continue
+                if char == "/" and script[end] in "[]":
+                    in_class = script[end] == "["
+                elif script[end] == char and not in_class:
+                    break
+                end += 1
+            output.append(script[position:end + 1])
+            position = end + 1
+            continue
+        output.append(char)
+        position += 1
+    return "".join(output)
+
+
+class QSFTemplate:
+    """The Qualtrics survey template (QSF), which is parsed and indexed once
+    The unchanged survey elements are serialized once, and each rendering only copies and serializes the patched
+    elements: the question with its QuestionJS slot, and the survey flow when the embedded data fields are renamed.
+    Parameters:
+    -----------
+    qsf_text: str, the JSON text of the QSF file
+    """
+    def __init__(self, qsf_text):
+        self.template = json.loads(qsf_text)
+        survey_elements = self.template["SurveyElements"]
+        self.element_positions = dict()
+        for position, element in enumerate(survey_elements):
+            self.element_positions.setdefault(element["Element"], position)
+        self.question_position = self.element_positions["SQ"]
+        self.flow_position = self.element_positions["FL"]
+        # The embedded data fields to rename with the study name, as the positions in the survey flow
+        self.study_fields = list()
+        for flow_position, flow_item in enumerate(survey_elements[self.flow_position]["Payload"]["Flow"]):
+            if flow_item["Type"] == "EmbeddedData":
+                self.study_fields.extend(self._index_study_fields(flow_item, _study_field_prefixes, (flow_position,)))
+            elif flow_item["Type"] == "BlockRandomizer":
+                for random_flow_position, random_flow_item in enumerate(flow_item["Flow"]):
+                    self.study_fields.extend(self._index_study_fields(
+                        random_flow_item, "first", (flow_position, random_flow_position)))
+        self._element_texts = [json.dumps(element) for element in survey_elements]
+        self._template_texts = [
+            None if key == "SurveyElements" else f"{json.dumps(key)}: {json.dumps(value)}"
+            for key, value in self.template.items()
+        ]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(question_position={self.question_position}, " \
+               f"flow_position={self.flow_position}, study_fields={len(self.study_fields)})"
+
+    @staticmethod
+    def _index_study_fields(flow_item, prefix, flow_path):
+        return [
+            (*flow_path, field_position) for field_position, embedded_field in enumerate(flow_item["EmbeddedData"])
+            if embedded_field.get("Description", "").startswith(prefix)
+        ]
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def default(cls):
+        """The template bundled with the package, which is parsed only once
+        :return QSFTemplate, the template
+        """
+        return cls(read_template_text("iat_survey_template.qsf"))
+
+    def render(self, question_js, study_name=None):
+        """Render the QSF file with the question's JavaScript code and the study name
+        :param question_js: str, the JavaScript code of the IAT question
+        :param study_name: Union[None, str], the study name used as the prefix of the embedded data fields
+        :return str, the JSON text of the QSF file
+        """
+        survey_elements = self.template["SurveyElements"]
+        element_texts = self._element_texts.copy()
+        question_element = survey_elements[self.question_position].copy()
+        question_element["Payload"] = {**question_element["Payload"], "QuestionJS": question_js}
+        element_texts[self.question_position] = json.dumps(question_element)
+        if study_name:
+            # Only the survey flow is copied deeply, which is a small part of the template
+            flow_element = copy.deepcopy(survey_elements[self.flow_position])
+            flow = flow_element["Payload"]["Flow"]
+            for flow_position, *random_flow_path, field_position in self.study_fields:
+                flow_item = flow[flow_position]
+                if random_flow_path:
+                    flow_item = flow_item["Flow"][random_flow_path[-1]]
+                embedded_field = flow_item["EmbeddedData"][field_position]
+                embedded_field["Description"] = f"{study_name}_{embedded_field['Description']}"
+                embedded_field["Field"] = f"{study_name}_{embedded_field['Field']}"
+            element_texts[self.flow_position] = json.dumps(flow_element)
+        elements_text = f'"SurveyElements": [{", ".join(element_texts)}]'
+        return "{" + ", ".join(elements_text if x is None else x for x in self._template_texts) + "}"
+
+    def compose(self, question_scripts, study_names, runtime_script):
+        """Compose the QSF file with multiple IATs, each in its own block, and the runtime script in the survey header
+        :param question_scripts: list[str], the JavaScript code of each IAT question, which calls the runtime
+        :param study_names: list[str], the study names of the IATs, used as the prefixes of the embedded data fields
+        :param runtime_script: str, the JavaScript code shared by the IAT questions, included once in the header
+        :return str, the JSON text of the QSF file
+        """
+        template = copy.deepcopy(self.template)
+        survey_elements = template["SurveyElements"]
+        question_template = survey_elements[self.question_position]
+        flow_element = survey_elements[self.flow_position]
+        flow_properties = flow_element["Payload"]["Properties"]
+        template_flow = flow_element["Payload"]["Flow"]
+
+        def _next_flow_id():
+            flow_properties["Count"] += 1
+            return f"FL_{flow_properties['Count']}"
+
+        def _renumber_flow_ids(flow_item):
+            flow_item["FlowID"] = _next_flow_id()
+            for sub_flow_item in flow_item.get("Flow", ()):
+                _renumber_flow_ids(sub_flow_item)
+            return flow_item
+
+        block_element = survey_elements[self.element_positions["BL"]]
+        template_blocks = block_element["Payload"]
+        block_key = next(x for x, block in template_blocks.items() if block["Type"] == "Standard")
+        blocks = {x: block for x, block in template_blocks.items() if x != block_key}
+        embedded_data_item = _renumber_flow_ids(
+            copy.deepcopy(next(x for x in template_flow if x["Type"] == "EmbeddedData")))
+        embedded_fields = embedded_data_item["EmbeddedData"] = list()
+        randomizer_flow = list()
+        block_flow = list()
+        questions = list()
+        question_number = int(question_template["Payload"]["QuestionID"][len("QID"):])
+        for study_index, (study_name, question_script) in enumerate(zip(study_names, question_scripts)):
+            question_id = f"QID{question_number + study_index}"
+            block = copy.deepcopy(template_blocks[block_key])
+            block["ID"] = block_id = f"{template_blocks[block_key]['ID']}{study_index + 1}"
+            block["Description"] = f"{block['Description']} ({study_name})"
+            block["BlockElements"] = [
+                {**x, "QuestionID": question_id} if x["Type"] == "Question" else x for x in block["BlockElements"]
+            ]
+            blocks[str(len(blocks) + 1)] = block
+
+            question = copy.deepcopy(question_template)
+            question["PrimaryAttribute"] = question["Payload"]["QuestionID"] = question_id
+            question["Payload"]["QuestionJS"] = question_script
+            question["Payload"]["DataExportTag"] = f"IAT_{study_name}"
+            questions.append(question)
+
+            # The embedded data fields and the randomizer of the counterbalancing condition for each study
+            for flow_item in template_flow:
+                flow_item = copy.deepcopy(flow_item)
+                if flow_item["Type"] == "EmbeddedData":
+                    embedded_fields.extend(_prefix_fields(flow_item["EmbeddedData"], _study_field_prefixes, study_name))
+                elif flow_item["Type"] == "BlockRandomizer":
+                    for random_flow_item in flow_item["Flow"]:
+                        random_flow_item["EmbeddedData"] = \
+                            _prefix_fields(random_flow_item["EmbeddedData"], "first", study_name)
+                    randomizer_flow.append(_renumber_flow_ids(flow_item))
+                elif flow_item["Type"] == "Standard":
+                    block_flow.append({**_renumber_flow_ids(flow_item), "ID": block_id})
+
+        flow_element["Payload"]["Flow"] = [embedded_data_item, *randomizer_flow, *block_flow]
+        block_element["Payload"] = blocks
+        survey_options = survey_elements[self.element_positions["SO"]]["Payload"]
+        survey_options["Header"] = f"{survey_options.get('Header') or ''}<script>\n{runtime_script}\n</script>"
+        survey_elements[self.question_position:self.question_position + 1] = questions
+        # The question count follows the survey's final questions
+        for element in survey_elements:
+            if element["Element"] == "QC":
+                element["SecondaryAttribute"] = str(sum(x["Element"] == "SQ" for x in survey_elements))
+        return json.dumps(template)
+
+
+def _prefix_fields(embedded_fields, prefix, study_name):
+    """Prefix the embedded data fields whose descriptions start with the prefix, or one of the prefixes, with the
+    study name"""
+    return [
+        {**x, "Description": f"{study_name}_{x['Description']}", "Field": f"{study_name}_{x['Field']}"}
+        if x.get("Description", "").startswith(prefix) else x for x in embedded_fields
+    ]
+
+
+def _stimulus_base_url(stimuli_lists):
+    """Find the URL prefix shared by the image stimuli, which ends with the last / or = of the common prefix
+    :param stimuli_lists: list[list[str]], the stimuli lists
+    :return str, the shared URL prefix, or an empty string when factoring it out doesn't save any space
+    """
+    urls = [x for stimuli in stimuli_lists for x in stimuli or () if x.startswith(("http://", "https://"))]
+    if len(urls) < 2:
+        return ""
+    common_prefix = os.path.commonprefix(urls)
+    base_url = common_prefix[:max(common_prefix.rfind("/"), common_prefix.rfind("=")) + 1]
+    return base_url if len(base_url) > 10 else ""
+
+
+def compose_template_file(tasks, optimized=False):
+    """Create one Qualtrics survey template file (QSF) with multiple IATs
+    Each IAT is in its own block, and its question only sets up the task and calls the runtime script, which is
+    included once in the survey header, instead of once for each question.
+    :param tasks: list[IATTask], the IAT tasks, which need distinct study names
+    :param optimized: bool, whether the scripts are minified and the stimuli's shared URL prefix is factored out
+    :return str, the JSON text of the QSF file
+    :raise ValueError when the study names are missing, duplicated, or contain underscores
+    """
+    study_names = [task.study_name for task in tasks]
+    if not tasks:
+        raise ValueError("Please specify the IAT tasks to compose")
+    if not all(study_names) or len(set(study_names)) != len(study_names):
+        raise ValueError(f"Each IAT task needs a distinct study name: {study_names}")
+    if any("_" in x for x in study_names):
+        # The scorer takes the text before the first underscore of the embedded data fields as the study name
+        raise ValueError(f"The study names can't contain underscores: {study_names}")
+    if optimized:
+        runtime_script = f"function runIATTask(task){{\n{read_minified_template_text('iat_question_js_code.js')}\n}}"
+        question_scripts = [f"{minify_script(task.generate_task_setup(True))}\nrunIATTask(task);" for task in tasks]
+    else:
+        runtime_script = f"function runIATTask(task) {{\n{read_template_text('iat_question_js_code.js')}\n}}"
+        question_scripts = [f"{task.generate_task_setup()}\nrunIATTask(task);" for task in tasks]
+    return QSFTemplate.default().compose(question_scripts, study_names, runtime_script)
 
 class IATTask:
     """Data model to create the IAT task to run on Qualtrics
@@ -76,6 +369,10 @@ class IATTask:
         :param block_trial_numbers: list, the list of trial numbers for the seven blocks
         :param automatic_responses_delay: int, float, this is for testing purposes, when it's set to be >= the
             minimum_allowed_reaction_time, the automatic correct responses will be entered after the specified delay
+        :param precision_timing: bool, whether the reaction times are measured from the painted frame of the stimulus
+            with the high-resolution clock, and each trial's onset lag and dropped frames are saved as blockNTiming
+        :param compact_encoding: bool, whether the responses are saved as base64-packed reaction times and
+            correctness, and the trials as the indices of the stimuli in the stimulus_table, instead of the text
         """
         self.target_positive_concept = target_positive_concept
         self.target_positive_stimuli = target_positive_stimuli
@@ -140,6 +437,8 @@ class IATTask:
             [20, 20, 20, 40, 20, 20, 40]
         )
         self.automatic_responses_delay = kwargs.get("automatic_responses_delay", 0)
+        self.precision_timing = kwargs.get("precision_timing", False)
+        self.compact_encoding = kwargs.get("compact_encoding", False)
 
     @staticmethod
     def custom_params(name):
@@ -214,8 +513,70 @@ class IATTask:
             templates_kwargs.append(template_kwargs)
         return [IATTask(**kwargs) for kwargs in templates_kwargs]
 
-    def generate_script(self):
-        """Create the script needed for the Qualtrics-IAT experiment"""
+    def generate_script(self, optimized=False):
+        """Create the script needed for the Qualtrics-IAT experiment
+        :param optimized: bool, whether the script is minified and the stimuli's shared URL prefix is factored out,
+            which makes the script smaller without changing how the task runs
+        :return str, the JavaScript code
+        """
+        if optimized:
+            task_setup = minify_script(self.generate_task_setup(factors_stimulus_urls=True))
+            return task_setup + '\n' + read_minified_template_text("iat_question_js_code.js")
+        standard_script = read_template_text("iat_question_js_code.js")
+        return self.generate_task_setup() + '\n' + standard_script
+
+    def script_savings(self):
+        """Compare the sizes of the original and the optimized scripts
+        :return dict, the sizes in bytes of the original and optimized scripts, the bytes saved, and the percent saved
+        """
+        original_size = len(self.generate_script().encode("utf-8"))
+        optimized_size = len(self.generate_script(optimized=True).encode("utf-8"))
+        return {
+            "original_bytes": original_size,
+            "optimized_bytes": optimized_size,
+            "saved_bytes": original_size - optimized_size,
+            "saved_percent": round(100 * (original_size - optimized_size) / original_size, 1)
+        }
+
+    @property
+    def stimulus_table(self):
+        """The unique stimuli in the order of the positive and negative targets and attributes, whose indices are
+        saved as the trials when the task uses the compact encoding, which IATData uses to decode the trials"""
+        stimulus_table = list()
+        for stimuli in (self.target_positive_stimuli, self.target_negative_stimuli,
+                        self.attribute_positive_stimuli, self.attribute_negative_stimuli):
+            for stimulus in stimuli or ():
+                if stimulus not in stimulus_table:
+                    stimulus_table.append(stimulus)
+        return stimulus_table
+
+    def preload_manifest(self):
+        """List the unique images that the task preloads, in the order of the durations in the preloadMetrics field
+        :return list[dict], the images' positions, URLs, stimulus flags (p, n, +, or -), and concepts
+        """
+        stimuli_groups = (
+            ("p", self.target_positive_concept, self.target_positive_stimuli, self.target_stimulus_media),
+            ("n", self.target_negative_concept, self.target_negative_stimuli, self.target_stimulus_media),
+            ("+", self.attribute_positive_concept, self.attribute_positive_stimuli, self.attribute_stimulus_media),
+            ("-", self.attribute_negative_concept, self.attribute_negative_stimuli, self.attribute_stimulus_media)
+        )
+        manifest = list()
+        image_sources = set()
+        for flag, concept, stimuli, media in stimuli_groups:
+            if media != "image":
+                continue
+            for source in stimuli or ():
+                if source not in image_sources:
+                    image_sources.add(source)
+                    manifest.append({"position": len(manifest), "source": source, "flag": flag, "concept": concept})
+        return manifest
+
+    def generate_task_setup(self, factors_stimulus_urls=False):
+        """Create the script that sets up the task's configurations, which is used by the IAT runtime script
+        :param factors_stimulus_urls: bool, whether the stimuli's shared URL prefix is declared once as stimulusBaseUrl,
+            and the stimuli lists only keep the rest of the URLs, which are joined with it when the script runs
+        :return str, the JavaScript code
+        """
         task_stimulus_labels = {
             "p": self.target_positive_concept,
             "n": self.target_negative_concept,
@@ -236,10 +597,19 @@ class IATTask:
             "name": self.target_stimulus_reference,
             "media": self.target_stimulus_media
         }
-        task_stimulus_sources = f'{{"p": {self.target_positive_stimuli},' \
-                                f'"n": {self.target_negative_stimuli},' \
-                                f'"+": {self.attribute_positive_stimuli},' \
-                                f'"-": {self.attribute_negative_stimuli}}}'
+        stimuli_lists = [self.target_positive_stimuli, self.target_negative_stimuli,
+                         self.attribute_positive_stimuli, self.attribute_negative_stimuli]
+        base_url = _stimulus_base_url(stimuli_lists) if factors_stimulus_urls else ""
+        stimuli_sources = list()
+        for stimuli in stimuli_lists:
+            if base_url and stimuli and all(x.startswith(base_url) for x in stimuli):
+                stimuli_sources.append(f"{[x[len(base_url):] for x in stimuli]}.map(x => stimulusBaseUrl + x)")
+            else:
+                stimuli_sources.append(f"{stimuli}")
+        task_stimulus_sources = f'{{"p": {stimuli_sources[0]},' \
+                                f'"n": {stimuli_sources[1]},' \
+                                f'"+": {stimuli_sources[2]},' \
+                                f'"-": {stimuli_sources[3]}}}'
         task_left_key = {"code": self.left_key_code, "name": self.left_key_name}
         task_right_key = {"code": self.right_key_code, "name": self.right_key_name}
         task_advance_key = {"code": self.advance_key_code, "name": self.advance_key_name}
@@ -277,45 +647,21 @@ class IATTask:
     studyName: {self.study_name!r},
     switchAttribute: {str(self.switch_attributes).lower()},
     counterBalancing: {str(self.counter_balancing).lower()},
-    automaticResponsesDelay: {self.automatic_responses_delay}
+    automaticResponsesDelay: {self.automatic_responses_delay},
+    precisionTiming: {str(self.precision_timing).lower()},
+    compactEncoding: {str(self.compact_encoding).lower()}
 }};"""
-        standard_script = pkg_resources.read_text("templates", "iat_question_js_code.js")
-        return task_setup + '\n' + standard_script
-
-    def update_embedded_field(self, embedded_field, key):
-        return self.study_name + "_" + embedded_field[key]
-
-    def process_flow_item(self, flow_item, prefix):
-        for embedded_field in flow_item["EmbeddedData"]:
-            if ("Description" in embedded_field) and embedded_field["Description"].startswith(prefix):
-                embedded_field["Description"] = self.update_embedded_field(embedded_field, "Description")
-                embedded_field["Field"] = self.update_embedded_field(embedded_field, "Field")
-
-    def generate_template_file(self):
-        question_js = self.generate_script()
-        json_template = json.loads(pkg_resources.read_text("templates", "iat_survey_template.qsf"))
-        for item in filter(lambda x: x == "SurveyElements", json_template):
-            for element in filter(lambda x: x["Element"] == "SQ", json_template[item]):
-                element["Payload"]["QuestionJS"] = question_js
-                break
-
-            if not self.study_name:
-                continue
-            for element in filter(lambda x: x["Element"] == "FL", json_template[item]):
-                for flow_item in filter(lambda x: x["Type"] == "EmbeddedData", element["Payload"]["Flow"]):
-                    self.process_flow_item(flow_item, "block")
-
-                for flow_item in filter(lambda x: x["Type"] == "BlockRandomizer", element["Payload"]["Flow"]):
-                    for random_flow_item in flow_item["Flow"]:
-                        self.process_flow_item(random_flow_item, "first")
+        if base_url:
+            task_setup = f"const stimulusBaseUrl = {base_url!r};\n" + task_setup
+        return task_setup
 
-        dumped_js = json.dumps(json_template)
-        return dumped_js
+    def generate_template_file(self, optimized=False):
+        """Create the Qualtrics survey template file (QSF) with the script and the study name
+        :param optimized: bool, whether the question uses the optimized script
+        :return str, the JSON text of the QSF file
+        """
+        return QSFTemplate.default().render(self.generate_script(optimized), self.study_name)
     
-    @staticmethod
-    def _get_qsf_template():
-        return pkg_resources.read_text("templates", "iat_survey_template.qsf")
-
     @property
     def _stimuli_types(self):
         _stimuli_types = self.attribute_stimulus_reference
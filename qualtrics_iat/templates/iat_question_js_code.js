@@ -9,18 +9,28 @@ let heightRatio = 0.75;
 let buttons;
 let fixationElement;
 let textElement;
-let imageElement;
+let stimulusHost;
+let stimulusStage = "iat-stage-none";
+let currentStimulusElement = null;
 let errorElement;
 let leftButtonElement;
 let rightButtonElement;
 let stimulusFlags = {};
+let stimulusIndices = new Map();
 let currentBlock = {
     condition: "",
     instruction: "",
     trials: [],
-    loadedImages: new Set(),
     imageSources: new Set()
 };
+let blockSchedule = [];
+let preloadedImages = {};
+let preloadStartTime = 0;
+let maximumPreloadAttempts = 3;
+let frameDuration = 1000 / 60;
+let frameIntervals = [];
+let calibrationFrameNumber = 10;
+let maximumFrameIntervals = 60;
 let currentTrial = {};
 let currentTrialNumber = 0;
 let currentBlockNumber = 0;
@@ -37,8 +47,13 @@ Qualtrics.SurveyEngine.addOnload(function()
     getDeviceInformation();
     randomizeBlockConditions();
     prepareStimuliFlags();
+    prepareBlockSchedule();
+    preloadTaskImages();
     createElements();
     addListeners();
+    if (task.precisionTiming) {
+        calibrateFrameDuration();
+    }
     if (task.overallInstruction.length > 0) {
         showOverallInstruction();
     } else if (task.showExamples) {
@@ -150,6 +165,9 @@ function prepareStimuliFlags() {
     Object.entries(task.stimulusSources).forEach(([flag, stimuli]) => {
         stimuli.forEach(stimulus => {
             stimulusFlags[stimulus] = flag;
+            if (!stimulusIndices.has(stimulus)) {
+                stimulusIndices.set(stimulus, stimulusIndices.size);
+            }
         });
     });
 }
@@ -174,6 +192,7 @@ function createElements() {
         "max-width: 90%",
         "margin: auto"
     ];
+    addStimulusStyleSheet();
     boundingBox = document.getElementsByClassName("QuestionBody")[0];
     if (isMobile) {
         boundingBox.style.width = "100%";
@@ -183,17 +202,20 @@ function createElements() {
         boundingBox.style.paddingTop = (boundingBoxAspectRatio * heightRatio * 100).toString() + "%";
         boundingBox.style.border = "3px solid gray";
         stimulusContainer = addStimulusContainer();
+        stimulusHost = stimulusContainer;
         addStimulusElements(stimulusContainer, stimulusStyle);
         addFixation(stimulusContainer, stimulusStyle);
         addButtonsForMobile();
         addErrorWarning(stimulusContainer);
     } else {
         boundingBox.setAttribute("style", "width: 900px; height: 600px; border: 3px solid gray");
+        stimulusHost = boundingBox;
         addStimulusElements(boundingBox, stimulusStyle);
         addFixation(boundingBox, stimulusStyle);
         addButtonsForDesktop();
         addErrorWarning(boundingBox);
     }
+    stimulusHost.classList.add(stimulusStage);
     boundingBox.style.backgroundColor = "lightgray";
     instructionElement = addInstructionElement();
     actionButton = addActionButtonElement();
@@ -201,10 +223,8 @@ function createElements() {
 }
 
 function hideTaskElements() {
+    setStimulusStage("none");
     updateElementsVisibility([
-        [textElement, "none"],
-        [imageElement, "none"],
-        [fixationElement, "none"],
         [instructionElement, "none"],
         [actionButton, "none"],
         [errorElement, "none"],
@@ -307,9 +327,49 @@ function addErrorWarning(container) {
     container.appendChild(errorElement);
 }
 
+function addStimulusStyleSheet() {
+    // The fixation and stimulus elements are shown by the stage class of their container, so each change of the
+    // display, such as from the fixation to the stimulus, takes only one class change
+    if (document.getElementById("iat_stimulus_style")) {
+        return;
+    }
+    let styleSheet = document.createElement("style");
+    styleSheet.id = "iat_stimulus_style";
+    styleSheet.textContent = ".iat-stimulus-element {display: none !important;} " +
+        ".iat-stage-fixation .iat-fixation, .iat-stage-stimulus .iat-current-stimulus {display: flex !important;}";
+    document.head.appendChild(styleSheet);
+}
+
+function setStimulusStage(stage) {
+    const stageClass = "iat-stage-" + stage;
+    if (stimulusHost && stageClass !== stimulusStage) {
+        stimulusHost.classList.replace(stimulusStage, stageClass);
+    }
+    stimulusStage = stageClass;
+}
+
+function prepareStimulusElement(stimulus, media, isAttribute) {
+    // The stimulus element is updated while it's hidden, and all images are created in advance by the preloading
+    let stimulusElement = textElement;
+    if (media === "image") {
+        stimulusElement = preloadedImages[stimulus].image;
+    } else {
+        textElement.style.color = isAttribute ? task.attributeWordColor:task.targetWordColor;
+        textElement.childNodes[0].nodeValue = stimulus;
+    }
+    if (stimulusElement !== currentStimulusElement) {
+        if (currentStimulusElement) {
+            currentStimulusElement.classList.remove("iat-current-stimulus");
+        }
+        stimulusElement.classList.add("iat-current-stimulus");
+        currentStimulusElement = stimulusElement;
+    }
+}
+
 function addFixation(container, stimulusStyle) {
     fixationElement = document.createElement("p")
     fixationElement.setAttribute("style", stimulusStyle.join("; "));
+    fixationElement.className = "iat-stimulus-element iat-fixation";
     fixationElement.appendChild(document.createTextNode("+"));
     container.appendChild(fixationElement);
 }
@@ -321,13 +381,15 @@ function addStimulusElements(container, stimulusStyle) {
         textElement.appendChild(document.createTextNode(""));
         textElement.setAttribute("style", stimulusStyle.join("; "));
         textElement.style.fontSize = "30px";
+        textElement.className = "iat-stimulus-element";
         container.appendChild(textElement);
     }
-    if (medias.includes("image")) {
-        imageElement = document.createElement("img");
-        imageElement.setAttribute("style", stimulusStyle.join("; "));
-        container.appendChild(imageElement);
-    }
+    taskImageSources().forEach(source => {
+        const image = preloadedImages[source].image;
+        image.setAttribute("style", stimulusStyle.join("; "));
+        image.className = "iat-stimulus-element";
+        container.appendChild(image);
+    });
 }
 
 function showReminderInstruction() {
@@ -335,9 +397,8 @@ function showReminderInstruction() {
         pagedReminderInstructions =
             isMobile ? task.mobileReminderInstruction:task.reminderInstruction;
         toggleInstructionElements("block");
+        setStimulusStage("none");
         updateElementsVisibility([
-            [imageElement, "none"],
-            [textElement, "none"],
             [stimulusContainer, "none"]
         ]);
     }
@@ -352,11 +413,7 @@ function showReminderInstruction() {
 }
 
 function launchBlock() {
-    updateElementsVisibility([
-        [textElement, "none"],
-        [imageElement, "none"],
-        [fixationElement, "none"]
-    ]);
+    setStimulusStage("none");
     if (currentBlockNumber >= 1 && currentBlockNumber <= task.blockConditions.length) {
         saveBlockResponses();
     }
@@ -368,12 +425,10 @@ function launchBlock() {
     // console.log("Launching Block", currentBlockNumber);
     if (currentBlockNumber <= task.blockConditions.length) {
         currentTrialNumber = 0;
-        currentBlock.imageSources = new Set();
-        currentBlock.loadedImages = new Set();
         currentBlock.condition = task.blockConditions[currentBlockNumber - 1];
+        currentBlock.trials = blockSchedule[currentBlockNumber - 1].trials;
+        currentBlock.imageSources = blockSchedule[currentBlockNumber - 1].imageSources;
         generateBlockInstruction();
-        generateBlockTrials();
-        preloadTrials();
         showBlockInstruction();
         document.body.style.cursor = 'none';
     } else {
@@ -505,25 +560,15 @@ function loadNextExample() {
     let exampleTrial = exampleTrials.pop();
     if (exampleTrial) {
         exampleCategoryLabel.textContent = task.stimulusLabels[exampleTrial.sourceFlag];
-        if (exampleTrial.sourceMedia === "image") {
-            imageElement.src = exampleTrial.sourceStimulus;
-            updateElementsVisibility([
-                [imageElement, "flex"],
-                [textElement, "none"]
-            ]);
-        } else {
-            textElement.style.color = exampleTrial.isAttribute ? task.attributeWordColor:task.targetWordColor;
+        prepareStimulusElement(exampleTrial.sourceStimulus, exampleTrial.sourceMedia, exampleTrial.isAttribute);
+        if (exampleTrial.sourceMedia !== "image") {
             exampleCategoryLabel.style.color = textElement.style.color;
-            const textNode = textElement.childNodes[0];
-            textNode.nodeValue = exampleTrial.sourceStimulus;
-            updateElementsVisibility([
-                [imageElement, "none"],
-                [textElement, "flex"]
-            ]);
         }
+        setStimulusStage("stimulus");
         setTimeout(loadNextExample, task.exampleDisplayTime);
     } else {
         exampleCategoryLabel.remove();
+        setStimulusStage("none");
         if (task.reminderInstruction.length > 0) {
             showReminderInstruction();
         } else {
@@ -532,26 +577,35 @@ function loadNextExample() {
     }
 }
 
-function generateBlockTrials() {
-    currentBlock.trials = [];
-    const blockTrialNumber = task.blockTrialNumbers[currentBlockNumber - 1];
+function prepareBlockSchedule() {
+    // The trials of all blocks are generated once when the task loads, instead of when each block is launched
+    blockSchedule = task.blockConditions.map((condition, blockIndex) => {
+        return generateBlockTrials(condition, task.blockTrialNumbers[blockIndex]);
+    });
+}
+
+function generateBlockTrials(condition, blockTrialNumber) {
+    let block = {trials: [], imageSources: new Set()};
     for (let i = 0; i < blockTrialNumber; i++) {
-        currentBlock.trials.push({
+        block.trials.push({
             stimulus: null,
             flag: null,
             media: null,
             correct: null,
             isAttribute: false,
             startTime: null,
-            reactionTime: null
+            reactionTime: null,
+            onsetLag: null,
+            droppedFrames: null
         });
     }
-    let singleBlock = currentBlock.condition.includes("x");
+    let singleBlock = condition.includes("x");
     if (singleBlock) {
-        updateSingleBlockTrials("+-".includes(currentBlock.condition[1]));
+        updateSingleBlockTrials(block, "+-".includes(condition[1]));
     } else {
-        updateCombinedBlockTrials();
+        updateCombinedBlockTrials(block);
     }
+    return block;
 }
 
 function attributeStimuli() {
@@ -566,13 +620,13 @@ function targetStimuli() {
     return stimuli;
 }
 
-function updateSingleBlockTrials(forAttributeBlock) {
-    const blockTrialNumber = currentBlock.trials.length;
+function updateSingleBlockTrials(block, forAttributeBlock) {
+    const blockTrialNumber = block.trials.length;
     let updatedTrialNumber = 0;
     let media = forAttributeBlock ? task.attributeStimulusType["media"]:task.targetStimulusType["media"];
     let sources = [];
     while (updatedTrialNumber < blockTrialNumber) {
-        let trial = currentBlock.trials[updatedTrialNumber];
+        let trial = block.trials[updatedTrialNumber];
         if (sources.length < 1) {
             sources = forAttributeBlock ? attributeStimuli():targetStimuli();
         }
@@ -581,19 +635,20 @@ function updateSingleBlockTrials(forAttributeBlock) {
         trial.media = media;
         trial.isAttribute = forAttributeBlock;
         if (trial.media === "image") {
-            currentBlock.imageSources.add(trial.stimulus);
+            block.imageSources.add(trial.stimulus);
         }
         updatedTrialNumber++;
     }
 }
 
-function updateCombinedBlockTrials() {
-    const blockTrialNumber = currentBlock.trials.length;
+function updateCombinedBlockTrials(block) {
+    const blockTrialNumber = block.trials.length;
     let updatedTrialNumber = 0;
     let sources = [attributeStimuli(), targetStimuli()];
-    let sourceNumber = Date.now() % 2;
+    // Each combined block starts from the attribute or the target stimuli at random
+    let sourceNumber = Math.random() < 0.5 ? 0 : 1;
     while (updatedTrialNumber < blockTrialNumber) {
-        let trial = currentBlock.trials[updatedTrialNumber];
+        let trial = block.trials[updatedTrialNumber];
         if (sources[sourceNumber].length < 1) {
             sources[sourceNumber] = sourceNumber === 0 ? attributeStimuli():targetStimuli()
         }
@@ -602,33 +657,113 @@ function updateCombinedBlockTrials() {
         trial.media = sourceNumber === 0 ? task.attributeStimulusType["media"]:task.targetStimulusType["media"];
         trial.isAttribute = sourceNumber === 0;
         if (trial.media === "image") {
-            currentBlock.imageSources.add(trial.stimulus);
+            block.imageSources.add(trial.stimulus);
         }
         sourceNumber = 1 - sourceNumber;
         updatedTrialNumber++;
     }
 }
 
-function preloadTrials() {
-    if (currentBlock.imageSources.size > 0) {
-        for (let i = 0; i < currentBlock.trials.length; i++) {
-            const trial = currentBlock.trials[i];
-            if (trial.media === "image") {
-                const image = new Image();
-                image.src = trial.stimulus;
-                image.onload = function () {
-                    currentBlock.loadedImages.add(trial.stimulus);
+function taskImageSources() {
+    let imageSources = [];
+    Object.entries(task.stimulusSources).forEach(([flag, stimuli]) => {
+        const stimulusType = "+-".includes(flag) ? task.attributeStimulusType:task.targetStimulusType;
+        if (stimulusType["media"] === "image") {
+            stimuli.forEach(stimulus => {
+                if (!imageSources.includes(stimulus)) {
+                    imageSources.push(stimulus);
                 }
+            });
+        }
+    });
+    return imageSources;
+}
+
+function preloadTaskImages() {
+    // Each unique image is downloaded once for the whole task, while the participant reads the instructions
+    preloadStartTime = performance.now();
+    taskImageSources().forEach(preloadImage);
+}
+
+function preloadImage(source) {
+    if (!preloadedImages[source]) {
+        preloadedImages[source] = {image: null, status: "", attempts: 0, duration: null, readyTime: null};
+    }
+    const preload = preloadedImages[source];
+    const image = new Image();
+    const startTime = performance.now();
+    if (preload.image && preload.image.parentNode) {
+        // The retried image takes the place of the failed one among the stimulus elements
+        image.className = preload.image.className;
+        image.setAttribute("style", preload.image.getAttribute("style"));
+        preload.image.parentNode.replaceChild(image, preload.image);
+        if (currentStimulusElement === preload.image) {
+            currentStimulusElement = image;
+        }
+    }
+    preload.image = image;
+    preload.status = "loading";
+    preload.attempts++;
+    image.onload = function () {
+        // Decode the image ahead of its display, so it's shown without the decoding delay
+        const decoding = image.decode ? image.decode():Promise.resolve();
+        decoding.catch(() => {}).then(() => {
+            if (preload.image === image) {
+                preload.status = "loaded";
+                preload.duration = performance.now() - startTime;
+                preload.readyTime = performance.now() - preloadStartTime;
             }
+        });
+    };
+    image.onerror = function () {
+        if (preload.image === image) {
+            preload.status = "failed";
+            preload.duration = performance.now() - startTime;
         }
+    };
+    image.src = source;
+}
+
+function loadedImageCount(imageSources) {
+    return imageSources.filter(source => preloadedImages[source] && preloadedImages[source].status === "loaded").length;
+}
+
+function retryFailedImages(imageSources) {
+    imageSources.forEach(source => {
+        const preload = preloadedImages[source];
+        if (preload && preload.status === "failed" && preload.attempts < maximumPreloadAttempts) {
+            preloadImage(source);
+        }
+    });
+}
+
+function savePreloadMetrics() {
+    const imageSources = Object.keys(preloadedImages);
+    if (imageSources.length < 1) {
+        return;
+    }
+    const preloads = imageSources.map(source => preloadedImages[source]);
+    const loadedPreloads = preloads.filter(preload => preload.status === "loaded");
+    const metrics = {
+        images: imageSources.length,
+        loaded: loadedPreloads.length,
+        retries: preloads.reduce((total, preload) => total + preload.attempts - 1, 0),
+        readyTime: Math.round(Math.max(0, ...loadedPreloads.map(preload => preload.readyTime))),
+        durations: preloads.map(preload => preload.status === "loaded" ? Math.round(preload.duration):null),
+        failed: imageSources.filter(source => preloadedImages[source].status !== "loaded")
+    };
+    let metricsFieldName = "preloadMetrics";
+    if (task.studyName.length > 0) {
+        metricsFieldName = task.studyName + "_preloadMetrics";
     }
+    Qualtrics.SurveyEngine.setEmbeddedData(metricsFieldName, JSON.stringify(metrics));
 }
 
 function beginBlock() {
-    // console.log("currentBlock.imageSources:", currentBlock.imageSources);
-    // console.log("currentBlock.loadedImages:", currentBlock.loadedImages);
-    if (currentBlock.imageSources.size > 0 &&
-        currentBlock.loadedImages.size < currentBlock.imageSources.size * task.minimumPreloadImagePercent / 100) {
+    const blockImageSources = Array.from(currentBlock.imageSources);
+    if (blockImageSources.length > 0 &&
+        loadedImageCount(blockImageSources) < blockImageSources.length * task.minimumPreloadImagePercent / 100) {
+        retryFailedImages(blockImageSources);
         showWarningMessage("Some stimuli are still being downloaded. Please try again later. If the problem" +
             "persists, please notify the research team.");
         return;
@@ -644,11 +779,9 @@ function loadNextTrial() {
     dismissErrorMessage();
     currentTrialNumber++;
     if (currentTrialNumber <= currentBlock.trials.length) {
-        updateElementsVisibility([
-            [fixationElement, "flex"],
-            [textElement, "none"],
-            [imageElement, "none"]
-        ]);
+        setStimulusStage("fixation");
+        const nextTrial = currentBlock.trials[currentTrialNumber - 1];
+        prepareStimulusElement(nextTrial.stimulus, nextTrial.media, nextTrial.isAttribute);
         setTimeout(loadStimulus, task.interTrialInterval);
     } else {
        launchBlock();
@@ -668,26 +801,64 @@ function updateElementsVisibility(elementDisplays) {
 
 function loadStimulus() {
     currentTrial = currentBlock.trials[currentTrialNumber - 1];
-    let elementsDisplays = [];
-    if (currentTrial.media === "image") {
-        imageElement.src = currentTrial.stimulus;
-        elementsDisplays.push([imageElement, "flex"]);
+    setStimulusStage("stimulus");
+    if (task.precisionTiming) {
+        timeStimulusOnset(currentTrial);
     } else {
-        textElement.style.color = currentTrial.isAttribute ? task.attributeWordColor:task.targetWordColor;
-        const textNode = textElement.childNodes[0];
-        textNode.nodeValue = currentTrial.stimulus;
-        elementsDisplays.push([textElement, "flex"]);
-    }
-    elementsDisplays.push([fixationElement, "none"]);
-    updateElementsVisibility(elementsDisplays);
-    currentTrial.startTime = Date.now();
+        currentTrial.startTime = Date.now();
+    }
     // console.log("loading next trial", currentTrial);
     // console.log("Correct Side: ", currentBlock.condition.includes(currentTrial.flag) ? "F":"J");
     if (task.automaticResponsesDelay > task.minimumAllowedReactionTime) {
-        setTimeout(applyAutomaticResponses, automaticResponsesDelay);
+        setTimeout(applyAutomaticResponses, task.automaticResponsesDelay);
     }
 }
 
+function currentTime() {
+    return task.precisionTiming ? performance.now():Date.now();
+}
+
+function timeStimulusOnset(trial) {
+    // The changed elements are painted in the next frame, whose start time is passed to the animation frame callback
+    const changeTime = performance.now();
+    requestAnimationFrame(frameTime => {
+        trial.startTime = Math.max(frameTime, changeTime);
+        trial.onsetLag = trial.startTime - changeTime;
+        requestAnimationFrame(nextFrameTime => {
+            // A frame interval longer than the usual frame duration means that the display skipped frames
+            const frameInterval = nextFrameTime - frameTime;
+            recordFrameInterval(frameInterval);
+            trial.droppedFrames = Math.max(Math.round(frameInterval / frameDuration) - 1, 0);
+        });
+    });
+}
+
+function calibrateFrameDuration() {
+    // The frame duration of the display is learned from a few animation frames when the task loads
+    let previousFrameTime = null;
+    const measureFrame = frameTime => {
+        if (previousFrameTime !== null) {
+            recordFrameInterval(frameTime - previousFrameTime);
+        }
+        previousFrameTime = frameTime;
+        if (frameIntervals.length < calibrationFrameNumber) {
+            requestAnimationFrame(measureFrame);
+        }
+    };
+    requestAnimationFrame(measureFrame);
+}
+
+function recordFrameInterval(frameInterval) {
+    // The usual frame duration is the median of the recent frame intervals, which isn't affected by dropped frames
+    // unless most of the frames are dropped, so displays slower than 60 Hz are measured at their own frame rate
+    frameIntervals.push(frameInterval);
+    if (frameIntervals.length > maximumFrameIntervals) {
+        frameIntervals.shift();
+    }
+    const sortedIntervals = frameIntervals.slice().sort((a, b) => a - b);
+    frameDuration = Math.max(sortedIntervals[Math.floor(sortedIntervals.length / 2)], 1000 / 240);
+}
+
 function applyAutomaticResponses() {
     let correctSide = currentBlock.condition.includes(currentTrial.flag) ? "l":"r";
     scoreResponse(correctSide)
@@ -725,7 +896,7 @@ function enterResponse(event) {
 }
 
 function scoreResponse(side) {
-    // don't score response during the ITI
+    // don't score response during the ITI, or before the stimulus frame is painted with the precision timing
     if (!currentTrial || !currentTrial.startTime) {
         // console.log("Next trial is not set yet: ", currentTrial);
         return;
@@ -735,7 +906,7 @@ function scoreResponse(side) {
     if (currentTrial.correct !== null && !task.requiresCorrection) {
         return;
     }
-    let reactionTime = Date.now() - currentTrial.startTime;
+    let reactionTime = Math.round(currentTime() - currentTrial.startTime);
     // prevent subjects from randomly answering the questions
     if (reactionTime < task.minimumAllowedReactionTime) {
         // console.log("Too fast, please slow down");
@@ -768,24 +939,69 @@ function scoreResponse(side) {
 function saveBlockResponses() {
     let blockResponses = [];
     let blockTrials = [];
+    let blockTimings = [];
     for (let i = 0; i < currentBlock.trials.length; i++) {
         let trial = currentBlock.trials[i];
         blockResponses.push([(i + 1).toString(), trial.correct ? "Y":"N", trial.reactionTime].join(""));
         blockTrials.push(trial.stimulus);
+        blockTimings.push([
+            trial.onsetLag === null ? "":trial.onsetLag.toFixed(1),
+            trial.droppedFrames === null ? "":trial.droppedFrames
+        ].join(":"));
     }
     // console.log("Block Responses:", blockResponses);
     var responsePrefix = "block";
     if (task.studyName.length > 0) {
         responsePrefix = task.studyName + "_block";
     }
+    let savedResponses = blockResponses.join(task.interTrialResponseSeparator);
+    let savedTrials = blockTrials.toString();
+    if (task.compactEncoding) {
+        savedResponses = packBlockResponses(currentBlock.trials);
+        savedTrials = packBlockTrials(currentBlock.trials);
+    }
     Qualtrics.SurveyEngine.setEmbeddedData(
         responsePrefix + currentBlockNumber.toString() + "Responses",
-        blockResponses.join(task.interTrialResponseSeparator)
+        savedResponses
     );
     Qualtrics.SurveyEngine.setEmbeddedData(
         responsePrefix + currentBlockNumber.toString() + "Trials",
-        blockTrials.toString()
+        savedTrials
     );
+    if (task.precisionTiming) {
+        Qualtrics.SurveyEngine.setEmbeddedData(
+            responsePrefix + currentBlockNumber.toString() + "Timing",
+            blockTimings.join(task.interTrialResponseSeparator)
+        );
+    }
+    savePreloadMetrics();
+}
+
+function packValues(values, byteWidth) {
+    // Each value is saved as big-endian bytes of the fixed width, and the bytes are encoded in base64
+    let bytes = [];
+    values.forEach(value => {
+        for (let shift = 8 * (byteWidth - 1); shift >= 0; shift -= 8) {
+            bytes.push(String.fromCharCode(Math.floor(value / 2 ** shift) % 256));
+        }
+    });
+    return btoa(bytes.join(""));
+}
+
+function packBlockResponses(trials) {
+    // Each response is 24 bits: the reaction time shifted by one bit and the correctness, all bits set when missing
+    return "~" + packValues(trials.map(trial => {
+        if (trial.reactionTime === null) {
+            return 0xFFFFFF;
+        }
+        return Math.min(Math.round(trial.reactionTime), 0x7FFFFE) * 2 + (trial.correct ? 1:0);
+    }), 3);
+}
+
+function packBlockTrials(trials) {
+    // Each stimulus is saved as its index in the task's stimulus table, in one byte or two bytes for large tables
+    const byteWidth = stimulusIndices.size > 256 ? 2:1;
+    return "~" + byteWidth + packValues(trials.map(trial => stimulusIndices.get(trial.stimulus)), byteWidth);
 }
 
 function showBlockInstruction() {
@@ -800,10 +1016,9 @@ function showBlockInstruction() {
         updateElementsVisibility([
             [buttons, "block"],
             [instructionElement, "block"],
-            [actionButton, "none"],
-            [textElement, "none"],
-            [imageElement, "none"]
+            [actionButton, "none"]
         ]);
+        setStimulusStage("none");
     }
     instructionElement.innerHTML = currentBlock.instruction;
 }
@@ -1,8 +1,17 @@
-import base64
+import gzip
+import hashlib
+import importlib.util
+import io
 import json
+import math
+import tempfile
+import time
+import numpy as np
+import pandas as pd
 import streamlit as st
 import qualtrics_tools
 import iat_scorer
+import job_scheduler
 import script_generator
 
 
@@ -16,12 +25,30 @@ if "working_task" not in session_state:
     session_state.working_task = None
 if "iat_data" not in session_state:
     session_state.iat_data = None
+if "iat_data_version" not in session_state:
+    session_state.iat_data_version = None
+if "scoring_results" not in session_state:
+    session_state.scoring_results = None
+if "scoring_jobs" not in session_state:
+    session_state.scoring_jobs = None
+if "prepared_downloads" not in session_state:
+    session_state.prepared_downloads = dict()
+if "table_previews" not in session_state:
+    session_state.table_previews = dict()
+if "result_cache" not in session_state:
+    session_state.result_cache = iat_scorer.IATResultCache()
 if "tool" not in session_state:
     session_state.tool = qualtrics_tools.QualtricsTool()
 
 tool = session_state.tool
 
 
+@st.experimental_singleton
+def get_job_scheduler():
+    """The job scheduler shared by all sessions, which caps the concurrent scoring jobs on the host"""
+    return job_scheduler.JobScheduler(max_workers=2, max_jobs=8)
+
+
 def _set_width(width):
     st.markdown(
         f"""<style>.reportview-container .main .block-container{{max-width: {width}px;}}</style>""",
@@ -38,13 +65,111 @@ def _preview_instructions(instruction, container):
             container.markdown("___")
 
 
-def create_downloadable_link(encoded, file_name, link_name, container, /, requires_encoding=True, filetype='txt'):
-    if requires_encoding:
-        encoded = encoded.encode()
-    encoded_script = base64.b64encode(encoded).decode()
-    href = f'<a href="data:file/{filetype};base64,{encoded_script}" ' \
-           f'download="{file_name}">{link_name}</a>'
-    container.markdown(href, unsafe_allow_html=True)
+TABLE_DOWNLOAD_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/octet-stream")
+}
+
+
+def available_table_formats():
+    """The formats for downloading tables, Parquet is available when pyarrow or fastparquet is installed"""
+    parquet_available = any(importlib.util.find_spec(x) for x in ("pyarrow", "fastparquet"))
+    return [x for x in TABLE_DOWNLOAD_FORMATS if x != "Parquet" or parquet_available]
+
+
+def serialize_table(table, file_format, chunk_size=50_000):
+    """Serialize the table for downloading, CSV tables are written in chunks
+    :param table: DataFrame, the table to be serialized
+    :param file_format: str, one of the keys in TABLE_DOWNLOAD_FORMATS
+    :param chunk_size: int, the number of rows written at a time
+    :return bytes, the serialized table
+    """
+    buffer = io.BytesIO()
+    if file_format == "Parquet":
+        table.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    binary_file = gzip.GzipFile(fileobj=buffer, mode="wb") if file_format == "CSV (gzip)" else buffer
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8", newline="")
+    for start in range(0, max(len(table), 1), chunk_size):
+        table.iloc[start:start + chunk_size].to_csv(text_file, header=start == 0, index=False)
+    text_file.flush()
+    text_file.detach()
+    if binary_file is not buffer:
+        binary_file.close()
+    return buffer.getvalue()
+
+
+def offer_table_download(table, file_stem, label, container, key, version=None):
+    """Offer a table for downloading, which is serialized only after the user asks to prepare the file
+    :param table: DataFrame, the table to be downloaded
+    :param file_stem: str, the file name without the extension
+    :param label: str, the name of the table shown on the buttons
+    :param container: the Streamlit container where the widgets are shown
+    :param key: str, the unique key of the download
+    :param version: the version of the table, which invalidates the prepared file when it changes
+    """
+    format_column, prepare_column = container.columns(2)
+    file_format = format_column.selectbox(f"{label} File Format", available_table_formats(), key=f"{key}_format")
+    prepared_download = session_state.prepared_downloads.get(key)
+    if prepared_download is None or prepared_download[0] != (version, file_format):
+        if not prepare_column.button(f"Prepare {label}", key=f"{key}_prepare"):
+            return
+        with st.spinner(f"Preparing {label}..."):
+            prepared_download = session_state.prepared_downloads[key] = \
+                (version, file_format), serialize_table(table, file_format)
+    file_extension, mime = TABLE_DOWNLOAD_FORMATS[file_format]
+    prepare_column.download_button(
+        f"Download {label}", prepared_download[1], f"{file_stem}{file_extension}", mime, key=f"{key}_download"
+    )
+
+
+def show_table_preview(table, container, key, version=None, page_sizes=(25, 50, 100, 250)):
+    """Show a page of the table, which is filtered and sorted on the server, so only the visible rows are sent
+    :param table: DataFrame, the table to be previewed
+    :param container: the Streamlit container where the widgets are shown
+    :param key: str, the unique key of the preview
+    :param version: the version of the table, which invalidates the cached filtering and sorting when it changes
+    :param page_sizes: tuple, the options of the number of rows per page
+    """
+    preview = session_state.table_previews.get(key)
+    if preview is None or preview["version"] != version:
+        studies = sorted(table["study"].dropna().unique()) if "study" in table.columns else []
+        preview = session_state.table_previews[key] = {"version": version, "studies": studies, "row_orders": {}}
+
+    filter_columns = container.columns(4)
+    study = "All"
+    if preview["studies"]:
+        study = filter_columns[0].selectbox("Study", ["All", *preview["studies"]], key=f"{key}_study")
+    response_id = ""
+    if "ResponseId" in table.columns:
+        response_id = filter_columns[1].text_input("ResponseId Starts With", key=f"{key}_response_id").strip()
+    sort_column = filter_columns[2].selectbox("Sort By", ["(None)", *table.columns], key=f"{key}_sort")
+    ascending = filter_columns[3].selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Ascending"
+
+    # Only the latest filtered and sorted row positions are kept
+    order_key = study, response_id, sort_column, ascending
+    row_order = preview["row_orders"].get(order_key)
+    if row_order is None:
+        selected = np.ones(len(table), dtype=bool)
+        if study != "All":
+            selected &= (table["study"] == study).to_numpy()
+        if response_id:
+            selected &= table["ResponseId"].astype(str).str.startswith(response_id).to_numpy()
+        row_order = np.flatnonzero(selected)
+        if sort_column != "(None)":
+            sort_values = pd.Series(table[sort_column].to_numpy()[row_order])
+            row_order = row_order[sort_values.sort_values(ascending=ascending, kind="stable").index.to_numpy()]
+        preview["row_orders"] = {order_key: row_order}
+
+    page_columns = container.columns(2)
+    page_size = page_columns[0].selectbox("Rows per Page", page_sizes, key=f"{key}_page_size")
+    page_count = max(1, math.ceil(len(row_order) / page_size))
+    page = page_columns[1].number_input(f"Page (1-{page_count})", 1, page_count, 1, key=f"{key}_page_{page_count}")
+    start = (page - 1) * page_size
+    container.dataframe(table.iloc[row_order[start:start + page_size]])
+    container.caption(f"Showing rows {min(start + 1, len(row_order))}-{min(start + page_size, len(row_order))} "
+                      f"of {len(row_order)} (total rows: {len(table)})")
 
 
 def _load_generator():
@@ -63,32 +188,60 @@ def _load_generator():
 
     sidebar.markdown("____")
     sidebar.header("Actions")
+    optimized_script = sidebar.checkbox(
+        "Optimize Script", value=False,
+        help="Minify the script and shorten the image URLs, which makes the survey load faster for participants. "
+             "The task runs the same way."
+    )
+    if optimized_script:
+        script_savings = working_task.script_savings()
+        sidebar.markdown(f"The script is reduced from {script_savings['original_bytes']:,} to "
+                         f"{script_savings['optimized_bytes']:,} bytes ({script_savings['saved_percent']}% smaller).")
+
     sidebar.markdown("#### Generate Qualtrics File (QSF)")
     sidebar.markdown("Use this file to create a new survey. "
                      "If your Qualtrics subscription doesn't support this feature, "
                      "use the _Generate Script_ button below instead.")
     qsf_button = sidebar.button("Generate Template (QSF)")
     if qsf_button:
-        template_js = working_task.generate_template_file()
-        create_downloadable_link(
+        template_js = working_task.generate_template_file(optimized_script)
+        sidebar.download_button(
+            "Download Qualtrics Template File",
             template_js,
             "iat_qualtrics_template.qsf",
-            "Download Qualtrics Template File",
-            sidebar
+            "application/json"
         )
 
     sidebar.markdown("#### Generate JavaScript Script (JS)")
     sidebar.markdown("You'll build your survey yourself. The script will be added to the presentation question.")
     js_button = sidebar.button("Generate Script (JS)")
     if js_button:
-        generated_script = working_task.generate_script()
-        create_downloadable_link(
+        generated_script = working_task.generate_script(optimized_script)
+        sidebar.download_button(
+            "Download Question JS Code",
             generated_script,
             "iat_questionjs_script.js",
-            "Download Question JS Code",
-            sidebar
+            "text/javascript"
         )
 
+    sidebar.markdown("#### Generate Multi-IAT Qualtrics File (QSF)")
+    sidebar.markdown("Combine several templates, with your changes, into one survey with one block for each IAT. "
+                     "Each template needs a distinct study name without underscores.")
+    composed_template_names = sidebar.multiselect("Templates to Combine", IATTask.templates_names)
+    if sidebar.button("Generate Multi-IAT Template (QSF)") and composed_template_names:
+        try:
+            composed_qsf = script_generator.compose_template_file(
+                [templates[IATTask.templates_names.index(x)] for x in composed_template_names], optimized_script)
+        except ValueError as e:
+            sidebar.error(str(e))
+        else:
+            sidebar.download_button(
+                "Download Multi-IAT Qualtrics Template File",
+                composed_qsf,
+                "iat_qualtrics_multi_template.qsf",
+                "application/json"
+            )
+
     st.header("IAT Qualtrics Survey Generator")
     st.subheader("")
     st.subheader("Target Concepts")
@@ -430,6 +583,37 @@ def _load_generator():
     )
     st.markdown("___")
 
+    st.subheader("Precision Timing")
+    working_task.precision_timing = st.checkbox(
+        "Measure reaction times from the stimulus' display on the screen",
+        working_task.precision_timing
+    )
+    if working_task.precision_timing:
+        st.markdown(
+            "The reaction times will be measured with the high-resolution clock from the frame that displays the "
+            "stimulus. Each trial's onset lag (ms) and dropped frames will be saved in the blockNTiming fields, which "
+            "the scorer uses to report the timing quality of each session."
+        )
+    else:
+        st.markdown("The reaction times will be measured from the time when the stimulus is set to be displayed.")
+    st.markdown("___")
+
+    st.subheader("Compact Encoding")
+    working_task.compact_encoding = st.checkbox(
+        "Save the responses and trials in the compact encoding",
+        working_task.compact_encoding
+    )
+    if working_task.compact_encoding:
+        st.markdown(
+            "The responses will be saved as packed reaction times and correctness, and the trials as the indices of "
+            "the stimuli in the stimulus table below, which makes the embedded data much smaller for image stimuli. "
+            "To score the data, paste the stimulus table in the scorer's data parsing options."
+        )
+        st.code("\n".join(working_task.stimulus_table))
+    else:
+        st.markdown("The responses and trials will be saved as text, such as 1Y650_2N720 and the stimuli.")
+    st.markdown("___")
+
     st.subheader("Inter-Trial Response Separator")
     working_task.inter_trial_response_separator = st.text_input(
         "The Delimiter",
@@ -513,16 +697,21 @@ def _load_qualtrics_tools():
     upload_section.markdown(url_note)
     image_type = upload_section.selectbox("Image File Type", ['png', 'jpg', 'gif'])
     image_files = upload_section.file_uploader("Choose Images", ['png', 'jpg', 'gif'], True)
+    upload_workers = upload_section.slider("Concurrent Uploads", 1, 8, 4)
     upload_button = upload_section.button("Upload")
     if upload_button and image_files:
-        image_urls = tool.upload_images_web(
+        upload_report = tool.upload_images_web(
             image_files,
             library_id,
             full_url,
             qualtrics_folder,
-            image_type
+            image_type,
+            max_workers=upload_workers,
+            with_report=True
         )
-        upload_section.text_area("Image URLs", image_urls)
+        upload_section.text_area("Image URLs", [x["url"] for x in upload_report if x["status"] == "Uploaded"])
+        for failed_upload in (x for x in upload_report if x["status"] == "Error"):
+            upload_section.error(f"Failed to upload {failed_upload['file']}: {failed_upload['error']}")
     st.markdown("____")
 
     st.markdown("#### Create Surveys")
@@ -557,15 +746,28 @@ def _load_qualtrics_tools():
     file_format = export_section.selectbox("File Format", file_formats)
     export_button = export_section.button("Export")
     if export_button:
-        export_content = tool.export_responses(survey_id, file_format)
-        create_downloadable_link(
-            export_content,
-            "survey_responses.zip",
-            "Download survey_responses.zip",
-            export_section,
-            filetype="js",
-            requires_encoding=False
-        )
+        export_progress = export_section.progress(0)
+        with tempfile.TemporaryFile() as export_file:
+            try:
+                download_report = tool.download_responses(
+                    survey_id,
+                    export_file,
+                    file_format,
+                    progress_callback=lambda percent_complete, _: export_progress.progress(int(percent_complete))
+                )
+            except (qualtrics_tools.ExportError, TimeoutError) as e:
+                export_section.error(str(e))
+            else:
+                export_file.seek(0)
+                export_section.download_button(
+                    "Download survey_responses.zip",
+                    export_file,
+                    "survey_responses.zip",
+                    "application/zip"
+                )
+                export_section.caption(
+                    f"Size: {download_report['size']:,} bytes, SHA-256: {download_report['sha256']}"
+                )
     st.markdown("____")
 
     st.markdown("#### Delete Images")
@@ -574,12 +776,14 @@ def _load_qualtrics_tools():
     delete_section.markdown("You can specify a list of either URLs or image ids.")
     delete_library_id = delete_section.text_input("Library ID #", key="for_deletion")
     delete_image_ids = delete_section.text_area("Image IDs")
+    delete_workers = delete_section.slider("Concurrent Deletions", 1, 8, 4)
     delete_button = delete_section.button("Delete")
     if delete_button and delete_image_ids:
         delete_image_ids = eval(delete_image_ids)
         if isinstance(delete_image_ids, list):
-            delete_report = tool.delete_images(delete_library_id, delete_image_ids)
-            delete_section.write(delete_report)
+            delete_report = tool.delete_images(
+                delete_library_id, delete_image_ids, max_workers=delete_workers, with_report=True)
+            delete_section.dataframe(pd.DataFrame(delete_report))
         else:
             delete_section.error("Please specify the list of image IDs.")
     st.markdown("____")
@@ -642,23 +846,47 @@ def _load_scorer():
     sidebar.markdown("10. Average the two quotients.")
 
     st.header("IAT Data Scorer")
-    st.markdown("This scorer scores the data of the Qualtrics IAT survey in the CSV format.")
-    data_file = st.file_uploader("IAT Data File", ["csv"])
+    st.markdown("This scorer scores the data of the Qualtrics IAT survey in the CSV or Excel (xlsx) format.")
+    data_file = st.file_uploader("IAT Data File", ["csv", "xlsx"])
     if data_file:
-        session_state.iat_data = iat_scorer.IATData(data_file)
-        session_state.iat_data.iat_data
-        iat_data_clean = session_state.iat_data.clean_up()
-        st.write(iat_data_clean)
+        # Parse and clean up the data only when the file or the parse options change, not on every rerun
+        parse_section = st.expander("Data Parsing Options")
+        parse_options = {
+            "trial_response_separator": parse_section.text_input("Separator Between Trial Responses", "_"),
+            "suffix_responses": parse_section.text_input("Suffix of the Trial Responses Fields", "Responses"),
+            "suffix_trials": parse_section.text_input("Suffix of the Trial Stimuli Fields", "Trials"),
+            "suffix_conditions": parse_section.text_input("Suffix of the Block Conditions Field", "blockConditions"),
+            "suffix_timing": parse_section.text_input("Suffix of the Trial Timing Fields", "Timing"),
+            "stimulus_table": tuple(x.strip() for x in parse_section.text_area(
+                "Stimulus Table for the Compact Encoding (One Stimulus per Line)").splitlines() if x.strip()) or None
+        }
+        data_version = (hashlib.sha256(data_file.getvalue()).hexdigest(), data_file.name,
+                        tuple(sorted(parse_options.items())))
+        if session_state.iat_data is None or session_state.iat_data_version != data_version:
+            with st.spinner("Cleaning up the data..."):
+                session_state.iat_data = iat_scorer.IATData(data_file, **parse_options)
+                session_state.iat_data.clean_up()
+            session_state.iat_data_version = data_version
+        iat_data_clean = session_state.iat_data.iat_data_clean
+        show_table_preview(iat_data_clean, st, "trial_data", session_state.iat_data_version)
         st.write(
             "Note: task (sin=single-label blocks, con=congruent blocks, inc=incongruent blocks. "
             "If you counter-balance the block order, it will be considered."
         )
-        create_downloadable_link(
-            iat_data_clean.to_csv(index=False),
-            "IAT_Trial_Data.csv",
-            "Download IAT Trial Data",
-            st
+        offer_table_download(
+            iat_data_clean, "IAT_Trial_Data", "IAT Trial Data", st, "trial_data", session_state.iat_data_version
         )
+        timing_quality = session_state.iat_data.timing_quality()
+        if not timing_quality.empty:
+            st.subheader("Timing Quality")
+            st.write(
+                "The sessions recorded with the precision timing are summarized by their stimulus onset lags (ms) "
+                "and dropped frames. The timing isn't acceptable when the median onset lag is over 34 ms or over 10% "
+                "of the trials have dropped frames, which often comes from under-powered devices."
+            )
+            show_table_preview(timing_quality, st, "timing_quality", session_state.iat_data_version)
+            offer_table_download(timing_quality, "IAT_Timing_Quality", "IAT Timing Quality", st, "timing_quality",
+                                 session_state.iat_data_version)
     iat_data = session_state.iat_data
 
     algorithms = ["Conventional Algorithm", "Improved Algorithm"]
@@ -781,33 +1009,102 @@ def _load_scorer():
                      "Please make sure that your experiment actually recorded the reaction time to the correct "
                      "response when an error is noted for a trial.")
 
+    bootstrap_replicates = 0
+    if st.checkbox("Estimate the score's confidence interval for each response (bootstrap)"):
+        bootstrap_cols = st.columns(2)
+        bootstrap_replicates = bootstrap_cols[0].number_input(
+            "Bootstrap Replicates", value=2000, min_value=100, max_value=10000, step=100
+        )
+        bootstrap_confidence_level = bootstrap_cols[1].slider(
+            "Confidence Level", value=0.95, min_value=0.8, max_value=0.99, step=0.01
+        )
+
     if st.button("Calculate"):
         if iat_data is None:
             st.error("Please upload your data first.")
             return
         algorithm_method = "improved" if selected_algorithm_index else "conventional"
         algorithm = iat_scorer.IATAlgorithm(algorithm_method, **calculation_params)
-        scoring_summary, scored_iat_data = algorithm.process_data(iat_data)
+        scoring_version = (session_state.iat_data_version, repr(algorithm), bootstrap_replicates)
+        scoring_results = session_state.result_cache.get(algorithm, iat_data)
+        scoring_jobs = dict()
+        try:
+            if scoring_results is None:
+                scoring_jobs["Scoring"] = get_job_scheduler().submit(
+                    job_scheduler.score_data, iat_data, algorithm.name, algorithm.params)
+            if bootstrap_replicates:
+                scoring_jobs["Bootstrap"] = get_job_scheduler().submit(
+                    job_scheduler.bootstrap_data, iat_data, algorithm.name, algorithm.params,
+                    bootstrap_replicates, bootstrap_confidence_level, 0)
+        except job_scheduler.SchedulerBusyError as e:
+            for job in scoring_jobs.values():
+                job.cancel()
+            st.error(str(e))
+            return
+        session_state.scoring_jobs = scoring_version, algorithm, scoring_results, scoring_jobs
+
+    # The jobs keep running when the page reruns, and the page resumes showing their progress
+    if session_state.scoring_jobs is not None:
+        _wait_for_scoring_jobs(iat_data)
+
+    # Keep showing the results when the page reruns, such as when the downloads are prepared
+    if session_state.scoring_results is not None and \
+            session_state.scoring_results[0][0] == session_state.iat_data_version:
+        scoring_version, algorithm, scoring_summary, scored_iat_data = session_state.scoring_results
         st.write("Scoring Parameters")
         st.code(algorithm)
         st.write("___")
         st.write("Scored Data Overall Summary")
         st.write(scoring_summary)
-        create_downloadable_link(
-            scoring_summary.to_csv(index=False),
-            "IAT_Data_Scoring_Summary.csv",
-            "Download IAT Scoring Summary",
-            st
+        offer_table_download(
+            scoring_summary, "IAT_Data_Scoring_Summary", "IAT Scoring Summary", st, "scoring_summary", scoring_version
         )
         st.write("___")
         st.write("Scored Data by Response")
-        st.write(scored_iat_data)
-        create_downloadable_link(
-            scored_iat_data.to_csv(index=False),
-            "IAT_Data_Score.csv",
-            "Download IAT Scores",
-            st
-        )
+        show_table_preview(scored_iat_data, st, "scores", scoring_version)
+        offer_table_download(scored_iat_data, "IAT_Data_Score", "IAT Scores", st, "scores", scoring_version)
+
+
+def _wait_for_scoring_jobs(iat_data):
+    """Show the progress of the scoring jobs, and keep their results in the session state when they finish"""
+    scoring_version, algorithm, scoring_results, scoring_jobs = session_state.scoring_jobs
+    if st.button("Cancel Scoring"):
+        for job in scoring_jobs.values():
+            job.cancel()
+        session_state.scoring_jobs = None
+        st.warning("The scoring was cancelled.")
+        return
+
+    progress_texts = {job_name: st.empty() for job_name in scoring_jobs}
+    progress_bars = {job_name: st.progress(0.0) for job_name in scoring_jobs}
+    while True:
+        for job_name, job in scoring_jobs.items():
+            stage, fraction = job.poll()
+            progress_texts[job_name].text(f"{job_name}: {stage}")
+            progress_bars[job_name].progress(min(max(fraction, 0.0), 1.0))
+        if all(job.done() for job in scoring_jobs.values()):
+            break
+        time.sleep(0.25)
+    for placeholder in (*progress_texts.values(), *progress_bars.values()):
+        placeholder.empty()
+    session_state.scoring_jobs = None
+
+    try:
+        if "Scoring" in scoring_jobs:
+            scoring_results = scoring_jobs["Scoring"].result()
+            session_state.result_cache.put(algorithm, iat_data, scoring_results)
+        scoring_summary, scored_iat_data = scoring_results
+        if "Bootstrap" in scoring_jobs:
+            bootstrap_data = scoring_jobs["Bootstrap"].result()
+            scored_iat_data = scored_iat_data.merge(
+                bootstrap_data, on=[x for x in iat_data.grouped_by if x in bootstrap_data.columns], how="left")
+    except job_scheduler.JobCancelledError:
+        st.warning("The scoring was cancelled.")
+        return
+    except Exception as e:
+        st.error(f"Failed to score the data: {e}")
+        return
+    session_state.scoring_results = scoring_version, algorithm, scoring_summary, scored_iat_data
 
 
 def _load_sidebar():
@@ -0,0 +1,67 @@
+// Tests of the block schedule, the trials of all blocks generated when the task loads
+// Run with: node --test, from the repository folder
+const assert = require("assert");
+const test = require("node:test");
+const vm = require("vm");
+const {wordTask, imageTask, generateScript, createTaskContext} = require("./iat_script_harness");
+
+function prepareSchedules(taskParams, scheduleCount = 1) {
+    const {context} = createTaskContext();
+    vm.runInContext(generateScript(taskParams), context);
+    return JSON.parse(vm.runInContext(`
+        randomizeBlockConditions();
+        prepareStimuliFlags();
+        let schedules = [];
+        for (let i = 0; i < ${scheduleCount}; i++) {
+            prepareBlockSchedule();
+            schedules.push(blockSchedule.map(block => ({trials: block.trials, imageSources: [...block.imageSources]})));
+        }
+        JSON.stringify({
+            blockConditions: task.blockConditions,
+            blockTrialNumbers: task.blockTrialNumbers,
+            stimulusSources: task.stimulusSources,
+            schedules: schedules
+        });
+    `, context));
+}
+
+for (const [taskName, taskParams] of [["words", wordTask], ["images", imageTask]]) {
+    test(`the schedule has the trials of all blocks (${taskName})`, () => {
+        const {blockConditions, blockTrialNumbers, stimulusSources, schedules} = prepareSchedules(taskParams);
+        const schedule = schedules[0];
+        assert.strictEqual(schedule.length, blockConditions.length);
+        schedule.forEach((block, blockIndex) => {
+            const condition = blockConditions[blockIndex];
+            assert.strictEqual(block.trials.length, blockTrialNumbers[blockIndex]);
+            block.trials.forEach((trial, trialIndex) => {
+                assert.ok(stimulusSources[trial.flag].includes(trial.stimulus), `${trial.stimulus} isn't ${trial.flag}`);
+                assert.strictEqual(trial.isAttribute, "+-".includes(trial.flag));
+                assert.strictEqual(trial.correct, null);
+                if (condition.includes("x")) {
+                    // The single blocks have only the attribute or only the target stimuli
+                    assert.strictEqual(trial.isAttribute, "+-".includes(condition[1]));
+                } else if (trialIndex > 0) {
+                    // The combined blocks alternate between the attribute and the target stimuli
+                    assert.notStrictEqual(trial.isAttribute, block.trials[trialIndex - 1].isAttribute);
+                }
+            });
+            const imageStimuli = block.trials.filter(x => x.media === "image").map(x => x.stimulus);
+            assert.deepStrictEqual([...block.imageSources].sort(), [...new Set(imageStimuli)].sort());
+        });
+        if (taskName === "images") {
+            assert.ok(schedule.some(block => block.imageSources.length > 0));
+        }
+    });
+}
+
+test("each combined block starts from the attribute or the target stimuli at random", () => {
+    // The schedules are prepared at the same clock time, so the starts can't depend on the time
+    const {blockConditions, schedules} = prepareSchedules(wordTask, 400);
+    const combinedBlockIndices = blockConditions.map((x, i) => x.includes("x") ? null : i).filter(x => x !== null);
+    const blockStarts = schedules.map(schedule => combinedBlockIndices.map(i => schedule[i].trials[0].isAttribute));
+    const attributeStartRate = blockStarts.flat().filter(x => x).length / blockStarts.flat().length;
+    const mixedScheduleRate = blockStarts.filter(x => new Set(x).size > 1).length / schedules.length;
+    assert.ok(attributeStartRate > 0.4 && attributeStartRate < 0.6, `attribute start rate ${attributeStartRate}`);
+    // The starts of four combined blocks are all the same in 1/8 of the schedules
+    assert.ok(mixedScheduleRate > 0.8 && mixedScheduleRate < 0.95, `mixed schedule rate ${mixedScheduleRate}`);
+});
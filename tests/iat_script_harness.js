@@ -0,0 +1,246 @@
+// Helpers for running the generated IAT question scripts in Node, with a minimal fake DOM and Qualtrics engine
+// The clock and the random numbers are simulated, so the same script always records the same data.
+const childProcess = require("child_process");
+const path = require("path");
+const vm = require("vm");
+
+const packageFolder = path.join(__dirname, "..", "qualtrics_iat");
+
+const wordTask = {
+    target_positive_concept: "Flowers",
+    target_negative_concept: "Insects",
+    target_positive_stimuli: ["rose", "tulip", "daisy"],
+    target_negative_stimuli: ["ant", "wasp", "moth"],
+    attribute_positive_concept: "Good",
+    attribute_negative_concept: "Bad",
+    attribute_positive_stimuli: ["joy", "love", "peace"],
+    attribute_negative_stimuli: ["agony", "awful", "evil"],
+    automatic_responses_delay: 500,
+    show_examples: false
+};
+
+const imagePrefix = "https://example.qualtrics.com/ControlPanel/Graphic.php?IM=";
+const imageTask = {
+    ...wordTask,
+    target_positive_stimuli: [0, 1, 2, 3].map(i => `${imagePrefix}IM_flower${i}`),
+    target_negative_stimuli: [0, 1, 2, 3].map(i => `${imagePrefix}IM_insect${i}`),
+    target_stimulus_media: "image"
+};
+
+function generateScript(taskParams, optimized = false) {
+    // The scripts are generated by script_generator, so the tests follow the templates and the generator
+    const code = [
+        "import json, sys",
+        "import script_generator",
+        "task = script_generator.IATTask(**json.loads(sys.argv[1]))",
+        "sys.stdout.write(task.generate_script(optimized=sys.argv[2] == 'optimized'))"
+    ].join("\n");
+    return childProcess.execFileSync(process.env.PYTHON || "python3",
+        ["-c", code, JSON.stringify(taskParams), optimized ? "optimized" : "default"],
+        {cwd: packageFolder, encoding: "utf8"});
+}
+
+function seededRandom(seed) {
+    // The Park-Miller generator, which makes the shuffles and the counterbalancing reproducible
+    let state = seed;
+    return () => {
+        state = (state * 16807) % 2147483647;
+        return (state - 1) / 2147483646;
+    };
+}
+
+function createElement(tagName, registry, element = {}) {
+    Object.assign(element, {
+        tagName: tagName.toUpperCase(),
+        id: "",
+        className: "",
+        style: {},
+        attributes: {},
+        children: [],
+        childNodes: [],
+        parentNode: null,
+        innerHTML: "",
+        setAttribute(name, value) {
+            this.attributes[name] = value;
+        },
+        getAttribute(name) {
+            return this.attributes[name];
+        },
+        appendChild(child) {
+            child.parentNode = this;
+            this.children.push(child);
+            this.childNodes.push(child);
+            return child;
+        },
+        replaceChild(newChild, oldChild) {
+            const index = this.children.indexOf(oldChild);
+            this.children[index] = newChild;
+            this.childNodes[index] = newChild;
+            newChild.parentNode = this;
+            oldChild.parentNode = null;
+        },
+        remove() {
+            if (this.parentNode) {
+                this.parentNode.children.splice(this.parentNode.children.indexOf(this), 1);
+                this.parentNode.childNodes.splice(this.parentNode.childNodes.indexOf(this), 1);
+                this.parentNode = null;
+            }
+        },
+        addEventListener(type, listener) {
+            (registry.listeners[type] = registry.listeners[type] || []).push(listener);
+        },
+        removeEventListener() {}
+    });
+    element.classList = {
+        names: () => element.className.split(" ").filter(x => x),
+        add(name) {
+            if (!this.contains(name)) {
+                element.className = [...this.names(), name].join(" ");
+            }
+        },
+        remove(name) {
+            element.className = this.names().filter(x => x !== name).join(" ");
+        },
+        replace(oldName, newName) {
+            if (!this.contains(oldName)) {
+                return false;
+            }
+            element.className = this.names().map(x => x === oldName ? newName : x).join(" ");
+            return true;
+        },
+        contains(name) {
+            return this.names().includes(name);
+        }
+    };
+    return element;
+}
+
+function findElement(root, predicate) {
+    if (predicate(root)) {
+        return root;
+    }
+    for (const child of root.children || []) {
+        const found = findElement(child, predicate);
+        if (found) {
+            return found;
+        }
+    }
+    return null;
+}
+
+function createTaskContext(seed = 7, frameInterval = 16) {
+    // The context of a survey page that runs a question script, with simulated timers, frames, and image loading
+    const registry = {listeners: {}, timers: [], clock: 0, onload: null, finished: false, embeddedData: {}};
+    const body = createElement("body", registry);
+    const head = createElement("head", registry);
+    const questionBody = createElement("div", registry);
+    const header = createElement("div", registry);
+    questionBody.className = "QuestionBody";
+    header.id = "Header";
+    body.appendChild(questionBody);
+    body.appendChild(header);
+    const schedule = (delay, callback) => {
+        registry.timers.push({time: registry.clock + (delay || 0), order: registry.timers.length, callback});
+        return registry.timers.length;
+    };
+
+    class Image {
+        constructor() {
+            createElement("img", registry, this);
+        }
+
+        set src(source) {
+            this.source = source;
+            schedule(5, () => this.onload && this.onload());
+        }
+
+        get src() {
+            return this.source;
+        }
+
+        decode() {
+            return Promise.resolve();
+        }
+    }
+
+    const context = {
+        console: {log() {}, warn() {}, error() {}},
+        Set, Map, Object, Array, JSON, Promise, Image,
+        Math: Object.assign(Object.create(Math), {random: seededRandom(seed)}),
+        Date: {now: () => Math.floor(registry.clock)},
+        performance: {now: () => registry.clock},
+        navigator: {userAgent: ""},
+        screen: {width: 1280, height: 800},
+        btoa: text => Buffer.from(text, "binary").toString("base64"),
+        setTimeout: (callback, delay) => schedule(delay, callback),
+        clearTimeout() {},
+        requestAnimationFrame: callback => schedule(frameInterval, () => callback(registry.clock)),
+        document: {
+            body, head,
+            createElement: tagName => createElement(tagName, registry),
+            createTextNode: text => ({nodeValue: text}),
+            getElementsByClassName: name => name === "QuestionBody" ? [questionBody] : [],
+            getElementById: id => findElement(body, x => x.id === id) || findElement(head, x => x.id === id)
+        },
+        window: {
+            addEventListener(type, listener) {
+                (registry.listeners[type] = registry.listeners[type] || []).push(listener);
+            },
+            removeEventListener() {},
+            focus() {}
+        },
+        jQuery: selector => ({
+            attr() {},
+            click() {
+                registry.finished = registry.finished || selector === "#NextButton";
+            }
+        }),
+        Qualtrics: {
+            SurveyEngine: {
+                addOnload(callback) {
+                    registry.onload = callback;
+                },
+                addOnUnload() {},
+                getEmbeddedData: () => null,
+                setEmbeddedData(name, value) {
+                    registry.embeddedData[name] = value;
+                }
+            }
+        }
+    };
+    vm.createContext(context);
+    return {context, registry};
+}
+
+async function runTask(script, seed = 7, frameInterval = 16, maxSteps = 200000) {
+    // Run the task from the page load to the end, pressing the advance key at each instruction
+    // and leaving the trials to the automatic responses
+    const {context, registry} = createTaskContext(seed, frameInterval);
+    vm.runInContext(script, context);
+    vm.runInContext("task.overallInstruction = []; task.reminderInstruction = [];", context);
+    const advanceKey = vm.runInContext("task.advanceKey.code", context);
+    registry.onload.call({hideNextButton() {}});
+    for (let step = 0; step < maxSteps && !registry.finished; step++) {
+        await Promise.resolve();
+        await Promise.resolve();
+        if (!registry.timers.length) {
+            await new Promise(resolve => setImmediate(resolve));
+            if (!registry.timers.length) {
+                for (const listener of registry.listeners.keydown || []) {
+                    listener({code: advanceKey, preventDefault() {}});
+                }
+                if (!registry.timers.length) {
+                    break;
+                }
+            }
+            continue;
+        }
+        registry.timers.sort((a, b) => a.time - b.time || a.order - b.order);
+        const timer = registry.timers.shift();
+        registry.clock = Math.max(registry.clock, timer.time);
+        timer.callback();
+    }
+    return {finished: registry.finished, embeddedData: registry.embeddedData};
+}
+
+module.exports = {wordTask, imageTask, generateScript, createTaskContext, runTask};
@@ -0,0 +1,21 @@
+// Tests of the optimized question script, which should record the same data as the default script
+// Run with: node --test, from the repository folder
+const assert = require("assert");
+const test = require("node:test");
+const {wordTask, imageTask, generateScript, runTask} = require("./iat_script_harness");
+
+for (const [taskName, taskParams] of [["words", wordTask], ["images", imageTask]]) {
+    test(`the optimized script records the same data as the default script (${taskName})`, async () => {
+        const defaultScript = generateScript(taskParams);
+        const optimizedScript = generateScript(taskParams, true);
+        assert.ok(optimizedScript.length < defaultScript.length);
+        const defaultRun = await runTask(defaultScript);
+        const optimizedRun = await runTask(optimizedScript);
+        assert.ok(defaultRun.finished, "The default script didn't finish the task");
+        assert.ok(optimizedRun.finished, "The optimized script didn't finish the task");
+        for (let blockNumber = 1; blockNumber <= 7; blockNumber++) {
+            assert.ok(defaultRun.embeddedData[`block${blockNumber}Responses`], `No responses in block ${blockNumber}`);
+        }
+        assert.deepStrictEqual(optimizedRun.embeddedData, defaultRun.embeddedData);
+    });
+}
@@ -0,0 +1,27 @@
+// Tests of the precision timing, which saves each trial's onset lag and dropped frames
+// Run with: node --test, from the repository folder
+const assert = require("assert");
+const test = require("node:test");
+const {wordTask, generateScript, runTask} = require("./iat_script_harness");
+
+function blockTimings(embeddedData) {
+    const timings = [];
+    for (let blockNumber = 1; blockNumber <= 7; blockNumber++) {
+        const blockTiming = embeddedData[`block${blockNumber}Timing`];
+        assert.ok(blockTiming, `No timings in block ${blockNumber}`);
+        timings.push(...blockTiming.split("_").map(x => x.split(":")));
+    }
+    return timings;
+}
+
+for (const frameInterval of [16, 33, 50]) {
+    test(`no frames are dropped when the display refreshes every ${frameInterval} ms`, async () => {
+        const script = generateScript({...wordTask, precision_timing: true});
+        const run = await runTask(script, 7, frameInterval);
+        assert.ok(run.finished, "The script didn't finish the task");
+        for (const [onsetLag, droppedFrames] of blockTimings(run.embeddedData)) {
+            assert.ok(Number(onsetLag) >= 0);
+            assert.strictEqual(droppedFrames, "0");
+        }
+    });
+}